@@ -1,19 +1,184 @@
+from typing import AsyncIterator, Iterator, List, Optional, Set, Tuple
+from pydantic import ValidationError
+from sqlalchemy import delete, func, insert, or_, select, update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
 from fastapi import HTTPException
-from api.db.models import User, UserView
-from api.schemas.user import UserResponse, UserSchema, UserUpdateSchema
+from api.db.database import database
+from api.db.models import User, UserStats, UserView
+from api.schemas.user import (
+    UserFilterSchema,
+    UserResponse,
+    UserSchema,
+    UserSearchSchema,
+    UserUpdateSchema,
+)
+from api.security.hashing import hash_pool
+from api.security.principal_cache import principal_cache
+from api.utils.etag import page_etag, user_etag
 from api.utils.exception_handler import exception_handler
+from api.utils.exporters import encode_rows
+from api.utils.importers import iter_import_rows
+from api.utils.page_cache import page_cache
+from api.utils.pagination import decode_cursor, encode_cursor
+from api.utils.search import search_conditions
+from core.config import WRITE_QUEUE_ENABLED
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def count_users(db: Session, filters: Optional[UserSearchSchema] = None) -> int:
+    conditions = search_conditions(filters)
+    if not conditions:
+        # Kept up to date by triggers, so no need to count the whole table.
+        total = db.query(UserStats.count).filter_by(dimension="total").scalar()
+        return total or 0
+    return db.query(func.count(UserView.id)).filter(*conditions).scalar()
 
 
-def get_all_users(db: Session, skip: int, limit: int) -> UserResponse:
-    all_records = db.query(UserView).offset(skip).limit(limit).all()
+def _stats_value(dimension: str, value: str):
+    if value == "":
+        return None
+    if dimension == "is_active":
+        return value == "1"
+    return value
+
+
+def get_user_stats(db: Session) -> dict:
+    stats = {"total": 0, "country": [], "city": [], "is_active": []}
+    rows = db.query(UserStats).order_by(
+        UserStats.dimension, UserStats.count.desc(), UserStats.value
+    )
+    for row in rows:
+        if row.dimension == "total":
+            stats["total"] = row.count
+        elif row.dimension in stats:
+            stats[row.dimension].append(
+                {"value": _stats_value(row.dimension, row.value), "count": row.count}
+            )
+    return stats
+
+
+def _user_query(
+    db: Session,
+    fields: Optional[List[str]],
+    filters: Optional[UserSearchSchema] = None,
+):
+    if fields is None:
+        query = db.query(UserView)
+    else:
+        # Plain rows of the requested columns, no ORM entities are built.
+        query = db.query(*(getattr(UserView, name) for name in fields))
+    conditions = search_conditions(filters)
+    return query.filter(*conditions) if conditions else query
+
+
+def _user_records(records: list, fields: Optional[List[str]]) -> list:
+    if fields is None:
+        return records
+    return [record._asdict() for record in records]
+
+
+def _offset_page(query, skip: int, limit: int) -> list:
+    # Ordered by id so that sparse fieldsets, which SQLite may read from a
+    # covering index, page through the same rows as the ETag query.
+    return query.order_by(UserView.id).offset(skip).limit(limit).all()
+
+
+def _cursor_page(query, last_id: int, limit: int) -> list:
+    # One extra row tells whether there is a next page.
+    return (
+        query.filter(UserView.id > last_id).order_by(UserView.id).limit(limit + 1).all()
+    )
+
+
+def get_users_etag(
+    db: Session,
+    skip: int,
+    cursor: Optional[str],
+    limit: int,
+    include_total: bool = False,
+    fields: Optional[List[str]] = None,
+    filters: Optional[UserSearchSchema] = None,
+) -> str:
+    # Same page as the list query but only (id, version), enough to tell
+    # whether the client copy is still current without loading whole rows.
+    query = db.query(UserView.id, UserView.version)
+    conditions = search_conditions(filters)
+    if conditions:
+        query = query.filter(*conditions)
+    if cursor is None:
+        records = _offset_page(query, skip, limit)
+    else:
+        records = _cursor_page(query, decode_cursor(cursor), limit)
+    total = count_users(db, filters) if include_total else None
+    return page_etag(
+        ((record.id, record.version) for record in records),
+        skip if cursor is None else cursor,
+        limit,
+        total,
+        fields,
+        filters.dict() if filters is not None else None,
+    )
+
+
+def get_all_users(
+    db: Session,
+    skip: int,
+    limit: int,
+    include_total: bool = False,
+    fields: Optional[List[str]] = None,
+    filters: Optional[UserSearchSchema] = None,
+) -> UserResponse:
+    all_records = _offset_page(_user_query(db, fields, filters), skip, limit)
     user_ids = [user.id for user in all_records]
-    return {"message": "List of users", "users_ids": user_ids, "result": all_records}
+    response = {
+        "message": "List of users",
+        "users_ids": user_ids,
+        "result": _user_records(all_records, fields),
+    }
+    if include_total:
+        response["total"] = count_users(db, filters)
+    return response
+
+
+def get_users_page(
+    db: Session,
+    cursor: Optional[str],
+    limit: int,
+    include_total: bool = False,
+    fields: Optional[List[str]] = None,
+    filters: Optional[UserSearchSchema] = None,
+) -> UserResponse:
+    # Keyset pagination: seek past the last seen id on the primary key index
+    # instead of scanning and discarding every skipped row like OFFSET does.
+    last_id = decode_cursor(cursor)
+    records = _cursor_page(_user_query(db, fields, filters), last_id, limit)
+    page = records[:limit]
+    user_ids = [user.id for user in page]
+    next_cursor = None
+    if page and len(records) > limit:
+        next_cursor = encode_cursor(user_ids[-1])
+    response = {
+        "message": "List of users",
+        "users_ids": user_ids,
+        "result": _user_records(page, fields),
+        "next_cursor": next_cursor,
+    }
+    if include_total:
+        response["total"] = count_users(db, filters)
+    return response
+
+
+def export_users(db: Session, format: str, chunk_size: int) -> Iterator[bytes]:
+    # The response is streamed after the request session is closed, so read
+    # through a connection of our own with a server side cursor that only keeps
+    # `chunk_size` rows in memory at a time.
+    columns = [column.name for column in UserView.__table__.columns]
+    with db.get_bind().connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, yield_per=chunk_size
+        ).execute(select(UserView.__table__).order_by(UserView.id))
+        yield from encode_rows(format, columns, result.partitions())
 
 
 def get_user_id(db: Session, user_id: int):
@@ -23,14 +188,66 @@ def get_user_id(db: Session, user_id: int):
     return _user
 
 
-def create_user(db: Session, user: UserSchema):
+def get_user_etag(db: Session, user_id: int, fields: Optional[List[str]] = None):
+    record = db.query(User.version).filter(User.id == user_id).first()
+    if not record:
+        raise exception_handler("404_NOT_FOUND")
+    return user_etag(user_id, record.version, fields)
+
+
+def get_user_fields(db: Session, user_id: int, fields: List[str]) -> dict:
+    record = _user_query(db, fields).filter(UserView.id == user_id).first()
+    if not record:
+        raise exception_handler("404_NOT_FOUND")
+    return record._asdict()
+
+
+def get_users_by_ids(
+    db: Session, ids: List[int], fields: Optional[List[str]], chunk_size: int
+) -> dict:
+    found = {}
+    for chunk in _id_chunks(ids, chunk_size):
+        records = _user_query(db, fields).filter(UserView.id.in_(chunk)).all()
+        found.update(zip((record.id for record in records), records))
+    # Keyed in the order the ids were requested, missing ids map to None.
+    unique_ids = list(dict.fromkeys(ids))
+    return {
+        "message": "Users by id",
+        "result": {
+            user_id: (
+                _user_records([found[user_id]], fields)[0] if user_id in found else None
+            )
+            for user_id in unique_ids
+        },
+        "not_found": [user_id for user_id in unique_ids if user_id not in found],
+    }
+
+
+# Writes return the row they changed in the same statement with RETURNING,
+# instead of loading the user before and refreshing it after the write.
+_USER_COLUMNS = tuple(User.__table__.columns)
+
+
+def _returning_user(db: Session, statement):
+    return db.execute(
+        statement.returning(*_USER_COLUMNS).execution_options(synchronize_session=False)
+    ).first()
+
+
+def _insert_user(db: Session, user: UserSchema, hashed_password: str):
+    values = {**user.dict(), "hashed_password": hashed_password}
+    return db.execute(insert(User).values(**values).returning(*_USER_COLUMNS)).one()
+
+
+def create_user(db: Session, user: UserSchema, hashed_password: str):
+    # The caller hashes the password off the event loop, see hash_pool.
     try:
-        _user = User(**user.dict())
-        hash = pwd_context.hash(_user.hashed_password)
-        _user.hashed_password = hash
-        db.add(_user)
-        db.commit()
-        db.refresh(_user)
+        if WRITE_QUEUE_ENABLED:
+            _user = database.write_queue.run(_insert_user, user, hashed_password)
+        else:
+            _user = _insert_user(db, user, hashed_password)
+            db.commit()
+        page_cache.invalidate()
         return _user
     except IntegrityError as e:
         db.rollback()
@@ -40,35 +257,249 @@ def create_user(db: Session, user: UserSchema):
         raise exception_handler("500_CREATE")
 
 
-def update_user(db: Session, user_id: int, user_update: UserUpdateSchema):
-    _user = get_user_id(db=db, user_id=user_id)
+def _update_user_row(
+    db: Session, user_id: int, values: dict, expected_versions: Optional[Set[int]]
+):
+    # The If-Match check is part of the UPDATE, so no other write can slip in
+    # between reading the version and writing the changes.
+    conditions = [User.id == user_id]
+    if expected_versions is not None:
+        conditions.append(User.version.in_(expected_versions))
+    statement = (
+        update(User).where(*conditions).values(**values, version=User.version + 1)
+    )
+    _user = _returning_user(db, statement)
+    if _user is None:
+        # Nothing matched, only now find out whether the user exists at all.
+        exists = db.scalar(select(User.id).where(User.id == user_id))
+        if exists is not None and expected_versions is not None:
+            raise exception_handler("412_PRECONDITION_FAILED")
+        raise exception_handler("404_NOT_FOUND")
+    return _user
+
 
-    for field, value in user_update.dict().items():
-        setattr(_user, field, value)
+def _change_user(
+    db: Session, user_id: int, values: dict, expected_versions: Optional[Set[int]]
+):
     try:
-        db.commit()
-        db.refresh(_user)
+        if WRITE_QUEUE_ENABLED:
+            _user = database.write_queue.run(
+                _update_user_row, user_id, values, expected_versions
+            )
+        else:
+            _user = _update_user_row(db, user_id, values, expected_versions)
+            db.commit()
     except IntegrityError as e:
         db.rollback()
         raise exception_handler("400_ERROR_FIELDS")
+    principal_cache.invalidate_user(_user.id)
+    page_cache.invalidate()
 
     return _user
 
 
-def patch_user(db: Session, user_id: int, user_update: UserUpdateSchema):
-    _user = get_user_id(db=db, user_id=user_id)
+def update_user(
+    db: Session,
+    user_id: int,
+    user_update: UserUpdateSchema,
+    expected_versions: Optional[Set[int]] = None,
+):
+    return _change_user(db, user_id, user_update.dict(), expected_versions)
+
+
+def patch_user(
+    db: Session,
+    user_id: int,
+    user_update: UserUpdateSchema,
+    expected_versions: Optional[Set[int]] = None,
+):
+    values = user_update.dict(exclude_unset=True)
+    return _change_user(db, user_id, values, expected_versions)
 
-    for field, value in user_update.dict(exclude_unset=True).items():
-        setattr(_user, field, value)
-    db.commit()
-    db.refresh(_user)
 
+def _delete_user_row(db: Session, user_id: int):
+    _user = _returning_user(db, delete(User).where(User.id == user_id))
+    if _user is None:
+        raise exception_handler("404_NOT_FOUND")
     return _user
 
 
 def delete_user(db: Session, user_id: int):
-    _user = get_user_id(db=db, user_id=user_id)
-    db.delete(_user)
-    db.commit()
+    if WRITE_QUEUE_ENABLED:
+        _user = database.write_queue.run(_delete_user_row, user_id)
+    else:
+        _user = _delete_user_row(db, user_id)
+        db.commit()
+    principal_cache.invalidate_user(_user.id)
+    page_cache.invalidate()
 
     return {"message": "User deleted successfully", "user_deleted": _user}
+
+
+def _import_error(line: int, detail: str) -> dict:
+    return {"line": line, "status": "error", "detail": detail}
+
+
+def insert_users_batch(db: Session, rows: List[Tuple[int, dict]]) -> List[dict]:
+    duplicated = exception_handler("400_ERROR_FIELDS").detail
+    usernames = [values["username"] for _, values in rows]
+    emails = [values["email"] for _, values in rows]
+    existing = (
+        db.query(User.username, User.email)
+        .filter(or_(User.username.in_(usernames), User.email.in_(emails)))
+        .all()
+    )
+    taken_usernames = {username for username, _ in existing}
+    taken_emails = {email for _, email in existing}
+
+    results = []
+    pending = []
+    for line, values in rows:
+        if values["username"] in taken_usernames or values["email"] in taken_emails:
+            results.append(_import_error(line, duplicated))
+            continue
+        taken_usernames.add(values["username"])
+        taken_emails.add(values["email"])
+        pending.append((line, values))
+    if not pending:
+        return results
+
+    try:
+        statement = insert(User).returning(User.id, sort_by_parameter_order=True)
+        ids = db.scalars(statement, [values for _, values in pending]).all()
+        db.commit()
+        page_cache.invalidate()
+        for (line, _), user_id in zip(pending, ids):
+            results.append({"line": line, "status": "created", "id": user_id})
+    except IntegrityError as e:
+        # A concurrent request took one of the values, retry row by row.
+        db.rollback()
+        for line, values in pending:
+            try:
+                user_id = db.scalar(insert(User).values(**values).returning(User.id))
+                db.commit()
+                page_cache.invalidate()
+                results.append({"line": line, "status": "created", "id": user_id})
+            except IntegrityError as e:
+                db.rollback()
+                results.append(_import_error(line, duplicated))
+    return results
+
+
+async def import_users(
+    db: Session, stream: AsyncIterator[bytes], format: str, batch_size: int
+) -> dict:
+    results = []
+    batch = []
+
+    async def flush():
+        hashes = await hash_pool.hash_many(
+            [values["hashed_password"] for _, values in batch]
+        )
+        for (_, values), hashed_password in zip(batch, hashes):
+            values["hashed_password"] = hashed_password
+        results.extend(await run_in_threadpool(insert_users_batch, db, list(batch)))
+        batch.clear()
+
+    async for line, values, error in iter_import_rows(stream, format):
+        if error is not None:
+            results.append(_import_error(line, error))
+            continue
+        try:
+            batch.append((line, UserSchema(**values).dict()))
+        except ValidationError as e:
+            detail = "; ".join(
+                f"{'.'.join(map(str, item['loc']))}: {item['msg']}"
+                for item in e.errors()
+            )
+            results.append(_import_error(line, detail))
+            continue
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    results.sort(key=lambda result: result["line"])
+    created = sum(1 for result in results if result["status"] == "created")
+    return {
+        "message": "Import finished",
+        "created": created,
+        "failed": len(results) - created,
+        "results": results,
+    }
+
+
+def _id_chunks(ids: List[int], chunk_size: int):
+    if not ids:
+        raise exception_handler("422_NO_ID")
+    unique_ids = list(dict.fromkeys(ids))
+    for start in range(0, len(unique_ids), chunk_size):
+        yield unique_ids[start : start + chunk_size]
+
+
+def _bulk_conditions(ids: List[int], user_filter: Optional[UserFilterSchema]):
+    conditions = [User.id.in_(ids)]
+    if user_filter is not None:
+        for field, value in user_filter.dict(exclude_unset=True).items():
+            conditions.append(getattr(User, field) == value)
+    return conditions
+
+
+def bulk_patch_users(
+    db: Session,
+    ids: List[int],
+    user_update: UserUpdateSchema,
+    user_filter: Optional[UserFilterSchema],
+    chunk_size: int,
+) -> dict:
+    values = user_update.dict(exclude_unset=True)
+    if not values:
+        raise exception_handler("422_UNPROCESSABLE_ENTITY")
+
+    affected_ids = []
+    for chunk in _id_chunks(ids, chunk_size):
+        statement = (
+            update(User)
+            .where(*_bulk_conditions(chunk, user_filter))
+            .values(**values, version=User.version + 1)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            chunk_ids = db.scalars(statement).all()
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            raise exception_handler("400_ERROR_FIELDS")
+        for user_id in chunk_ids:
+            principal_cache.invalidate_user(user_id)
+        if chunk_ids:
+            page_cache.invalidate()
+        affected_ids.extend(chunk_ids)
+
+    return {"message": "Users updated successfully", "affected_ids": affected_ids}
+
+
+def bulk_delete_users(
+    db: Session,
+    ids: List[int],
+    user_filter: Optional[UserFilterSchema],
+    chunk_size: int,
+) -> dict:
+    affected_ids = []
+    for chunk in _id_chunks(ids, chunk_size):
+        statement = (
+            delete(User)
+            .where(*_bulk_conditions(chunk, user_filter))
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+        chunk_ids = db.scalars(statement).all()
+        db.commit()
+        for user_id in chunk_ids:
+            principal_cache.invalidate_user(user_id)
+        if chunk_ids:
+            page_cache.invalidate()
+        affected_ids.extend(chunk_ids)
+
+    return {"message": "Users deleted successfully", "affected_ids": affected_ids}
@@ -0,0 +1,253 @@
+from typing import List, Optional, Set
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.db.models import User, UserStats, UserView
+from api.schemas.user import (
+    UserResponse,
+    UserSchema,
+    UserSearchSchema,
+    UserUpdateSchema,
+)
+from api.security.principal_cache import principal_cache
+from api.utils.etag import page_etag, user_etag
+from api.utils.exception_handler import exception_handler
+from api.utils.page_cache import page_cache
+from api.utils.pagination import decode_cursor, encode_cursor
+from api.utils.search import search_conditions
+
+# Same queries as api.controllers.user, written with select() for AsyncSession.
+
+
+async def count_users(
+    db: AsyncSession, filters: Optional[UserSearchSchema] = None
+) -> int:
+    conditions = search_conditions(filters)
+    if not conditions:
+        total = await db.scalar(
+            select(UserStats.count).where(UserStats.dimension == "total")
+        )
+        return total or 0
+    return await db.scalar(select(func.count(UserView.id)).where(*conditions))
+
+
+def _user_select(
+    fields: Optional[List[str]], filters: Optional[UserSearchSchema] = None
+):
+    if fields is None:
+        statement = select(UserView)
+    else:
+        statement = select(*(getattr(UserView, name) for name in fields))
+    conditions = search_conditions(filters)
+    return statement.where(*conditions) if conditions else statement
+
+
+async def _user_records(
+    db: AsyncSession, statement, fields: Optional[List[str]]
+) -> list:
+    if fields is None:
+        return (await db.scalars(statement)).all()
+    return (await db.execute(statement)).all()
+
+
+def _as_dicts(records: list, fields: Optional[List[str]]) -> list:
+    if fields is None:
+        return records
+    return [record._asdict() for record in records]
+
+
+def _offset_page(statement, skip: int, limit: int):
+    return statement.order_by(UserView.id).offset(skip).limit(limit)
+
+
+def _cursor_page(statement, last_id: int, limit: int):
+    # One extra row tells whether there is a next page.
+    return statement.where(UserView.id > last_id).order_by(UserView.id).limit(limit + 1)
+
+
+async def get_users_etag(
+    db: AsyncSession,
+    skip: int,
+    cursor: Optional[str],
+    limit: int,
+    include_total: bool = False,
+    fields: Optional[List[str]] = None,
+    filters: Optional[UserSearchSchema] = None,
+) -> str:
+    statement = select(UserView.id, UserView.version)
+    conditions = search_conditions(filters)
+    if conditions:
+        statement = statement.where(*conditions)
+    if cursor is None:
+        statement = _offset_page(statement, skip, limit)
+    else:
+        statement = _cursor_page(statement, decode_cursor(cursor), limit)
+    records = (await db.execute(statement)).all()
+    total = await count_users(db, filters) if include_total else None
+    return page_etag(
+        ((record.id, record.version) for record in records),
+        skip if cursor is None else cursor,
+        limit,
+        total,
+        fields,
+        filters.dict() if filters is not None else None,
+    )
+
+
+async def get_all_users(
+    db: AsyncSession,
+    skip: int,
+    limit: int,
+    include_total: bool = False,
+    fields: Optional[List[str]] = None,
+    filters: Optional[UserSearchSchema] = None,
+) -> UserResponse:
+    statement = _offset_page(_user_select(fields, filters), skip, limit)
+    all_records = await _user_records(db, statement, fields)
+    user_ids = [user.id for user in all_records]
+    response = {
+        "message": "List of users",
+        "users_ids": user_ids,
+        "result": _as_dicts(all_records, fields),
+    }
+    if include_total:
+        response["total"] = await count_users(db, filters)
+    return response
+
+
+async def get_users_page(
+    db: AsyncSession,
+    cursor: Optional[str],
+    limit: int,
+    include_total: bool = False,
+    fields: Optional[List[str]] = None,
+    filters: Optional[UserSearchSchema] = None,
+) -> UserResponse:
+    last_id = decode_cursor(cursor)
+    statement = _cursor_page(_user_select(fields, filters), last_id, limit)
+    records = await _user_records(db, statement, fields)
+    page = records[:limit]
+    user_ids = [user.id for user in page]
+    next_cursor = None
+    if page and len(records) > limit:
+        next_cursor = encode_cursor(user_ids[-1])
+    response = {
+        "message": "List of users",
+        "users_ids": user_ids,
+        "result": _as_dicts(page, fields),
+        "next_cursor": next_cursor,
+    }
+    if include_total:
+        response["total"] = await count_users(db, filters)
+    return response
+
+
+async def get_user_id(db: AsyncSession, user_id: int):
+    _user = await db.scalar(select(User).where(User.id == user_id))
+    if not _user:
+        raise exception_handler("404_NOT_FOUND")
+    return _user
+
+
+async def get_user_etag(
+    db: AsyncSession, user_id: int, fields: Optional[List[str]] = None
+):
+    version = await db.scalar(select(User.version).where(User.id == user_id))
+    if version is None:
+        raise exception_handler("404_NOT_FOUND")
+    return user_etag(user_id, version, fields)
+
+
+async def get_user_fields(db: AsyncSession, user_id: int, fields: List[str]) -> dict:
+    statement = _user_select(fields).where(UserView.id == user_id)
+    record = (await db.execute(statement)).first()
+    if not record:
+        raise exception_handler("404_NOT_FOUND")
+    return record._asdict()
+
+
+_USER_COLUMNS = tuple(User.__table__.columns)
+
+
+async def _returning_user(db: AsyncSession, statement):
+    result = await db.execute(
+        statement.returning(*_USER_COLUMNS).execution_options(synchronize_session=False)
+    )
+    return result.first()
+
+
+async def create_user(db: AsyncSession, user: UserSchema, hashed_password: str):
+    values = {**user.dict(), "hashed_password": hashed_password}
+    try:
+        result = await db.execute(
+            insert(User).values(**values).returning(*_USER_COLUMNS)
+        )
+        _user = result.one()
+        await db.commit()
+        page_cache.invalidate()
+        return _user
+    except IntegrityError as e:
+        await db.rollback()
+        raise exception_handler("400_ERROR_FIELDS")
+    except Exception as e:
+        await db.rollback()
+        raise exception_handler("500_CREATE")
+
+
+async def _change_user(
+    db: AsyncSession,
+    user_id: int,
+    values: dict,
+    expected_versions: Optional[Set[int]],
+):
+    conditions = [User.id == user_id]
+    if expected_versions is not None:
+        conditions.append(User.version.in_(expected_versions))
+    statement = (
+        update(User).where(*conditions).values(**values, version=User.version + 1)
+    )
+    try:
+        _user = await _returning_user(db, statement)
+        if _user is None:
+            exists = await db.scalar(select(User.id).where(User.id == user_id))
+            if exists is not None and expected_versions is not None:
+                raise exception_handler("412_PRECONDITION_FAILED")
+            raise exception_handler("404_NOT_FOUND")
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise exception_handler("400_ERROR_FIELDS")
+    principal_cache.invalidate_user(_user.id)
+    page_cache.invalidate()
+
+    return _user
+
+
+async def update_user(
+    db: AsyncSession,
+    user_id: int,
+    user_update: UserUpdateSchema,
+    expected_versions: Optional[Set[int]] = None,
+):
+    return await _change_user(db, user_id, user_update.dict(), expected_versions)
+
+
+async def patch_user(
+    db: AsyncSession,
+    user_id: int,
+    user_update: UserUpdateSchema,
+    expected_versions: Optional[Set[int]] = None,
+):
+    values = user_update.dict(exclude_unset=True)
+    return await _change_user(db, user_id, values, expected_versions)
+
+
+async def delete_user(db: AsyncSession, user_id: int):
+    _user = await _returning_user(db, delete(User).where(User.id == user_id))
+    if _user is None:
+        raise exception_handler("404_NOT_FOUND")
+    await db.commit()
+    principal_cache.invalidate_user(_user.id)
+    page_cache.invalidate()
+
+    return {"message": "User deleted successfully", "user_deleted": _user}
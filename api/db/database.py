@@ -1,19 +1,231 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from api.db.models import Base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from api.db.schema import ensure_schema
+from api.db.write_queue import WriteQueue
+from api.utils.metrics import metrics
+from core.config import (
+    ASYNC_DATABASE_URL,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_CACHE_SIZE,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_SYNCHRONOUS,
+    WRITE_QUEUE_MAX_BATCH,
+    WRITE_QUEUE_MAX_WAIT_MS,
+)
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./database.sqlite3"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base.metadata.create_all(bind=engine)
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    # WAL lets readers keep going while a writer commits, NORMAL synchronous is
+    # durable in WAL mode and skips an fsync per commit.
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    cursor.close()
+
+
+def _timed(context) -> bool:
+    return context is None or context.execution_options.get("timed", True)
+
+
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    if _timed(context):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    if _timed(context):
+        metrics.observe("db", time.perf_counter() - conn.info["query_started"].pop())
+
+
+def _query_failed(context):
+    if not _timed(context.execution_context):
+        return
+    started = (
+        context.connection.info.get("query_started") if context.connection else None
+    )
+    if started:
+        metrics.observe("db", time.perf_counter() - started.pop())
+
+
+def instrument_engine(_engine):
+    # Times every statement, the total shows up per request in Server-Timing.
+    event.listen(_engine, "before_cursor_execute", _query_started)
+    event.listen(_engine, "after_cursor_execute", _query_finished)
+    event.listen(_engine, "handle_error", _query_failed)
+
+
+def untimed(_engine):
+    """
+    The same engine and pool, but its statements are left out of the query
+    metrics. For schema upgrades and background polling, which would otherwise
+    drown the queries made while serving requests.
+    """
+    return _engine.execution_options(timed=False)
+
+
+def pool_options(url: str) -> dict:
+    if url.endswith(("://", ":memory:")):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+
+
+def build_engine(url: str = DATABASE_URL):
+    options = pool_options(url)
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    _engine = create_engine(url, **options)
+    if _engine.dialect.name == "sqlite":
+        event.listen(_engine, "connect", configure_sqlite_connection)
+    instrument_engine(_engine)
+    return _engine
+
+
+def enable_savepoints(_engine):
+    # pysqlite opens transactions on its own and does not know about
+    # SAVEPOINT, so let SQLAlchemy emit BEGIN itself.
+    # https://docs.sqlalchemy.org/en/20/dialects/sqlite.html#serializable-isolation-savepoints-transactional-ddl
+    @event.listens_for(_engine, "connect")
+    def disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(_engine, "begin")
+    def begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return _engine
+
+
+def build_async_engine(url: str = ASYNC_DATABASE_URL):
+    options = pool_options(url)
+    if options:
+        # aiosqlite defaults to NullPool, pool it like the sync stack.
+        options["poolclass"] = AsyncAdaptedQueuePool
+    _engine = create_async_engine(url, **options)
+    if _engine.dialect.name == "sqlite":
+        event.listen(_engine.sync_engine, "connect", configure_sqlite_connection)
+    instrument_engine(_engine.sync_engine)
+    return _engine
+
+
+class Database:
+    """
+    Engines and session factories of the application.
+
+    Nothing is created on import, each engine is built the first time it is
+    used, so workers, tests and commands only pay for what they touch. The app
+    lifespan creates the schema on startup and disposes the engines on shutdown.
+    """
+
+    def __init__(self, url: str = DATABASE_URL, async_url: str = ASYNC_DATABASE_URL):
+        self.url = url
+        self.async_url = async_url
+        self._lock = threading.Lock()
+        self._engine = None
+        self._session_factory = None
+        self._async_engine = None
+        self._async_session_factory = None
+        self._write_queue = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = build_engine(self.url)
+        return self._engine
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            self._session_factory = sessionmaker(
+                autocommit=False, autoflush=False, bind=self.engine
+            )
+        return self._session_factory
+
+    @property
+    def async_engine(self):
+        if self._async_engine is None:
+            with self._lock:
+                if self._async_engine is None:
+                    self._async_engine = build_async_engine(self.async_url)
+        return self._async_engine
+
+    @property
+    def async_session_factory(self):
+        if self._async_session_factory is None:
+            self._async_session_factory = async_sessionmaker(
+                bind=self.async_engine, autoflush=False, expire_on_commit=False
+            )
+        return self._async_session_factory
+
+    @property
+    def write_queue(self) -> WriteQueue:
+        if self._write_queue is None:
+            with self._lock:
+                if self._write_queue is None:
+                    # Own engine with a single connection, savepoints isolate
+                    # each write of a batch.
+                    engine = enable_savepoints(build_engine(self.url))
+                    self._write_queue = WriteQueue(
+                        sessionmaker(
+                            bind=engine, autoflush=False, expire_on_commit=False
+                        ),
+                        WRITE_QUEUE_MAX_BATCH,
+                        WRITE_QUEUE_MAX_WAIT_MS / 1000,
+                    )
+        return self._write_queue
+
+    def create_schema(self):
+        ensure_schema(untimed(self.engine))
+
+    async def dispose(self):
+        with self._lock:
+            engine, self._engine = self._engine, None
+            async_engine, self._async_engine = self._async_engine, None
+            self._session_factory = self._async_session_factory = None
+            write_queue, self._write_queue = self._write_queue, None
+        if write_queue is not None:
+            write_queue.shutdown()
+            write_queue.session_factory.kw["bind"].dispose()
+        if engine is not None:
+            engine.dispose()
+        if async_engine is not None:
+            await async_engine.dispose()
+
+
+database = Database()
 
 
 def get_db():
-    db = SessionLocal()
+    db = database.session_factory()
     try:
         yield db
     finally:
         db.close()
+
+
+def get_auth_db():
+    # Same pooled sessions as get_db, kept as its own dependency so the users
+    # API session can be overridden without affecting authentication.
+    yield from get_db()
+
+
+async def get_async_db():
+    async with database.async_session_factory() as db:
+        yield db
@@ -0,0 +1,28 @@
+"""
+Creates the database schema, or upgrades an existing database, and exits.
+
+    python -m api.db.migrate
+    python -m api.db.migrate --database-url sqlite:///./large.sqlite3
+
+Run it before starting workers with DB_CREATE_SCHEMA=false, so they skip the
+schema step on boot.
+"""
+
+import argparse
+from api.db.database import build_engine
+from api.db.schema import ensure_schema
+from core.config import DATABASE_URL
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    args = parser.parse_args()
+    engine = build_engine(args.database_url)
+    ensure_schema(engine)
+    engine.dispose()
+    print(f"Schema of {args.database_url} is up to date")
+
+
+if __name__ == "__main__":
+    main()
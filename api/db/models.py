@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Index, Integer, String, Boolean, PrimaryKeyConstraint
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -6,6 +6,14 @@ Base = declarative_base()
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_country_city", "country", "city"),
+        Index("ix_users_city", "city"),
+        Index("ix_users_age", "age"),
+        # Ids of deleted users are never handed out again, an ETag is built
+        # from (id, version) and must not match a later user.
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
@@ -17,10 +25,13 @@ class User(Base):
     country = Column(String, nullable=True)
     phone_number = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
 
 class UserView(Base):
     __tablename__ = "user_view"
+    # Read only view over users, created by api.db.schema instead of create_all.
+    __table_args__ = {"info": {"is_view": True}}
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
@@ -31,3 +42,26 @@ class UserView(Base):
     age = Column(Integer, nullable=True)
     country = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
+    version = Column(Integer)
+
+
+class UserStats(Base):
+    __tablename__ = "user_stats"
+    # Row counts per (dimension, value), maintained by triggers in api.db.schema.
+    # A missing value is stored as "" so it can take part in the primary key.
+    __table_args__ = (PrimaryKeyConstraint("dimension", "value"),)
+
+    dimension = Column(String, nullable=False)
+    value = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class UserChange(Base):
+    __tablename__ = "user_changes"
+    # Ids of inserted, updated and deleted users, appended by triggers in
+    # api.db.schema and read by every worker to drop its stale caches. A NULL
+    # user_id means any user may have changed.
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=True)
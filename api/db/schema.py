@@ -0,0 +1,209 @@
+from sqlalchemy import column, table
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateTable
+from api.db.models import Base, User, UserView
+
+USER_VIEW_COLUMNS = [column.name for column in UserView.__table__.columns]
+
+# External content FTS5 index over users, kept in sync by the triggers below.
+# It is not part of the metadata because create_all can not build virtual tables.
+users_fts = table("users_fts", column("rowid"), column("users_fts"))
+
+USERS_FTS = (
+    "CREATE VIRTUAL TABLE users_fts USING fts5("
+    "full_name, username, email, content='users', content_rowid='id')"
+)
+USERS_FTS_REBUILD = "INSERT INTO users_fts (users_fts) VALUES ('rebuild')"
+USERS_FTS_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts (rowid, full_name, username, email)
+        VALUES (new.id, new.full_name, new.username, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts (users_fts, rowid, full_name, username, email)
+        VALUES ('delete', old.id, old.full_name, old.username, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_update
+    AFTER UPDATE OF full_name, username, email ON users BEGIN
+        INSERT INTO users_fts (users_fts, rowid, full_name, username, email)
+        VALUES ('delete', old.id, old.full_name, old.username, old.email);
+        INSERT INTO users_fts (rowid, full_name, username, email)
+        VALUES (new.id, new.full_name, new.username, new.email);
+    END
+    """,
+)
+
+# Breakdowns kept in user_stats, as dimension name and the SQL expression of
+# its value for a users row aliased as `row`. "total" counts every row.
+USER_STATS_DIMENSIONS = {
+    "total": "''",
+    "country": "IFNULL(row.country, '')",
+    "city": "IFNULL(row.city, '')",
+    "is_active": "IFNULL(CAST(row.is_active AS TEXT), '')",
+}
+
+
+def _stats_increment(alias: str, dimensions) -> str:
+    return "".join(
+        f"""
+        INSERT INTO user_stats (dimension, value, count)
+        VALUES ('{name}', {USER_STATS_DIMENSIONS[name].replace("row.", alias)}, 1)
+        ON CONFLICT (dimension, value) DO UPDATE SET count = count + 1;"""
+        for name in dimensions
+    )
+
+
+def _stats_decrement(alias: str, dimensions) -> str:
+    statements = []
+    for name in dimensions:
+        value = USER_STATS_DIMENSIONS[name].replace("row.", alias)
+        statements.append(
+            f"""
+        UPDATE user_stats SET count = count - 1
+        WHERE dimension = '{name}' AND value = {value};
+        DELETE FROM user_stats
+        WHERE dimension = '{name}' AND value = {value} AND count <= 0;"""
+        )
+    return "".join(statements)
+
+
+_GROUPED = [name for name in USER_STATS_DIMENSIONS if name != "total"]
+
+USER_STATS_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS user_stats_insert AFTER INSERT ON users BEGIN
+        {_stats_increment("new.", USER_STATS_DIMENSIONS)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS user_stats_delete AFTER DELETE ON users BEGIN
+        {_stats_decrement("old.", USER_STATS_DIMENSIONS)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS user_stats_update
+    AFTER UPDATE OF country, city, is_active ON users BEGIN
+        {_stats_decrement("old.", _GROUPED)}
+        {_stats_increment("new.", _GROUPED)}
+    END
+    """,
+)
+
+# Change log read by api.utils.cache_sync, one entry per changed user.
+USER_CHANGES_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS user_changes_insert AFTER INSERT ON users BEGIN
+        INSERT INTO user_changes (user_id) VALUES (new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_changes_delete AFTER DELETE ON users BEGIN
+        INSERT INTO user_changes (user_id) VALUES (old.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_changes_update AFTER UPDATE ON users BEGIN
+        INSERT INTO user_changes (user_id) VALUES (old.id);
+    END
+    """,
+)
+# Appended when users were written with the triggers dropped, like the seed does.
+USER_CHANGES_RESET = "INSERT INTO user_changes (user_id) VALUES (NULL)"
+
+USER_STATS_REBUILD = [
+    "DELETE FROM user_stats",
+    *(
+        "INSERT INTO user_stats (dimension, value, count) "
+        f"SELECT '{name}', {value}, COUNT(*) FROM users AS row GROUP BY 2"
+        for name, value in USER_STATS_DIMENSIONS.items()
+    ),
+]
+
+
+def _columns(conn, table: str) -> list:
+    return [row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")]
+
+
+def _object_type(conn, name: str):
+    return conn.exec_driver_sql(
+        "SELECT type FROM sqlite_master WHERE name = ?", (name,)
+    ).scalar()
+
+
+def _table_sql(conn, name: str) -> str:
+    return conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).scalar()
+
+
+def _rebuild_users(conn):
+    # SQLite can not add AUTOINCREMENT to an existing table, so the rows are
+    # copied into a new one. Its indexes, triggers and user_view are created
+    # again by the steps that follow.
+    columns = ", ".join(column.name for column in User.__table__.columns)
+    if _object_type(conn, "user_view") == "view":
+        conn.exec_driver_sql("DROP VIEW user_view")
+    conn.exec_driver_sql("ALTER TABLE users RENAME TO users_old")
+    conn.execute(CreateTable(User.__table__))
+    conn.exec_driver_sql(
+        f"INSERT INTO users ({columns}) SELECT {columns} FROM users_old"
+    )
+    conn.exec_driver_sql("DROP TABLE users_old")
+
+
+def ensure_schema(engine: Engine):
+    """
+    Creates missing tables and brings an existing database up to date.
+
+    Every step is idempotent so it can run on each start against the bundled
+    database as well as an empty one.
+    """
+    tables = [
+        table for table in Base.metadata.sorted_tables if not table.info.get("is_view")
+    ]
+    Base.metadata.create_all(bind=engine, tables=tables)
+
+    with engine.begin() as conn:
+        if "version" not in _columns(conn, "users"):
+            conn.exec_driver_sql(
+                "ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+            )
+        if "AUTOINCREMENT" not in _table_sql(conn, "users").upper():
+            _rebuild_users(conn)
+
+        if _columns(conn, "user_view") != USER_VIEW_COLUMNS:
+            if _object_type(conn, "user_view") == "table":
+                conn.exec_driver_sql("DROP TABLE user_view")
+            conn.exec_driver_sql("DROP VIEW IF EXISTS user_view")
+            conn.exec_driver_sql(
+                f"CREATE VIEW user_view AS SELECT {', '.join(USER_VIEW_COLUMNS)} "
+                "FROM users"
+            )
+
+        # create_all skips indexes of tables that already exist.
+        for index in User.__table__.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+        if _object_type(conn, "users_fts") is None:
+            conn.exec_driver_sql(USERS_FTS)
+            conn.exec_driver_sql(USERS_FTS_REBUILD)
+        for trigger in USERS_FTS_TRIGGERS:
+            conn.exec_driver_sql(trigger)
+
+        # Without the triggers the counts can not be trusted, so they are
+        # recomputed once before the triggers take over.
+        if _object_type(conn, "user_stats_insert") is None:
+            for statement in USER_STATS_REBUILD:
+                conn.exec_driver_sql(statement)
+        for trigger in USER_STATS_TRIGGERS:
+            conn.exec_driver_sql(trigger)
+
+        if _object_type(conn, "user_changes_insert") is None:
+            conn.exec_driver_sql(USER_CHANGES_RESET)
+        for trigger in USER_CHANGES_TRIGGERS:
+            conn.exec_driver_sql(trigger)
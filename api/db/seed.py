@@ -0,0 +1,137 @@
+"""
+Fills the users table with synthetic users for local performance work.
+
+    python -m api.db.seed --users 1000000
+    python -m api.db.seed --users 50000 --database-url sqlite:///./large.sqlite3
+
+Rows are written with one `executemany` per batch on the raw SQLite connection,
+every user shares a single bcrypt hash of `--password` so they can all log in.
+The search and stats triggers are dropped while loading and ensure_schema puts
+them back and rebuilds their tables once at the end, which is much faster than
+maintaining them row by row.
+"""
+
+import argparse
+import itertools
+import random
+import time
+from sqlalchemy import create_engine
+from api.db.schema import USERS_FTS_REBUILD, ensure_schema
+from api.security.hashing import hash_password
+from core.config import DATABASE_URL
+
+FIRST_NAMES = [
+    "Ana", "Bob", "Carla", "Daniel", "Elena", "Felipe", "Gabriela", "Hector",
+    "Isabel", "Juan", "Karen", "Luis", "Maria", "Nicolas", "Olga", "Pedro",
+    "Quentin", "Rosa", "Santiago", "Tatiana", "Ursula", "Victor", "Wendy",
+    "Ximena", "Yolanda", "Zoe",
+]  # fmt: skip
+LAST_NAMES = [
+    "Garcia", "Rodriguez", "Martinez", "Lopez", "Gonzalez", "Perez", "Sanchez",
+    "Ramirez", "Torres", "Flores", "Rivera", "Gomez", "Diaz", "Smith", "Johnson",
+    "Williams", "Brown", "Jones", "Miller", "Davis", "Wilson", "Moore",
+]  # fmt: skip
+LOCATIONS = {
+    "Colombia": ["Bogota", "Medellin", "Cali", "Barranquilla", "Cartagena"],
+    "USA": ["New York", "Los Angeles", "Chicago", "Houston", "Miami"],
+    "Mexico": ["Mexico City", "Guadalajara", "Monterrey", "Puebla"],
+    "Spain": ["Madrid", "Barcelona", "Valencia", "Seville"],
+    "Argentina": ["Buenos Aires", "Cordoba", "Rosario"],
+    "Peru": ["Lima", "Arequipa", "Cusco"],
+}
+COLUMNS = [
+    "username",
+    "hashed_password",
+    "email",
+    "full_name",
+    "age",
+    "city",
+    "country",
+    "phone_number",
+    "is_active",
+]
+INSERT_USERS = (
+    f"INSERT INTO users ({', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in COLUMNS)})"
+)
+
+
+def generate_users(start: int, count: int, hashed_password: str, rng: random.Random):
+    countries = list(LOCATIONS)
+    for index in range(start, start + count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        country = rng.choice(countries)
+        yield (
+            f"{first.lower()}.{last.lower()}{index}",
+            hashed_password,
+            f"{first.lower()}.{last.lower()}{index}@example.com",
+            f"{first} {last}",
+            rng.randint(18, 80),
+            rng.choice(LOCATIONS[country]),
+            country,
+            f"+{rng.randint(1, 99)} {rng.randint(3000000000, 3999999999)}",
+            rng.random() < 0.9,
+        )
+
+
+def seed_users(
+    url: str,
+    users: int,
+    password: str,
+    batch_size: int = 50000,
+    seed: int = 0,
+) -> int:
+    engine = create_engine(url)
+    ensure_schema(engine)
+    hashed_password = hash_password(password)
+    rng = random.Random(seed)
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        triggers = cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = 'users'"
+        ).fetchall()
+        for (name,) in triggers:
+            cursor.execute(f"DROP TRIGGER {name}")
+        # Continues after the highest id ever handed out, not only the
+        # highest one left, like AUTOINCREMENT does.
+        start = cursor.execute(
+            "SELECT MAX(IFNULL(MAX(id), 0), IFNULL((SELECT seq FROM sqlite_sequence "
+            "WHERE name = 'users'), 0)) + 1 FROM users"
+        ).fetchone()[0]
+
+        rows = generate_users(start, users, hashed_password, rng)
+        while batch := list(itertools.islice(rows, batch_size)):
+            cursor.executemany(INSERT_USERS, batch)
+        cursor.execute(USERS_FTS_REBUILD)
+        connection.commit()
+    finally:
+        connection.close()
+
+    # Recreates the dropped triggers, recomputes user_stats and logs a change
+    # of every user so running workers drop their caches.
+    ensure_schema(engine)
+    engine.dispose()
+    return users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--password", default="password", help="of every user")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    seed_users(args.database_url, args.users, args.password, args.batch_size, args.seed)
+    elapsed = time.perf_counter() - started
+    print(f"Inserted {args.users} users in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class WriteQueue:
+    """
+    Single writer thread that commits concurrent mutations together.
+
+    SQLite runs one write transaction at a time and every commit pays for a
+    sync of the WAL, so under bursts each writer mostly waits for the lock.
+    Jobs submitted with `run` are queued, the writer takes whatever is pending,
+    up to `max_batch` jobs or `max_wait` seconds after the first one, and runs
+    each job in its own SAVEPOINT inside one transaction. A failing job only
+    rolls back its savepoint and gets its own exception, the rest are
+    committed with a single COMMIT.
+    """
+
+    def __init__(self, session_factory, max_batch: int, max_wait: float):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._batches = 0
+        self._jobs = 0
+        self._failed = 0
+        self._largest_batch = 0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._loop, name="write-queue", daemon=True
+                    )
+                    self._thread.start()
+
+    def run(self, job, *args):
+        """
+        Runs `job(db, *args)` in the next batch and returns its result, or
+        raises its exception, once the batch is committed. `job` must flush
+        its changes and not commit.
+        """
+        future = Future()
+        self._queue.put((job, args, future))
+        self._ensure_started()
+        return future.result()
+
+    def _next_batch(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    item = self._queue.get(timeout=timeout)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Shutdown, finish this batch and stop afterwards.
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            self._commit(self._next_batch(item))
+
+    def _commit(self, batch: list):
+        outcomes = []
+        try:
+            with self.session_factory() as db:
+                for job, args, future in batch:
+                    try:
+                        with db.begin_nested():
+                            outcomes.append((future, job(db, *args), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+                db.commit()
+        except Exception as e:
+            # The transaction itself failed, nothing of the batch was written.
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            with self._lock:
+                self._batches += 1
+                self._jobs += len(batch)
+                self._largest_batch = max(self._largest_batch, len(batch))
+
+        for future, result, error in outcomes:
+            if error is not None:
+                with self._lock:
+                    self._failed += 1
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait": self.max_wait,
+                "pending": self._queue.qsize(),
+                "batches": self._batches,
+                "jobs": self._jobs,
+                "failed": self._failed,
+                "largest_batch": self._largest_batch,
+                "average_batch": self._jobs / self._batches if self._batches else 0,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
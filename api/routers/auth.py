@@ -1,6 +1,9 @@
 from datetime import timedelta
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.orm import Session
+from api.db.database import get_auth_db
+from api.security.admission import login_admission
 from api.security.authentication import authenticate_user
 from api.security.token import create_token
 
@@ -8,7 +11,11 @@ router = APIRouter()
 
 
 @router.post("/token", tags=["Auth and create token"])
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_auth_db),
+):
     """
     Logs in a user and generates a JSON Web Token (JWT) for access.
 
@@ -16,6 +23,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 
     - `form_data` (OAuth2PasswordRequestForm): User credentials (username and password)
       passed in the request body.
+    - `db` (Session): The database session dependency used to look up the user.
 
     **Returns:**
 
@@ -28,7 +36,9 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 
     - Exception: If user authentication fails.
     """
-    user = await authenticate_user(form_data.username, form_data.password)
+    ip = request.client.host if request.client else "unknown"
+    async with login_admission.admit(form_data.username, ip):
+        user = await authenticate_user(db, form_data.username, form_data.password)
     access_token_expires = timedelta(minutes=30)
     access_token_jwt = create_token({"sub": user.username}, access_token_expires)
     return {"access_token": access_token_jwt, "token_type": "bearer"}
@@ -0,0 +1,247 @@
+import os
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from api.db.database import database
+from api.db.models import User
+from api.security.authentication import get_user_disabled_current
+from api.security.admission import login_admission
+from api.security.hashing import hash_pool
+from api.security.principal_cache import principal_cache
+from api.utils.cache_sync import cache_sync
+from api.utils.metrics import metrics
+from api.utils.page_cache import page_cache
+from api.utils.workers import read_worker_states, worker_heartbeat
+from core.config import WORKER_STATE_DIR, WRITE_QUEUE_ENABLED
+
+router = APIRouter()
+metrics_router = APIRouter()
+
+
+@router.get("/system/hash-pool", tags=["System"])
+def hash_pool_stats(user: User = Depends(get_user_disabled_current)):
+    """
+    Reports the utilization of the password hashing worker pool.
+
+    **Parameters:**
+
+    - `user` (User): The authenticated user object obtained from the dependency.
+
+    **Returns:**
+
+    A dictionary containing:
+
+    - `size` (int): Number of worker processes.
+    - `queue_limit` (int): Maximum number of requests allowed to wait for a worker.
+    - `busy` (int): Workers currently hashing or verifying a password.
+    - `queued` (int): Requests waiting for a free worker.
+    - `utilization` (float): Fraction of busy workers, between 0 and 1.
+    - `completed` (int): Operations finished since startup.
+    - `rejected` (int): Requests rejected because the queue was full.
+    """
+    return hash_pool.stats()
+
+
+@router.get("/system/principal-cache", tags=["System"])
+def principal_cache_stats(user: User = Depends(get_user_disabled_current)):
+    """
+    Reports the state of the authenticated principal cache.
+
+    **Parameters:**
+
+    - `user` (User): The authenticated user object obtained from the dependency.
+
+    **Returns:**
+
+    A dictionary containing:
+
+    - `size` (int): Tokens currently cached.
+    - `maxsize` (int): Maximum number of cached tokens.
+    - `ttl` (float): Seconds a cached token is trusted.
+    - `hits` (int): Requests authenticated from the cache.
+    - `misses` (int): Requests that had to decode the token and load the user.
+    - `evictions` (int): Entries dropped to stay within `maxsize`.
+    - `stale_puts` (int): Users loaded while they changed, not cached.
+    - `hit_ratio` (float): Hits over total lookups.
+    """
+    return principal_cache.stats()
+
+
+@router.get("/system/page-cache", tags=["System"])
+def page_cache_stats(user: User = Depends(get_user_disabled_current)):
+    """
+    Reports the state of the user list page cache.
+
+    **Parameters:**
+
+    - `user` (User): The authenticated user object obtained from the dependency.
+
+    **Returns:**
+
+    A dictionary containing:
+
+    - `size` (int): Pages currently cached.
+    - `maxsize` (int): Maximum number of cached pages, 0 when the cache is disabled.
+    - `bytes` (int): Size of the cached pages.
+    - `max_bytes` (int): Maximum size of the cached pages.
+    - `oversized` (int): Pages larger than a sixteenth of `max_bytes`, not cached.
+    - `generation` (int): Number of times the cache was invalidated by a write.
+    - `hits` (int): List requests served from the cache.
+    - `misses` (int): List requests that had to query the database.
+    - `hit_ratio` (float): Hits over total lookups.
+    """
+    return page_cache.stats()
+
+
+@router.get("/system/cache-sync", tags=["System"])
+def cache_sync_stats(user: User = Depends(get_user_disabled_current)):
+    """
+    Reports how this process follows the writes made by other processes.
+
+    **Parameters:**
+
+    - `user` (User): The authenticated user object obtained from the dependency.
+
+    **Returns:**
+
+    A dictionary containing:
+
+    - `interval` (float): Seconds between two checks of `user_changes`.
+    - `running` (bool): Whether the background check is running.
+    - `last_seq` (int): Last entry of `user_changes` applied to the caches.
+    - `polls` (int): Checks since startup.
+    - `changes` (int): Entries applied since startup.
+    - `resets` (int): Times every cached principal was dropped, after a seed or
+      after falling behind `CACHE_SYNC_RETENTION` entries.
+    - `trims` (int): Times this process deleted old entries of `user_changes`.
+    - `errors` (int): Checks that failed, for example on a locked database.
+    """
+    return cache_sync.stats()
+
+
+@router.get("/system/workers", tags=["System"])
+def workers_stats(user: User = Depends(get_user_disabled_current)):
+    """
+    Reports the health of every worker process.
+
+    **Parameters:**
+
+    - `user` (User): The authenticated user object obtained from the dependency.
+
+    **Returns:**
+
+    A dictionary containing:
+
+    - `pid` (int): Worker that answered this request.
+    - `workers` (list): One entry per worker with its `pid`, `started_at` and
+      `heartbeat_at` (unix time), `requests_in_flight`, `requests_served`,
+      `page_cache_generation` and `cache_sync_last_seq`.
+
+    **Notes:**
+
+    - Under `python -m api.server` the list holds every worker started by the
+      supervisor, as of their last heartbeat. Otherwise it only holds this process.
+    """
+    if WORKER_STATE_DIR:
+        workers = read_worker_states(WORKER_STATE_DIR)
+    else:
+        workers = [worker_heartbeat.state()]
+    return {"pid": os.getpid(), "workers": workers}
+
+
+@router.get("/system/login-admission", tags=["System"])
+def login_admission_stats(user: User = Depends(get_user_disabled_current)):
+    """
+    Reports the state of the login admission controller.
+
+    **Parameters:**
+
+    - `user` (User): The authenticated user object obtained from the dependency.
+
+    **Returns:**
+
+    A dictionary containing:
+
+    - `max_concurrency` (int): Logins allowed to verify a password at once.
+    - `queue_limit` (int): Logins allowed to wait for a slot.
+    - `active` (int): Logins verifying a password.
+    - `queued` (int): Logins waiting for a slot.
+    - `admitted` (int): Logins let through since startup.
+    - `rejected_busy` (int): Logins answered with `503` because every slot and the
+      queue were taken, or the wait timed out.
+    - `rejected_rate_limited` (int): Logins answered with `429` after too many
+      failed attempts for their username or address.
+    - `timed_out` (int): Logins that waited `LOGIN_QUEUE_TIMEOUT` without a slot.
+    - `tracked_usernames` and `tracked_ips` (int): Rate limit buckets in memory.
+    """
+    return login_admission.stats()
+
+
+@router.get("/system/write-queue", tags=["System"])
+def write_queue_stats(user: User = Depends(get_user_disabled_current)):
+    """
+    Reports how user writes are being grouped by the write queue.
+
+    **Parameters:**
+
+    - `user` (User): The authenticated user object obtained from the dependency.
+
+    **Returns:**
+
+    A dictionary containing:
+
+    - `enabled` (bool): Whether `WRITE_QUEUE_ENABLED` is set, the other keys are
+      only present when it is.
+    - `max_batch` (int): Maximum number of writes committed together.
+    - `max_wait` (float): Seconds the writer waits for more writes after the first.
+    - `pending` (int): Writes waiting for the writer.
+    - `batches` (int): Transactions committed since startup.
+    - `jobs` (int): Writes processed since startup.
+    - `failed` (int): Writes rolled back on their own, for example duplicates.
+    - `largest_batch` (int): Most writes committed in one transaction.
+    - `average_batch` (float): Writes per transaction.
+    """
+    if not WRITE_QUEUE_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, **database.write_queue.stats()}
+
+
+@metrics_router.get("/metrics", tags=["System"], response_class=PlainTextResponse)
+def metrics_service():
+    """
+    Exposes request, database and password hashing metrics for Prometheus.
+
+    **Returns:**
+
+    The metrics in the Prometheus text exposition format:
+
+    - `http_request_duration_seconds` (histogram): Request latency by `method`,
+      `route` template and `status`.
+    - `http_requests_in_flight` (gauge): Requests being served, by `method`.
+    - `operation_duration_seconds` (histogram): Time spent per `operation`, `db` for
+      SQL statements, `jwt_encode` and `jwt_decode` for tokens and `password_*` for
+      password hashing and verification.
+    - `hash_pool_*`, `principal_cache_*`, `page_cache_*`, `cache_sync_*` and
+      `login_admission_*` (gauge): The figures reported by the matching
+      `/api/system/...` endpoints.
+
+    **Notes:**
+
+    - This endpoint is not authenticated so it can be scraped, do not expose it
+      publicly.
+    - Set `METRICS_SERVER_TIMING=true` to also get the per-request breakdown in a
+      `Server-Timing` response header.
+    """
+    gauges = {
+        **{f"hash_pool_{name}": value for name, value in hash_pool.stats().items()},
+        **{
+            f"principal_cache_{name}": value
+            for name, value in principal_cache.stats().items()
+        },
+        **{f"page_cache_{name}": value for name, value in page_cache.stats().items()},
+        **{f"cache_sync_{name}": value for name, value in cache_sync.stats().items()},
+        **{
+            f"login_admission_{name}": value
+            for name, value in login_admission.stats().items()
+        },
+    }
+    return metrics.render(gauges)
@@ -1,22 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from api.controllers.user import (
     create_user,
     delete_user,
     get_all_users,
+    get_user_etag,
+    get_user_fields,
     get_user_id,
+    get_users_etag,
+    get_users_page,
     patch_user,
     update_user,
 )
 from api.db.database import get_db
 from api.db.models import User
-from api.schemas.user import UserSchema, UserUpdateSchema
+from api.schemas.user import (
+    UserDeleteResponse,
+    UserRead,
+    UserResponse,
+    UserSchema,
+    UserSearchSchema,
+    UserUpdateSchema,
+)
 from api.security.authentication import get_user_disabled_current
+from api.security.hashing import hash_pool
+from api.utils.etag import etag_matches, if_match_versions, not_modified, user_etag
+from api.utils.fields import parse_fields
+from api.utils.page_cache import ListPage
+from api.utils.serialization import json_response, serialize_user
 
 router = APIRouter()
 
 
-@router.get("/users/me", tags=["Users"])
+@router.get("/users/me", tags=["Users"], response_model=UserRead)
 def user(user: User = Depends(get_user_disabled_current)):
     """
     Retrieves the currently authenticated user's information.
@@ -36,15 +54,20 @@ def user(user: User = Depends(get_user_disabled_current)):
     **Notes:**
 
     - This endpoint requires a valid access token in the authorization header for authentication.
-    - The specific user information returned depends on the structure of your `User` model.
+    - The response follows the `UserRead` schema, the password hash is never returned.
     """
     return user
 
 
-@router.get("/users/", tags=["Users"])
+@router.get("/users/", tags=["Users"], response_model=UserResponse)
 def get_users(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    fields: Optional[str] = None,
+    filters: UserSearchSchema = Depends(),
+    if_none_match: Optional[str] = Header(None),
     user: User = Depends(get_user_disabled_current),
     db: Session = Depends(get_db),
 ):
@@ -55,19 +78,56 @@ def get_users(
 
     - `skip` (int, optional): Number of users to skip in the results (defaults to 0).
     - `limit` (int, optional): Maximum number of users to return (defaults to 100).
+    - `cursor` (str, optional): Opaque cursor for keyset pagination. Send it empty
+      (`?cursor=`) to request the first page, then pass the `next_cursor` of each
+      response to get the following one. When present, `skip` is ignored.
+    - `include_total` (bool, optional): Include the total number of users (defaults to False).
+    - `fields` (str, optional): Comma separated user attributes to return, for example
+      `id,username,is_active`. Returns every attribute when omitted.
+    - `filters` (UserSearchSchema, optional): Only return users matching every given filter:
+        - `country` and `city` (str): Exact match.
+        - `min_age` and `max_age` (int): Inclusive age range.
+        - `q` (str): Words found at the start of words of the full name, username or email,
+          for example `ana gar` finds "Ana Garcia".
+    - `if_none_match` (str, optional): ETag of a previous response, answered with
+      `304 Not Modified` when the page did not change.
     - `user` (User): The authenticated user object obtained from the dependency.
     - `db` (Session): The database session dependency for interacting with the database.
 
     **Returns:**
 
     A list of dictionaries, where each dictionary represents a user object.
-    """
-    return get_all_users(db, skip, limit)
+    In cursor mode the response also contains `next_cursor`, which is null on the last page.
+    When `fields` is given each user only contains the requested attributes and `id`.
 
+    **Notes:**
 
-@router.get("/users/{user_id}", tags=["Users"])
+    - Cursor pagination costs the same for every page, while `skip` has to walk
+      over all the skipped rows, so prefer it for deep pages.
+    - Serialized pages are cached in memory and dropped on every write to users.
+    """
+    fields = parse_fields(fields)
+    page = ListPage(skip, cursor, limit, include_total, fields, filters, if_none_match)
+    cached = page.cached()
+    if cached is not None:
+        return cached
+
+    etag = get_users_etag(db, skip, cursor, limit, include_total, fields, filters)
+    unchanged = page.not_modified(etag)
+    if unchanged is not None:
+        return unchanged
+    if cursor is not None:
+        response = get_users_page(db, cursor, limit, include_total, fields, filters)
+    else:
+        response = get_all_users(db, skip, limit, include_total, fields, filters)
+    return page.store(response, etag)
+
+
+@router.get("/users/{user_id}", tags=["Users"], response_model=UserRead)
 def get_user(
     user_id: int,
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
     user: User = Depends(get_user_disabled_current),
     db: Session = Depends(get_db),
 ):
@@ -77,18 +137,31 @@ def get_user(
     **Parameters:**
 
     - `user_id` (int): The unique identifier of the user to retrieve.
+    - `fields` (str, optional): Comma separated user attributes to return, for example
+      `id,username,is_active`. Returns every attribute when omitted.
+    - `if_none_match` (str, optional): ETag of a previous response, answered with
+      `304 Not Modified` when the user did not change.
     - `user` (User): The authenticated user object obtained from the dependency.
     - `db` (Session): The database session dependency for interacting with the database.
 
     **Returns:**
 
     A dictionary representing the requested user, or None if the user does not exist.
+    The `ETag` header can be sent back in `If-Match` to update the user safely.
     """
-    return get_user_id(db, user_id)
-
-
-@router.post("/users/", tags=["Users"])
-def create_user_service(
+    fields = parse_fields(fields)
+    etag = get_user_etag(db, user_id, fields)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    if fields is not None:
+        _user = get_user_fields(db, user_id, fields)
+    else:
+        _user = get_user_id(db, user_id)
+    return json_response(serialize_user(_user, fields), etag)
+
+
+@router.post("/users/", tags=["Users"], response_model=UserRead)
+async def create_user_service(
     request: UserSchema,
     user: User = Depends(get_user_disabled_current),
     db: Session = Depends(get_db),
@@ -108,13 +181,16 @@ def create_user_service(
     A dictionary representing the newly created user object.
 
     """
-    return create_user(db, user=request)
+    hashed_password = await hash_pool.hash(request.hashed_password)
+    return await run_in_threadpool(create_user, db, request, hashed_password)
 
 
-@router.put("/users/{user_id}", tags=["Users"])
-async def update_user_service(
+@router.put("/users/{user_id}", tags=["Users"], response_model=UserRead)
+def update_user_service(
     user_id: str,
     user_update: UserUpdateSchema,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     user: User = Depends(get_user_disabled_current),
     db: Session = Depends(get_db),
 ):
@@ -126,6 +202,8 @@ async def update_user_service(
     - `user_id` (str): The unique identifier of the user to update.
     - `user_update` (UserUpdateSchema): A dictionary containing updated user data,
       validated against the `UserUpdateSchema` model.
+    - `if_match` (str, optional): ETag of the user as last read, the update fails with
+      `412 Precondition Failed` if the user changed since then.
     - `user` (User): The authenticated user object obtained from the dependency.
     - `db` (Session): The database session dependency for interacting with the database.
 
@@ -137,13 +215,17 @@ async def update_user_service(
     - The request body should be formatted according to the `UserUpdateSchema` definition.
     - Using PUT method replaces all user data with the provided information.
     """
-    return update_user(db, user_id, user_update)
+    _user = update_user(db, user_id, user_update, if_match_versions(if_match, user_id))
+    response.headers["ETag"] = user_etag(_user.id, _user.version)
+    return _user
 
 
-@router.patch("/users/{user_id}", tags=["Users"])
+@router.patch("/users/{user_id}", tags=["Users"], response_model=UserRead)
 def patch_user_service(
     user_id: int,
     user_update: UserUpdateSchema,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     user: User = Depends(get_user_disabled_current),
     db: Session = Depends(get_db),
 ):
@@ -155,6 +237,8 @@ def patch_user_service(
     - `user_id` (int): The unique identifier of the user to update.
     - `user_update` (UserUpdateSchema): A dictionary containing updated user data,
       validated against the `UserUpdateSchema` model. Only provided fields will be updated.
+    - `if_match` (str, optional): ETag of the user as last read, the update fails with
+      `412 Precondition Failed` if the user changed since then.
     - `user` (User): The authenticated user object obtained from the dependency.
     - `db` (Session): The database session dependency for interacting with the database.
 
@@ -165,10 +249,12 @@ def patch_user_service(
       Only fields included in the request body will be updated.
     - Using PATCH method allows for partial updates of user data.
     """
-    return patch_user(db, user_id, user_update)
+    _user = patch_user(db, user_id, user_update, if_match_versions(if_match, user_id))
+    response.headers["ETag"] = user_etag(_user.id, _user.version)
+    return _user
 
 
-@router.delete("/users/{user_id}", tags=["Users"])
+@router.delete("/users/{user_id}", tags=["Users"], response_model=UserDeleteResponse)
 def delete_user_service(
     user_id: int,
     user: User = Depends(get_user_disabled_current),
@@ -0,0 +1,286 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.controllers.user_async import (
+    create_user,
+    delete_user,
+    get_all_users,
+    get_user_etag,
+    get_user_fields,
+    get_user_id,
+    get_users_etag,
+    get_users_page,
+    patch_user,
+    update_user,
+)
+from api.db.database import get_async_db
+from api.db.models import User
+from api.schemas.user import (
+    UserDeleteResponse,
+    UserRead,
+    UserResponse,
+    UserSchema,
+    UserSearchSchema,
+    UserUpdateSchema,
+)
+from api.security.authentication import get_user_disabled_current
+from api.security.hashing import hash_pool
+from api.utils.etag import etag_matches, if_match_versions, not_modified, user_etag
+from api.utils.fields import parse_fields
+from api.utils.page_cache import ListPage
+from api.utils.serialization import json_response, serialize_user
+
+router = APIRouter()
+
+
+@router.get("/users/me", tags=["Users"], response_model=UserRead)
+def user(user: User = Depends(get_user_disabled_current)):
+    """
+    Retrieves the currently authenticated user's information.
+
+    **Parameters:**
+
+    - `user` (User): The authenticated user object obtained from the dependency.
+
+    **Returns:**
+
+    A dictionary representation of the user object, containing relevant user information.
+
+    **Raises:**
+
+    - Exception: If user authentication fails or the user is disabled.
+
+    **Notes:**
+
+    - This endpoint requires a valid access token in the authorization header for authentication.
+    - The response follows the `UserRead` schema, the password hash is never returned.
+    """
+    return user
+
+
+@router.get("/users/", tags=["Users"], response_model=UserResponse)
+async def get_users(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    fields: Optional[str] = None,
+    filters: UserSearchSchema = Depends(),
+    if_none_match: Optional[str] = Header(None),
+    user: User = Depends(get_user_disabled_current),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Retrieves a paginated list of users.
+
+    **Parameters:**
+
+    - `skip` (int, optional): Number of users to skip in the results (defaults to 0).
+    - `limit` (int, optional): Maximum number of users to return (defaults to 100).
+    - `cursor` (str, optional): Opaque cursor for keyset pagination. Send it empty
+      (`?cursor=`) to request the first page, then pass the `next_cursor` of each
+      response to get the following one. When present, `skip` is ignored.
+    - `include_total` (bool, optional): Include the total number of users (defaults to False).
+    - `fields` (str, optional): Comma separated user attributes to return, for example
+      `id,username,is_active`. Returns every attribute when omitted.
+    - `filters` (UserSearchSchema, optional): Only return users matching every given filter:
+        - `country` and `city` (str): Exact match.
+        - `min_age` and `max_age` (int): Inclusive age range.
+        - `q` (str): Words found at the start of words of the full name, username or email,
+          for example `ana gar` finds "Ana Garcia".
+    - `if_none_match` (str, optional): ETag of a previous response, answered with
+      `304 Not Modified` when the page did not change.
+    - `user` (User): The authenticated user object obtained from the dependency.
+    - `db` (AsyncSession): The database session dependency for interacting with the database.
+
+    **Returns:**
+
+    A list of dictionaries, where each dictionary represents a user object.
+    In cursor mode the response also contains `next_cursor`, which is null on the last page.
+    When `fields` is given each user only contains the requested attributes and `id`.
+
+    **Notes:**
+
+    - Cursor pagination costs the same for every page, while `skip` has to walk
+      over all the skipped rows, so prefer it for deep pages.
+    - Serialized pages are cached in memory and dropped on every write to users.
+    """
+    fields = parse_fields(fields)
+    page = ListPage(skip, cursor, limit, include_total, fields, filters, if_none_match)
+    cached = page.cached()
+    if cached is not None:
+        return cached
+
+    etag = await get_users_etag(db, skip, cursor, limit, include_total, fields, filters)
+    unchanged = page.not_modified(etag)
+    if unchanged is not None:
+        return unchanged
+    if cursor is not None:
+        response = await get_users_page(
+            db, cursor, limit, include_total, fields, filters
+        )
+    else:
+        response = await get_all_users(db, skip, limit, include_total, fields, filters)
+    return page.store(response, etag)
+
+
+@router.get("/users/{user_id}", tags=["Users"], response_model=UserRead)
+async def get_user(
+    user_id: int,
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    user: User = Depends(get_user_disabled_current),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Retrieves a specific user by their ID.
+
+    **Parameters:**
+
+    - `user_id` (int): The unique identifier of the user to retrieve.
+    - `fields` (str, optional): Comma separated user attributes to return, for example
+      `id,username,is_active`. Returns every attribute when omitted.
+    - `if_none_match` (str, optional): ETag of a previous response, answered with
+      `304 Not Modified` when the user did not change.
+    - `user` (User): The authenticated user object obtained from the dependency.
+    - `db` (AsyncSession): The database session dependency for interacting with the database.
+
+    **Returns:**
+
+    A dictionary representing the requested user, or None if the user does not exist.
+    The `ETag` header can be sent back in `If-Match` to update the user safely.
+    """
+    fields = parse_fields(fields)
+    etag = await get_user_etag(db, user_id, fields)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    if fields is not None:
+        _user = await get_user_fields(db, user_id, fields)
+    else:
+        _user = await get_user_id(db, user_id)
+    return json_response(serialize_user(_user, fields), etag)
+
+
+@router.post("/users/", tags=["Users"], response_model=UserRead)
+async def create_user_service(
+    request: UserSchema,
+    user: User = Depends(get_user_disabled_current),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Creates a new user in the database.
+
+    **Parameters:**
+
+    - `request` (UserSchema): A dictionary containing user data to be created,
+      validated against the `UserSchema` model.
+    - `user` (User): The authenticated user object obtained from the dependency.
+    - `db` (AsyncSession): The database session dependency for interacting with the database.
+
+    **Returns:**
+
+    A dictionary representing the newly created user object.
+
+    """
+    hashed_password = await hash_pool.hash(request.hashed_password)
+    return await create_user(db, request, hashed_password)
+
+
+@router.put("/users/{user_id}", tags=["Users"], response_model=UserRead)
+async def update_user_service(
+    user_id: str,
+    user_update: UserUpdateSchema,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    user: User = Depends(get_user_disabled_current),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Updates a user's information in the database (using PUT method for full replacement).
+
+    **Parameters:**
+
+    - `user_id` (str): The unique identifier of the user to update.
+    - `user_update` (UserUpdateSchema): A dictionary containing updated user data,
+      validated against the `UserUpdateSchema` model.
+    - `if_match` (str, optional): ETag of the user as last read, the update fails with
+      `412 Precondition Failed` if the user changed since then.
+    - `user` (User): The authenticated user object obtained from the dependency.
+    - `db` (AsyncSession): The database session dependency for interacting with the database.
+
+    **Notes:**
+
+    - This endpoint requires a valid access token in the authorization header for authentication.
+    - Users with appropriate permissions can update user information. Access control logic
+      may be implemented based on your specific requirements.
+    - The request body should be formatted according to the `UserUpdateSchema` definition.
+    - Using PUT method replaces all user data with the provided information.
+    """
+    _user = await update_user(
+        db, user_id, user_update, if_match_versions(if_match, user_id)
+    )
+    response.headers["ETag"] = user_etag(_user.id, _user.version)
+    return _user
+
+
+@router.patch("/users/{user_id}", tags=["Users"], response_model=UserRead)
+async def patch_user_service(
+    user_id: int,
+    user_update: UserUpdateSchema,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    user: User = Depends(get_user_disabled_current),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Updates specific fields of a user's information in the database (using PATCH method for partial updates).
+
+    **Parameters:**
+
+    - `user_id` (int): The unique identifier of the user to update.
+    - `user_update` (UserUpdateSchema): A dictionary containing updated user data,
+      validated against the `UserUpdateSchema` model. Only provided fields will be updated.
+    - `if_match` (str, optional): ETag of the user as last read, the update fails with
+      `412 Precondition Failed` if the user changed since then.
+    - `user` (User): The authenticated user object obtained from the dependency.
+    - `db` (AsyncSession): The database session dependency for interacting with the database.
+
+    **Notes:**
+
+    - This endpoint requires a valid access token in the authorization header for authentication.
+    - The request body should be formatted according to the `UserUpdateSchema` definition.
+      Only fields included in the request body will be updated.
+    - Using PATCH method allows for partial updates of user data.
+    """
+    _user = await patch_user(
+        db, user_id, user_update, if_match_versions(if_match, user_id)
+    )
+    response.headers["ETag"] = user_etag(_user.id, _user.version)
+    return _user
+
+
+@router.delete("/users/{user_id}", tags=["Users"], response_model=UserDeleteResponse)
+async def delete_user_service(
+    user_id: int,
+    user: User = Depends(get_user_disabled_current),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Deletes a user from the database.
+
+    **Parameters:**
+
+    - `user_id` (int): The unique identifier of the user to delete.
+    - `user` (User): The authenticated user object obtained from the dependency.
+    - `db` (AsyncSession): The database session dependency for interacting with the database.
+
+    **Returns:**
+
+    None if the user is deleted successfully, or a dictionary with an error message
+    if deletion fails.
+
+    **Raises:**
+
+    - Exception: If user authentication fails, the user is disabled, or user deletion fails.
+    """
+    return await delete_user(db, user_id)
@@ -0,0 +1,248 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from api.controllers.user import (
+    bulk_delete_users,
+    bulk_patch_users,
+    export_users,
+    get_user_stats,
+    get_users_by_ids,
+    import_users,
+)
+from api.db.database import get_db
+from api.db.models import User
+from api.schemas.user import (
+    UserBulkDeleteSchema,
+    UserBulkPatchSchema,
+    UserBulkResponse,
+    UserImportResponse,
+    UserLookupResponse,
+    UserLookupSchema,
+    UserStatsResponse,
+)
+from api.security.authentication import get_user_disabled_current
+from api.utils.exception_handler import exception_handler
+from api.utils.exporters import EXPORT_MEDIA_TYPES
+from api.utils.fields import parse_fields
+from api.utils.importers import import_format
+from api.utils.serialization import json_response, serialize_user_lookup
+from core.config import (
+    BULK_CHUNK_SIZE,
+    EXPORT_CHUNK_SIZE,
+    IMPORT_BATCH_SIZE,
+    LOOKUP_MAX_IDS,
+)
+
+# Users routes outside of the sync/async comparison, served with the sync
+# Session whatever DB_DRIVER selects. Included before the users router so its
+# fixed paths win over `/users/{user_id}`.
+router = APIRouter()
+
+
+@router.get("/users/stats", tags=["Users"], response_model=UserStatsResponse)
+def get_users_stats(
+    user: User = Depends(get_user_disabled_current),
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieves the number of users, in total and grouped by country, city and status.
+
+    **Parameters:**
+
+    - `user` (User): The authenticated user object obtained from the dependency.
+    - `db` (Session): The database session dependency for interacting with the database.
+
+    **Returns:**
+
+    A dictionary containing:
+
+    - `total` (int): Number of users.
+    - `country`, `city` and `is_active` (list): Groups with their `value` and `count`,
+      largest first. Users without a value are counted under `null`.
+
+    **Notes:**
+
+    - Counts are kept in the `user_stats` table, updated in the same transaction as
+      every insert, update and delete on users, so this endpoint reads one row per group
+      instead of scanning the users table.
+    """
+    return get_user_stats(db)
+
+
+@router.get("/users/export", tags=["Users"])
+def export_users_service(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    user: User = Depends(get_user_disabled_current),
+    db: Session = Depends(get_db),
+):
+    """
+    Exports every user as a stream of NDJSON lines or CSV rows.
+
+    **Parameters:**
+
+    - `format` (str, optional): `ndjson` (defaults) or `csv`.
+    - `user` (User): The authenticated user object obtained from the dependency.
+    - `db` (Session): The database session dependency for interacting with the database.
+
+    **Returns:**
+
+    A streamed file with the `user_view` columns of every user, ordered by id.
+
+    **Notes:**
+
+    - Rows are read with a server side cursor and sent as they are read, so memory
+      use does not grow with the number of users.
+    """
+    return StreamingResponse(
+        export_users(db, format, EXPORT_CHUNK_SIZE),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+    )
+
+
+@router.post("/users/lookup", tags=["Users"], response_model=UserLookupResponse)
+def lookup_users(
+    request: UserLookupSchema,
+    fields: Optional[str] = None,
+    user: User = Depends(get_user_disabled_current),
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieves many users by their IDs in one request.
+
+    **Parameters:**
+
+    - `request` (UserLookupSchema): A dictionary containing:
+        - `ids` (list): Ids of the users to retrieve, it can not be empty and can
+          contain up to `LOOKUP_MAX_IDS` ids (1000 by default).
+    - `fields` (str, optional): Comma separated user attributes to return, for example
+      `id,username,is_active`. Returns every attribute when omitted.
+    - `user` (User): The authenticated user object obtained from the dependency.
+    - `db` (Session): The database session dependency for interacting with the database.
+
+    **Returns:**
+
+    A dictionary containing:
+
+    - `result` (dict): Every requested id, in request order, mapped to its user or
+      to null when it does not exist.
+    - `not_found` (list): The requested ids that do not exist.
+
+    **Notes:**
+
+    - Meant to resolve lists such as `users_ids` in one round trip instead of one
+      `GET /users/{user_id}` per id. Ids are read with one `IN` query per chunk of
+      `BULK_CHUNK_SIZE` ids.
+    """
+    if len(request.ids) > LOOKUP_MAX_IDS:
+        raise exception_handler("422_TOO_MANY_IDS")
+    fields = parse_fields(fields)
+    response = get_users_by_ids(db, request.ids, fields, BULK_CHUNK_SIZE)
+    return json_response(serialize_user_lookup(response, fields))
+
+
+@router.post(
+    "/users/import",
+    tags=["Users"],
+    response_model=UserImportResponse,
+    response_model_exclude_none=True,
+)
+async def import_users_service(
+    request: Request,
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=5000),
+    user: User = Depends(get_user_disabled_current),
+    db: Session = Depends(get_db),
+):
+    """
+    Creates many users at once from an NDJSON or CSV body.
+
+    **Parameters:**
+
+    - `request` (Request): The body is read as a stream, one user per line.
+      Send it as `application/x-ndjson` (one JSON object per line) or `text/csv`
+      (a header row followed by one user per line), using the `UserSchema` fields.
+    - `batch_size` (int, optional): Users inserted per transaction (defaults to 500).
+    - `user` (User): The authenticated user object obtained from the dependency.
+    - `db` (Session): The database session dependency for interacting with the database.
+
+    **Returns:**
+
+    A dictionary containing:
+
+    - `created` (int): Number of users created.
+    - `failed` (int): Number of lines rejected.
+    - `results` (list): One entry per line with its `status`, plus the new `id`
+      or the error `detail`.
+
+    **Notes:**
+
+    - Invalid lines or duplicated usernames and emails are reported in `results`
+      and do not abort the rest of the import.
+    - Passwords are hashed in parallel by the password hashing pool.
+    """
+    format = import_format(request.headers.get("content-type", ""))
+    return await import_users(db, request.stream(), format, batch_size)
+
+
+@router.patch("/users/bulk", tags=["Users"], response_model=UserBulkResponse)
+def bulk_patch_users_service(
+    request: UserBulkPatchSchema,
+    user: User = Depends(get_user_disabled_current),
+    db: Session = Depends(get_db),
+):
+    """
+    Updates the same fields of many users at once.
+
+    **Parameters:**
+
+    - `request` (UserBulkPatchSchema): A dictionary containing:
+        - `ids` (list): Ids of the users to update, it can not be empty.
+        - `filter` (UserFilterSchema, optional): Only users of `ids` that also match
+          every given `city`, `country` and `is_active` value are updated.
+        - `changes` (UserUpdateSchema): Fields to update, only provided fields are changed.
+    - `user` (User): The authenticated user object obtained from the dependency.
+    - `db` (Session): The database session dependency for interacting with the database.
+
+    **Returns:**
+
+    A dictionary with the `affected_ids` of the users that were updated.
+
+    **Notes:**
+
+    - Ids are updated with set based statements, one transaction per chunk of
+      `BULK_CHUNK_SIZE` ids (500 by default).
+    """
+    return bulk_patch_users(
+        db, request.ids, request.changes, request.filter, BULK_CHUNK_SIZE
+    )
+
+
+@router.delete("/users/bulk", tags=["Users"], response_model=UserBulkResponse)
+def bulk_delete_users_service(
+    request: UserBulkDeleteSchema,
+    user: User = Depends(get_user_disabled_current),
+    db: Session = Depends(get_db),
+):
+    """
+    Deletes many users at once.
+
+    **Parameters:**
+
+    - `request` (UserBulkDeleteSchema): A dictionary containing:
+        - `ids` (list): Ids of the users to delete, it can not be empty.
+        - `filter` (UserFilterSchema, optional): Only users of `ids` that also match
+          every given `city`, `country` and `is_active` value are deleted.
+    - `user` (User): The authenticated user object obtained from the dependency.
+    - `db` (Session): The database session dependency for interacting with the database.
+
+    **Returns:**
+
+    A dictionary with the `affected_ids` of the users that were deleted.
+
+    **Notes:**
+
+    - Ids are deleted with set based statements, one transaction per chunk of
+      `BULK_CHUNK_SIZE` ids (500 by default).
+    """
+    return bulk_delete_users(db, request.ids, request.filter, BULK_CHUNK_SIZE)
@@ -1,5 +1,5 @@
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+from typing import Dict, Optional, List
+from pydantic import BaseModel, ConfigDict
 
 
 class UserSchema(BaseModel):
@@ -14,10 +14,31 @@ class UserSchema(BaseModel):
     is_active: bool = True
 
 
+class UserRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    username: str
+    email: str
+    full_name: Optional[str] = None
+    age: Optional[int] = None
+    city: Optional[str] = None
+    country: Optional[str] = None
+    phone_number: Optional[str] = None
+    is_active: Optional[bool] = None
+
+
 class UserResponse(BaseModel):
     message: str
-    user_ids: List[int]
-    result: List[Dict[UserSchema, Any]]
+    users_ids: List[int]
+    result: List[UserRead]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
+class UserDeleteResponse(BaseModel):
+    message: str
+    user_deleted: UserRead
 
 
 class UserUpdateSchema(BaseModel):
@@ -29,3 +50,74 @@ class UserUpdateSchema(BaseModel):
     country: Optional[str] = None
     phone_number: Optional[str] = None
     is_active: Optional[bool] = None
+
+
+class UserFilterSchema(BaseModel):
+    city: Optional[str] = None
+    country: Optional[str] = None
+    is_active: Optional[bool] = None
+
+
+class UserSearchSchema(BaseModel):
+    city: Optional[str] = None
+    country: Optional[str] = None
+    min_age: Optional[int] = None
+    max_age: Optional[int] = None
+    q: Optional[str] = None
+
+
+class UserBulkPatchSchema(BaseModel):
+    ids: List[int]
+    filter: Optional[UserFilterSchema] = None
+    changes: UserUpdateSchema
+
+
+class UserBulkDeleteSchema(BaseModel):
+    ids: List[int]
+    filter: Optional[UserFilterSchema] = None
+
+
+class UserLookupSchema(BaseModel):
+    ids: List[int]
+
+
+class UserLookupResponse(BaseModel):
+    message: str
+    result: Dict[int, Optional[UserRead]]
+    not_found: List[int]
+
+
+class UserBulkResponse(BaseModel):
+    message: str
+    affected_ids: List[int]
+
+
+class UserImportResult(BaseModel):
+    line: int
+    status: str
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class UserImportResponse(BaseModel):
+    message: str
+    created: int
+    failed: int
+    results: List[UserImportResult]
+
+
+class UserStatsGroup(BaseModel):
+    value: Optional[str] = None
+    count: int
+
+
+class UserActiveStatsGroup(BaseModel):
+    value: Optional[bool] = None
+    count: int
+
+
+class UserStatsResponse(BaseModel):
+    total: int
+    country: List[UserStatsGroup]
+    city: List[UserStatsGroup]
+    is_active: List[UserActiveStatsGroup]
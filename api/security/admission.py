@@ -0,0 +1,187 @@
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+from api.utils.exception_handler import exception_handler
+from core.config import (
+    LOGIN_IP_BURST,
+    LOGIN_IP_RATE,
+    LOGIN_MAX_CONCURRENCY,
+    LOGIN_QUEUE_LIMIT,
+    LOGIN_QUEUE_TIMEOUT,
+    LOGIN_USER_BURST,
+    LOGIN_USER_RATE,
+)
+
+
+class TokenBuckets:
+    """
+    Token bucket per key, holding at most `burst` tokens refilled at `rate`
+    tokens per second. Only the `maxsize` most recently used keys are kept, a
+    forgotten key starts again with a full bucket.
+    """
+
+    def __init__(self, burst: float, rate: float, maxsize: int = 100000):
+        self.burst = burst
+        self.rate = rate
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tokens(self, key: str, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def wait(self, key: str) -> float:
+        """Seconds until `key` has a token, 0 when it has one now."""
+        with self._lock:
+            tokens = self._tokens(key, time.monotonic())
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def take(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(key, now)
+            self._buckets.pop(key, None)
+            self._buckets[key] = (max(tokens - 1, 0.0), now)
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class LoginAdmission:
+    """
+    Admission control for logins.
+
+    At most `max_concurrency` logins verify a password at once and up to
+    `queue_limit` more wait, for no longer than `queue_timeout` seconds, for a
+    free slot. Anything beyond is rejected right away with a 503, so a burst
+    of logins can not take every core away from the rest of the API. Failed
+    attempts take a token from the bucket of their username and of their
+    address, once either is empty further attempts are rejected with a 429
+    before any hashing work is done.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        queue_limit: int,
+        queue_timeout: float,
+        user_buckets: TokenBuckets,
+        ip_buckets: TokenBuckets,
+    ):
+        self.max_concurrency = max_concurrency
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self.user_buckets = user_buckets
+        self.ip_buckets = ip_buckets
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters = deque()
+        self._admitted = 0
+        self._rejected_busy = 0
+        self._rejected_rate = 0
+        self._timed_out = 0
+
+    def check_rate(self, username: str, ip: str):
+        wait = max(self.user_buckets.wait(username.lower()), self.ip_buckets.wait(ip))
+        if wait > 0:
+            with self._lock:
+                self._rejected_rate += 1
+            error = exception_handler("429_TOO_MANY_LOGIN_ATTEMPTS")
+            error.headers = {"Retry-After": str(math.ceil(wait))}
+            raise error
+
+    async def _acquire(self):
+        with self._lock:
+            if self._active < self.max_concurrency:
+                self._active += 1
+                self._admitted += 1
+                return
+            if len(self._waiters) >= self.queue_limit:
+                self._rejected_busy += 1
+                raise exception_handler("503_LOGIN_BUSY")
+            loop = asyncio.get_running_loop()
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[1]), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                handed_over = waiter not in self._waiters
+                if not handed_over:
+                    self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                # The client went away, pass on a slot it may have received.
+                if handed_over:
+                    self._release()
+                raise
+            if not handed_over:
+                with self._lock:
+                    self._timed_out += 1
+                    self._rejected_busy += 1
+                raise exception_handler("503_LOGIN_BUSY")
+            # The slot was handed over while timing out, keep it.
+        with self._lock:
+            self._admitted += 1
+
+    def _release(self):
+        with self._lock:
+            if self._waiters:
+                # The slot goes to the oldest waiter, _active stays the same.
+                loop, future = self._waiters.popleft()
+                loop.call_soon_threadsafe(_hand_over, future)
+            else:
+                self._active -= 1
+
+    def record_failure(self, username: str, ip: str):
+        self.user_buckets.take(username.lower())
+        self.ip_buckets.take(ip)
+
+    @asynccontextmanager
+    async def admit(self, username: str, ip: str):
+        self.check_rate(username, ip)
+        await self._acquire()
+        try:
+            yield
+        except HTTPException as e:
+            if e.status_code == 401:
+                self.record_failure(username, ip)
+            raise
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "queue_limit": self.queue_limit,
+                "active": self._active,
+                "queued": len(self._waiters),
+                "admitted": self._admitted,
+                "rejected_busy": self._rejected_busy,
+                "rejected_rate_limited": self._rejected_rate,
+                "timed_out": self._timed_out,
+                "tracked_usernames": len(self.user_buckets),
+                "tracked_ips": len(self.ip_buckets),
+            }
+
+
+def _hand_over(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+login_admission = LoginAdmission(
+    LOGIN_MAX_CONCURRENCY,
+    LOGIN_QUEUE_LIMIT,
+    LOGIN_QUEUE_TIMEOUT,
+    TokenBuckets(LOGIN_USER_BURST, LOGIN_USER_RATE),
+    TokenBuckets(LOGIN_IP_BURST, LOGIN_IP_RATE),
+)
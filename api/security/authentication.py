@@ -1,45 +1,79 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from api.utils.exception_handler import exception_handler
+from api.utils.metrics import metrics
 from core.config import ALGORITHM
-from passlib.context import CryptContext
 from api.db.models import User
-from api.db.database import SessionLocal
+from api.db.database import get_auth_db
+from api.security.hashing import hash_pool
+from api.security.principal_cache import principal_cache
 import os
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-session_db = SessionLocal()
 
 
-def verify_password(plane_password, hashed_password):
-    return pwd_context.verify(plane_password, hashed_password)
+def get_user_by_username(db: Session, username: str):
+    return db.query(User).filter(User.username == username).first()
 
 
-async def authenticate_user(username: str, password: str):
-    user = session_db.query(User).filter(User.username == username).first()
-    if user and verify_password(password, user.hashed_password):
-        return user
+def update_password_hash(db: Session, user: User, hashed_password: str):
+    # Only replaces the hash it was computed from, a password changed in the
+    # meantime wins. The version is kept since the hash is never served.
+    db.query(User).filter(
+        User.id == user.id, User.hashed_password == user.hashed_password
+    ).update({"hashed_password": hashed_password}, synchronize_session=False)
+    db.commit()
+
+
+async def authenticate_user(db: Session, username: str, password: str):
+    user = await run_in_threadpool(get_user_by_username, db, username)
+    if user:
+        valid, new_hash = await hash_pool.verify_and_update(
+            password, user.hashed_password
+        )
+        if valid:
+            if new_hash is not None:
+                await run_in_threadpool(update_password_hash, db, user, new_hash)
+            return user
     raise exception_handler("401_INVALID_CREDENTIALS")
 
 
-def get_user_current(token: str = Depends(oauth2_scheme)):
-    token_decode = jwt.decode(token, os.getenv("SECRET"), algorithms=[ALGORITHM])
-    username = token_decode.get("sub")
+def user_principal(user: User) -> User:
+    # Detached copy of the row, safe to share between requests and threads.
+    return User(
+        **{column.name: getattr(user, column.name) for column in User.__table__.columns}
+    )
+
+
+def get_user_current(
+    token: str = Depends(oauth2_scheme), db: Session = Depends(get_auth_db)
+):
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
 
     try:
-        token_decode = jwt.decode(token, os.getenv("SECRET"), algorithms=[ALGORITHM])
+        with metrics.timer("jwt_decode"):
+            token_decode = jwt.decode(
+                token, os.getenv("SECRET"), algorithms=[ALGORITHM]
+            )
         username = token_decode.get("sub")
         if username == None:
             raise exception_handler("401_INVALID_CREDENTIALS")
     except JWTError:
         raise exception_handler("401_INVALID_CREDENTIALS")
 
-    user = session_db.query(User).filter(User.username == username).first()
+    # Taken before the read, a change committed meanwhile keeps it out of the cache.
+    generation = principal_cache.generation
+    user = get_user_by_username(db, username)
     if not user:
         raise exception_handler("401_INVALID_CREDENTIALS")
-    return user
+    principal = user_principal(user)
+    principal_cache.put(token, principal, generation, token_decode.get("exp"))
+    return principal
 
 
 def get_user_disabled_current(user: User = Depends(get_user_current)):
@@ -0,0 +1,72 @@
+"""
+Picks the password hashing cost for a target time per hash on this machine.
+
+    python -m api.security.calibrate --target-ms 250
+    python -m api.security.calibrate --scheme argon2 --target-ms 100
+
+Hashes a password at increasing costs and prints, as JSON, the timings and the
+highest cost whose median stays within the target. Set the suggested
+HASH_SCHEME and HASH_ROUNDS in the environment, stored hashes are moved to the
+new cost the next time each user logs in.
+"""
+
+import argparse
+import json
+import statistics
+import time
+from api.security.hashing import build_context
+from core.config import HASH_SCHEME
+
+# Costs tried per scheme, in increasing order.
+CANDIDATES = {
+    "bcrypt": range(4, 20),
+    "argon2": range(1, 20),
+    "pbkdf2_sha256": [1000 * 2**step for step in range(12)],
+}
+
+
+def measure(scheme: str, rounds: int, samples: int) -> float:
+    context = build_context(scheme, rounds)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash("calibration-password")
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate(scheme: str, target: float, samples: int = 3) -> dict:
+    timings = {}
+    chosen = None
+    for rounds in CANDIDATES[scheme]:
+        timings[rounds] = measure(scheme, rounds, samples)
+        if timings[rounds] > target:
+            break
+        chosen = rounds
+    if chosen is None:
+        # Even the cheapest cost is over budget, use it anyway.
+        chosen = CANDIDATES[scheme][0]
+    return {
+        "scheme": scheme,
+        "target_ms": round(target * 1000, 1),
+        "rounds": chosen,
+        "hash_ms": round(timings[chosen] * 1000, 1),
+        "timings_ms": {
+            rounds: round(seconds * 1000, 1) for rounds, seconds in timings.items()
+        },
+        "env": {"HASH_SCHEME": scheme, "HASH_ROUNDS": chosen},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scheme", choices=list(CANDIDATES), default=HASH_SCHEME)
+    parser.add_argument("--target-ms", type=float, default=250)
+    parser.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args()
+    result = calibrate(args.scheme, args.target_ms / 1000, args.samples)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from passlib.context import CryptContext
+from passlib.registry import get_crypt_handler
+from api.utils.exception_handler import exception_handler
+from api.utils.metrics import metrics
+from core.config import HASH_POOL_SIZE, HASH_QUEUE_LIMIT, HASH_ROUNDS, HASH_SCHEME
+
+
+def build_context(scheme: str = HASH_SCHEME, rounds: Optional[int] = HASH_ROUNDS):
+    # min and max equal to the target cost make needs_update flag hashes made
+    # with a lower or a higher cost, bcrypt stays verifiable when it is not
+    # the policy scheme so existing hashes are migrated on login.
+    if rounds is None:
+        rounds = get_crypt_handler(scheme).default_rounds
+    schemes = [scheme] if scheme == "bcrypt" else [scheme, "bcrypt"]
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        **{
+            f"{scheme}__{setting}": rounds
+            for setting in ("default_rounds", "min_rounds", "max_rounds")
+        },
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_pwd_context() -> CryptContext:
+    # Built on first use, in the app process and in each hashing worker.
+    return build_context()
+
+
+def hash_password(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def verify_password(plane_password: str, hashed_password: str) -> bool:
+    return get_pwd_context().verify(plane_password, hashed_password)
+
+
+def hash_passwords(passwords: list) -> list:
+    return [get_pwd_context().hash(password) for password in passwords]
+
+
+def verify_and_update(plane_password: str, hashed_password: str) -> tuple:
+    # (valid, new hash or None), the new hash follows the current policy.
+    return get_pwd_context().verify_and_update(plane_password, hashed_password)
+
+
+class PasswordHashPool:
+    """
+    Process pool that runs bcrypt away from the event loop.
+
+    At most `size` hashes run at once and up to `queue_limit` more may wait for
+    a free worker, anything beyond that is rejected with a 503 instead of piling
+    up latency for every other login.
+    """
+
+    def __init__(self, size: int, queue_limit: int):
+        self.size = size
+        self.queue_limit = queue_limit
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn avoids forking a process that already runs threads.
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.size,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+    async def _run(self, function, *args, bounded: bool = True):
+        with self._lock:
+            if bounded and self._pending >= self.size + self.queue_limit:
+                self._rejected += 1
+                raise exception_handler("503_HASH_POOL_BUSY")
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), function, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+
+    async def hash(self, password: str) -> str:
+        with metrics.timer("password_hash"):
+            return await self._run(hash_password, password)
+
+    async def verify(self, plane_password: str, hashed_password: str) -> bool:
+        with metrics.timer("password_verify"):
+            return await self._run(verify_password, plane_password, hashed_password)
+
+    async def verify_and_update(
+        self, plane_password: str, hashed_password: str
+    ) -> tuple:
+        with metrics.timer("password_verify"):
+            return await self._run(verify_and_update, plane_password, hashed_password)
+
+    async def hash_many(self, passwords: list, chunk_size: int = 8) -> list:
+        # Bulk work waits for workers instead of being rejected, but only keeps
+        # `size` small chunks in flight so logins still get a worker in between.
+        semaphore = asyncio.Semaphore(self.size)
+
+        async def run_chunk(chunk):
+            async with semaphore:
+                return await self._run(hash_passwords, chunk, bounded=False)
+
+        chunks = [
+            passwords[start : start + chunk_size]
+            for start in range(0, len(passwords), chunk_size)
+        ]
+        with metrics.timer("password_hash_many"):
+            results = await asyncio.gather(*map(run_chunk, chunks))
+        return [hashed for chunk in results for hashed in chunk]
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self._pending
+            return {
+                "size": self.size,
+                "queue_limit": self.queue_limit,
+                "busy": min(pending, self.size),
+                "queued": max(pending - self.size, 0),
+                "utilization": min(pending, self.size) / self.size,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+hash_pool = PasswordHashPool(HASH_POOL_SIZE, HASH_QUEUE_LIMIT)
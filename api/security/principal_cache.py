@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from core.config import PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL
+
+
+class PrincipalCache:
+    """
+    Bounded TTL + LRU cache of verified access token -> authenticated user.
+
+    Entries never outlive the token they belong to, and every entry of a user
+    can be dropped at once with `invalidate_user` when that user changes.
+    Every invalidation bumps `generation`. Readers take it before loading the
+    user and `put` ignores principals loaded under an older one, so a user
+    read while a change commits is never cached after its invalidation.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._tokens_by_user = {}
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_puts = 0
+
+    def get(self, token: str):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return principal
+
+    def put(
+        self,
+        token: str,
+        principal,
+        generation: int,
+        token_expires: Optional[float] = None,
+    ):
+        ttl = self.ttl
+        if token_expires is not None:
+            ttl = min(ttl, token_expires - time.time())
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                self.stale_puts += 1
+                return
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (time.monotonic() + ttl, principal)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            self.generation += 1
+            for token in self._tokens_by_user.pop(user_id, ()):
+                self._entries.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _remove(self, token: str):
+        _, principal = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[principal.id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "stale_puts": self.stale_puts,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
 from jose import jwt
+from api.utils.metrics import metrics
 from core.config import ALGORITHM
 import os
 
@@ -11,6 +12,7 @@ def create_token(data: dict, time_expire: datetime | None = None):
     else:
         expires = datetime.utcnow() + time_expire
     data_copy.update({"exp": expires})
-    token_jwt = jwt.encode(data_copy, key=os.getenv("SECRET"), algorithm=ALGORITHM)
+    with metrics.timer("jwt_encode"):
+        token_jwt = jwt.encode(data_copy, key=os.getenv("SECRET"), algorithm=ALGORITHM)
 
     return token_jwt
@@ -0,0 +1,233 @@
+"""
+Runs the API in several worker processes sharing one listening socket.
+
+    python -m api.server --workers 4 --host 0.0.0.0 --port 8000
+
+The supervisor creates the schema, binds the socket and starts `--workers`
+uvicorn processes that inherit it, so the kernel spreads connections between
+them. Each worker writes its state to a shared directory every
+WORKER_HEARTBEAT_INTERVAL seconds, a worker that exits or stops reporting for
+WORKER_TIMEOUT seconds is replaced. The caches of every worker are kept
+coherent through api.utils.cache_sync.
+
+Signals sent to the supervisor:
+
+- SIGHUP: graceful restart, workers are replaced one at a time and each new
+  worker is serving before the old one stops.
+- SIGTERM or SIGINT: graceful shutdown, workers finish the requests in flight.
+"""
+
+import argparse
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from core.config import WORKER_TIMEOUT
+
+
+def bind(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(args):
+    import uvicorn
+
+    sock = socket.socket(fileno=args.worker_fd)
+    config = uvicorn.Config(
+        "main:app",
+        log_level=args.log_level,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def log(message: str):
+    print(f"[supervisor {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+
+class Supervisor:
+    def __init__(self, args, sock: socket.socket, state_dir: str):
+        self.args = args
+        self.sock = sock
+        self.state_dir = state_dir
+        self.workers = {}
+        self.stopping = False
+        self.restarting = False
+
+    def spawn(self) -> int:
+        fd = self.sock.fileno()
+        env = {
+            **os.environ,
+            "WORKER_STATE_DIR": self.state_dir,
+            # The supervisor already created it.
+            "DB_CREATE_SCHEMA": "false",
+        }
+        # Every worker has its own bcrypt pool, share the cores between them.
+        cores = os.cpu_count() or 1
+        env.setdefault("HASH_POOL_SIZE", str(max(1, cores // self.args.workers)))
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "api.server",
+                "--worker-fd",
+                str(fd),
+                "--log-level",
+                self.args.log_level,
+                "--graceful-timeout",
+                str(self.args.graceful_timeout),
+            ],
+            pass_fds=(fd,),
+            env=env,
+        )
+        self.workers[process.pid] = (process, time.time())
+        log(f"started worker {process.pid}")
+        return process.pid
+
+    def _state_path(self, pid: int) -> str:
+        return os.path.join(self.state_dir, f"{pid}.json")
+
+    def last_seen(self, pid: int) -> float:
+        try:
+            return os.stat(self._state_path(pid)).st_mtime
+        except FileNotFoundError:
+            # Still starting, count from its start.
+            return self.workers[pid][1]
+
+    def is_ready(self, pid: int) -> bool:
+        return os.path.exists(self._state_path(pid))
+
+    def _forget(self, pid: int):
+        self.workers.pop(pid, None)
+        try:
+            os.remove(self._state_path(pid))
+        except FileNotFoundError:
+            pass
+
+    def stop_worker(self, pid: int):
+        process, _ = self.workers[pid]
+        process.terminate()
+        try:
+            process.wait(self.args.graceful_timeout + 5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        self._forget(pid)
+        log(f"stopped worker {pid}")
+
+    def check(self):
+        now = time.time()
+        for pid, (process, started) in list(self.workers.items()):
+            code = process.poll()
+            if code is not None:
+                self._forget(pid)
+                log(f"worker {pid} exited with {code}, replacing it")
+                if now - started < 1:
+                    # Failing on boot, do not spin.
+                    time.sleep(1)
+                self.spawn()
+            elif now - self.last_seen(pid) > WORKER_TIMEOUT:
+                log(f"worker {pid} stopped reporting, killing it")
+                process.kill()
+
+    def restart(self):
+        log("restarting workers")
+        for old in list(self.workers):
+            new = self.spawn()
+            deadline = time.time() + WORKER_TIMEOUT
+            while not self.is_ready(new):
+                if self.stopping or time.time() > deadline:
+                    log(f"worker {new} did not start, keeping the running workers")
+                    self.stop_worker(new)
+                    return
+                if self.workers[new][0].poll() is not None:
+                    log(f"worker {new} failed to start, keeping the running workers")
+                    self._forget(new)
+                    return
+                time.sleep(0.1)
+            self.stop_worker(old)
+
+    def shutdown(self):
+        log("shutting down")
+        for process, _ in self.workers.values():
+            process.terminate()
+        deadline = time.time() + self.args.graceful_timeout + 5
+        for pid, (process, _) in list(self.workers.items()):
+            try:
+                process.wait(max(0, deadline - time.time()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            self._forget(pid)
+
+    def run(self):
+        def stop(signum, frame):
+            self.stopping = True
+
+        def restart(signum, frame):
+            self.restarting = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGHUP, restart)
+
+        for _ in range(self.args.workers):
+            self.spawn()
+        while not self.stopping:
+            if self.restarting:
+                self.restarting = False
+                self.restart()
+            self.check()
+            time.sleep(0.2)
+        self.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=30,
+        help="seconds a stopping worker may take to finish its requests",
+    )
+    parser.add_argument("--worker-fd", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker_fd is not None:
+        run_worker(args)
+        return
+
+    from api.db.database import database
+    from core.config import DB_CREATE_SCHEMA
+
+    if DB_CREATE_SCHEMA:
+        database.create_schema()
+        database.engine.dispose()
+
+    sock = bind(args.host, args.port, args.backlog)
+    state_dir = tempfile.mkdtemp(prefix="savant-workers-")
+    log(f"listening on {args.host}:{args.port} with {args.workers} workers")
+    try:
+        Supervisor(args, sock, state_dir).run()
+    finally:
+        sock.close()
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
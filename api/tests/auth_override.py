@@ -0,0 +1,13 @@
+import pytest
+from main import app
+from api.db.models import User
+from api.security.authentication import get_user_disabled_current
+
+
+@pytest.fixture
+def authenticated_user():
+    """Skips token handling for tests that only exercise the users API."""
+    user = User(id=1, username="test", is_active=True)
+    app.dependency_overrides[get_user_disabled_current] = lambda: user
+    yield user
+    app.dependency_overrides.pop(get_user_disabled_current, None)
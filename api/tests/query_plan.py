@@ -0,0 +1,16 @@
+import re
+
+# "SCAN users" reads the whole table, or the whole index with "USING COVERING
+# INDEX". FTS5 lookups show up as "SCAN users_fts VIRTUAL TABLE INDEX ..." and
+# are not full scans.
+_USERS_SCAN = re.compile(r"^SCAN users\b(?!_fts)")
+
+
+def explain(connection, statement: str, parameters=()) -> list:
+    """Returns the detail column of EXPLAIN QUERY PLAN for `statement`."""
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    return [row[3] for row in rows]
+
+
+def full_scans(plan: list) -> list:
+    return [step for step in plan if _USERS_SCAN.match(step)]
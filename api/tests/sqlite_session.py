@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from main import app
+from api.db.database import build_engine, get_db
+from api.db.models import User
+from api.db.schema import ensure_schema
+from api.utils.page_cache import page_cache
+
+
+@pytest.fixture
+def sqlite_session_factory(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'test.sqlite3'}")
+    ensure_schema(engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def sqlite_db(sqlite_session_factory):
+    """Serves the users API from a temporary SQLite database."""
+
+    def override_get_db():
+        db = sqlite_session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    # Pages cached from another database must not be served from this one.
+    page_cache.invalidate()
+    yield sqlite_session_factory
+    page_cache.invalidate()
+    if previous is None:
+        app.dependency_overrides.pop(get_db, None)
+    else:
+        app.dependency_overrides[get_db] = previous
+
+
+@pytest.fixture
+def make_users(sqlite_session_factory):
+    """
+    Inserts `count` users named user0, user1... into the temporary database and
+    returns their ids. Keyword arguments set other columns, to a value or to a
+    function of the user's index.
+    """
+
+    def make(count: int, **overrides) -> list:
+        users = []
+        for index in range(count):
+            values = {
+                "username": f"user{index}",
+                "hashed_password": "hash",
+                "email": f"user{index}@example.com",
+            }
+            for name, value in overrides.items():
+                values[name] = value(index) if callable(value) else value
+            users.append(User(**values))
+        with sqlite_session_factory() as db:
+            db.add_all(users)
+            db.commit()
+            return [user.id for user in users]
+
+    return make
+
+
+@pytest.fixture
+def statements(sqlite_session_factory):
+    """Records the (statement, parameters) sent to the temporary database."""
+    recorded = []
+    engine = sqlite_session_factory.kw["bind"]
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield recorded
+    event.remove(engine, "before_cursor_execute", record)
@@ -0,0 +1,91 @@
+import asyncio
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from main import app
+from api.db.database import get_auth_db, get_db
+from api.routers import auth
+from api.security.admission import LoginAdmission, TokenBuckets
+from api.tests.sqlite_session import sqlite_db, sqlite_session_factory
+import pytest
+
+client = TestClient(app)
+
+
+def admission(max_concurrency=1, queue_limit=1, queue_timeout=1.0, burst=100):
+    return LoginAdmission(
+        max_concurrency,
+        queue_limit,
+        queue_timeout,
+        TokenBuckets(burst, 0.5),
+        TokenBuckets(100, 0.5),
+    )
+
+
+async def login(controller, hold: float, username="ana"):
+    async with controller.admit(username, "10.0.0.1"):
+        await asyncio.sleep(hold)
+    return "ok"
+
+
+def test_token_buckets():
+    buckets = TokenBuckets(burst=2, rate=0.5)
+    assert buckets.wait("ana") == 0
+    buckets.take("ana")
+    buckets.take("ana")
+    assert 1.9 < buckets.wait("ana") <= 2
+    assert buckets.wait("bob") == 0
+
+
+def test_bounds_concurrent_logins():
+    controller = admission(max_concurrency=1, queue_limit=1)
+
+    async def main():
+        return await asyncio.gather(
+            login(controller, 0.1),
+            login(controller, 0),
+            login(controller, 0),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+    assert results[:2] == ["ok", "ok"]
+    assert isinstance(results[2], HTTPException)
+    assert results[2].status_code == 503
+    assert results[2].headers["Retry-After"] == "1"
+    stats = controller.stats()
+    assert stats["admitted"] == 2
+    assert stats["rejected_busy"] == 1
+    assert stats["active"] == 0
+    assert stats["queued"] == 0
+
+
+def test_queued_login_times_out():
+    controller = admission(queue_timeout=0.05)
+
+    async def main():
+        return await asyncio.gather(
+            login(controller, 0.3), login(controller, 0), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert results[0] == "ok"
+    assert results[1].status_code == 503
+    assert controller.stats()["timed_out"] == 1
+    assert asyncio.run(login(controller, 0)) == "ok"
+
+
+def test_failed_logins_are_rate_limited(sqlite_db, monkeypatch):
+    controller = admission(burst=2)
+    monkeypatch.setattr(auth, "login_admission", controller)
+    monkeypatch.setitem(
+        app.dependency_overrides, get_auth_db, app.dependency_overrides[get_db]
+    )
+
+    form = {"username": "Nobody", "password": "wrong"}
+    assert client.post("/token", data=form).status_code == 401
+    assert client.post("/token", data=form).status_code == 401
+    response = client.post("/token", data={**form, "username": "nobody"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert controller.stats()["rejected_rate_limited"] == 1
+    assert client.post("/token", data={**form, "username": "other"}).status_code == 401
@@ -0,0 +1,65 @@
+from fastapi.testclient import TestClient
+from main import app
+from api.db.models import User
+from api.tests.auth_override import authenticated_user
+from api.tests.sqlite_session import (
+    make_users,
+    sqlite_db,
+    sqlite_session_factory,
+)
+import pytest
+
+client = TestClient(app)
+pytestmark = pytest.mark.usefixtures("authenticated_user")
+
+
+@pytest.fixture
+def user_ids(sqlite_db, make_users):
+    return make_users(6, country=lambda index: "USA" if index % 2 else "Colombia")
+
+
+def test_bulk_patch(sqlite_db, user_ids):
+    response = client.patch(
+        "/api/users/bulk",
+        json={
+            "ids": user_ids + [999],
+            "filter": {"country": "USA"},
+            "changes": {"is_active": False},
+        },
+    )
+    assert response.status_code == 200
+    assert sorted(response.json()["affected_ids"]) == user_ids[1::2]
+    with sqlite_db() as db:
+        inactive = db.query(User.id).filter(User.is_active == False).all()
+        assert sorted(user_id for user_id, in inactive) == user_ids[1::2]
+
+
+def test_bulk_patch_duplicated_values(user_ids):
+    response = client.patch(
+        "/api/users/bulk",
+        json={"ids": user_ids[:2], "changes": {"email": "same@example.com"}},
+    )
+    assert response.status_code == 400
+
+
+def test_bulk_patch_without_changes(user_ids):
+    response = client.patch("/api/users/bulk", json={"ids": user_ids, "changes": {}})
+    assert response.status_code == 422
+
+
+def test_bulk_delete(sqlite_db, user_ids):
+    response = client.request(
+        "DELETE", "/api/users/bulk", json={"ids": user_ids[:3] + user_ids[:1]}
+    )
+    assert response.status_code == 200
+    assert sorted(response.json()["affected_ids"]) == user_ids[:3]
+    with sqlite_db() as db:
+        assert db.query(User).count() == 3
+
+
+def test_bulk_delete_requires_ids(user_ids):
+    response = client.request("DELETE", "/api/users/bulk", json={"ids": []})
+    assert response.status_code == 422
+    assert response.json()["detail"] == (
+        "An ID is required, but an empty array was provided."
+    )
@@ -0,0 +1,120 @@
+from sqlalchemy import text
+from api.db.models import User
+from api.db.schema import ensure_schema
+from api.security.principal_cache import principal_cache
+from api.tests.sqlite_session import make_users, sqlite_session_factory
+from api.utils.cache_sync import CacheSync
+from api.utils.page_cache import page_cache
+import pytest
+
+
+@pytest.fixture
+def user_ids(make_users):
+    return make_users(3)
+
+
+@pytest.fixture
+def engine(sqlite_session_factory):
+    return sqlite_session_factory.kw["bind"]
+
+
+def rename(engine, user_id: int, name: str):
+    # Another connection, like another worker would.
+    with engine.begin() as conn:
+        conn.execute(
+            text("UPDATE users SET full_name = :name WHERE id = :id"),
+            {"name": name, "id": user_id},
+        )
+
+
+def cached_principal(user_id: int) -> str:
+    token = f"token-{user_id}"
+    principal_cache.put(
+        token,
+        User(id=user_id, username=f"user{user_id}"),
+        principal_cache.generation,
+    )
+    return token
+
+
+def test_changes_of_other_connections_drop_cached_entries(engine, user_ids):
+    sync = CacheSync(interval=1, retention=100)
+    sync.open(engine)
+    assert sync.poll() == 0
+
+    changed, unchanged = cached_principal(user_ids[0]), cached_principal(user_ids[1])
+    generation = page_cache.generation
+    rename(engine, user_ids[0], "Ana")
+
+    assert sync.poll() == 1
+    assert principal_cache.get(changed) is None
+    assert principal_cache.get(unchanged) is not None
+    assert page_cache.generation == generation + 1
+
+    # Nothing committed since, the log is not read again.
+    assert sync.poll() == 0
+    assert page_cache.generation == generation + 1
+    sync.stop()
+
+
+def test_falling_behind_the_retention_clears_everything(engine, user_ids):
+    behind = CacheSync(interval=1, retention=2)
+    behind.open(engine)
+    trimming = CacheSync(interval=1, retention=2)
+    trimming.open(engine)
+
+    for index in range(5):
+        rename(engine, user_ids[0], f"Name {index}")
+    assert trimming.poll() == 5
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM user_changes")).scalar() == 2
+
+    token = cached_principal(user_ids[2])
+    assert behind.poll() == 2
+    assert principal_cache.get(token) is None
+    assert behind.stats()["resets"] == 1
+    behind.stop()
+    trimming.stop()
+
+
+def test_log_is_trimmed_in_steps_by_one_process(engine, user_ids):
+    syncs = [CacheSync(interval=1, retention=20) for _ in range(3)]
+    for sync in syncs:
+        sync.open(engine)
+
+    for index in range(60):
+        rename(engine, user_ids[0], f"Name {index}")
+        for sync in syncs:
+            assert sync.poll() == 1
+        with engine.connect() as conn:
+            count = conn.execute(text("SELECT COUNT(*) FROM user_changes")).scalar()
+        assert count <= 20 + syncs[0].trim_step
+
+    # One DELETE per step of 2 entries, not one per poll of every process.
+    trims = sum(sync.stats()["trims"] for sync in syncs)
+    assert 0 < trims <= 60 // syncs[0].trim_step
+    for sync in syncs:
+        assert sync.stats()["resets"] == 0
+        sync.stop()
+
+
+def test_writes_without_triggers_clear_everything(engine, user_ids):
+    sync = CacheSync(interval=1, retention=100)
+    sync.open(engine)
+    token = cached_principal(user_ids[2])
+
+    # What the seed does: load users without triggers, then restore them.
+    with engine.begin() as conn:
+        for name in (
+            "user_changes_insert",
+            "user_changes_update",
+            "user_changes_delete",
+        ):
+            conn.execute(text(f"DROP TRIGGER {name}"))
+        conn.execute(text("UPDATE users SET age = 1"))
+    ensure_schema(engine)
+
+    assert sync.poll() == 1
+    assert principal_cache.get(token) is None
+    assert sync.stats()["resets"] == 1
+    sync.stop()
@@ -0,0 +1,133 @@
+import asyncio
+import gzip
+import zlib
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+from main import app
+from api.tests.auth_override import authenticated_user
+from api.tests.sqlite_session import (
+    make_users,
+    sqlite_db,
+    sqlite_session_factory,
+)
+from api.utils.compression import CompressionMiddleware, negotiate
+import pytest
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def user_ids(sqlite_db, make_users):
+    return make_users(
+        50,
+        full_name=lambda index: f"User Number {index}",
+        city="New York",
+        country="USA",
+    )
+
+
+def test_negotiate():
+    encodings = ["zstd", "gzip"]
+    assert negotiate("gzip, deflate, br", encodings) == "gzip"
+    assert negotiate("gzip, zstd", encodings) == "zstd"
+    assert negotiate("zstd;q=0.5, gzip", encodings) == "gzip"
+    assert negotiate("zstd;q=0, *", encodings) == "gzip"
+    assert negotiate("identity", encodings) is None
+    assert negotiate("", encodings) is None
+    assert negotiate("gzip;q=0", ["gzip"]) is None
+
+
+def test_large_responses_are_compressed(authenticated_user, user_ids):
+    plain = client.get("/api/users/", headers={"Accept-Encoding": "identity"})
+    compressed = client.get("/api/users/", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in plain.headers
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert compressed.headers["etag"] == plain.headers["etag"]
+    # httpx already decoded it.
+    assert compressed.content == plain.content
+    assert int(compressed.headers["content-length"]) < len(plain.content) / 4
+
+
+def test_small_responses_are_not_compressed(authenticated_user, user_ids):
+    response = client.get(
+        f"/api/users/{user_ids[0]}", headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+    etag = client.get("/api/users/").headers["etag"]
+    response = client.get(
+        "/api/users/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+async def stream():
+    for index in range(3):
+        yield f'{{"chunk": {index}}}\n'.encode() * 100
+
+
+def collect(middleware) -> list:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+    messages = []
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            # The client stays connected until the response ends.
+            await asyncio.Event().wait()
+        requested = True
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return messages
+
+
+def test_streams_are_compressed_incrementally():
+    inner = Starlette(
+        routes=[
+            Route(
+                "/",
+                lambda request: StreamingResponse(
+                    stream(), media_type="application/x-ndjson"
+                ),
+            )
+        ]
+    )
+    messages = collect(CompressionMiddleware(inner, minimum_size=1 << 20))
+
+    headers = dict(messages[0]["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    bodies = [message["body"] for message in messages[1:] if message["body"]]
+    # One per chunk of the stream, then the gzip trailer.
+    assert len(bodies) == 4
+
+    # Every chunk can be decoded as soon as it arrives.
+    decoder = zlib.decompressobj(31)
+    assert decoder.decompress(bodies[0]) == b'{"chunk": 0}\n' * 100
+    assert gzip.decompress(b"".join(bodies)) == b"".join(
+        f'{{"chunk": {index}}}\n'.encode() * 100 for index in range(3)
+    )
+
+
+def test_zstd(authenticated_user, user_ids):
+    zstandard = pytest.importorskip("zstandard")
+    plain = client.get("/api/users/", headers={"Accept-Encoding": "identity"})
+    response = client.get("/api/users/", headers={"Accept-Encoding": "gzip, zstd"})
+    assert response.headers["content-encoding"] == "zstd"
+    assert zstandard.decompress(response.content) == plain.content
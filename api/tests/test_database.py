@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+from sqlalchemy import text
+from api.db.database import build_engine
+from api.db.schema import ensure_schema
+
+
+def test_sqlite_connections_are_tuned(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'tuned.sqlite3'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        # 1 is NORMAL
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() > 0
+    assert engine.pool.size() > 1
+    engine.dispose()
+
+
+def test_ensure_schema_upgrades_an_existing_database(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'old.sqlite3'}")
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR, "
+                "hashed_password VARCHAR, email VARCHAR, full_name VARCHAR, "
+                "age INTEGER, city VARCHAR, country VARCHAR, phone_number VARCHAR, "
+                "is_active BOOLEAN)"
+            )
+        )
+        conn.execute(
+            text("CREATE VIEW user_view AS SELECT id, username, email FROM users")
+        )
+        conn.execute(text("INSERT INTO users (id, username) VALUES (1, 'old')"))
+        conn.execute(text("INSERT INTO users (id, username) VALUES (2, 'gone')"))
+
+    ensure_schema(engine)
+    ensure_schema(engine)
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM users WHERE id = 2"))
+        conn.execute(text("INSERT INTO users (username) VALUES ('new')"))
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT id, username, version FROM user_view ORDER BY id")
+        ).all()
+        # The id of the deleted user is not handed out again.
+        assert [tuple(row) for row in rows] == [(1, "old", 1), (3, "new", 1)]
+        match = text("SELECT rowid FROM users_fts WHERE users_fts MATCH 'new'")
+        assert conn.execute(match).scalar() == 3
+    engine.dispose()
+
+
+def test_import_has_no_side_effects_and_lifespan_creates_schema(tmp_path):
+    path = tmp_path / "boot.sqlite3"
+    script = f"""
+import os
+import main
+from fastapi.testclient import TestClient
+from api.db.database import database
+assert not os.path.exists({str(path)!r}), "import touched the database"
+assert database._engine is None
+with TestClient(main.app) as client:
+    assert client.get("/openapi.json").status_code == 200
+    with database.engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM user_stats").scalar() == 0
+assert database._engine is None
+"""
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{path}",
+        "ASYNC_DATABASE_URL": f"sqlite+aiosqlite:///{path}",
+        "SECRET": "test-secret",
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", script], env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert path.exists()
@@ -0,0 +1,127 @@
+from fastapi.testclient import TestClient
+from main import app
+from api.db.models import User
+from api.tests.auth_override import authenticated_user
+from api.tests.sqlite_session import (
+    make_users,
+    sqlite_db,
+    sqlite_session_factory,
+)
+import pytest
+
+client = TestClient(app)
+pytestmark = pytest.mark.usefixtures("authenticated_user")
+
+
+@pytest.fixture
+def user_id(sqlite_db, make_users):
+    return make_users(3)[0]
+
+
+def test_detail_not_modified(user_id):
+    response = client.get(f"/api/users/{user_id}")
+    etag = response.headers["ETag"]
+    assert etag == f'"{user_id}-1"'
+
+    response = client.get(f"/api/users/{user_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    client.patch(f"/api/users/{user_id}", json={"city": "Lima"})
+    response = client.get(f"/api/users/{user_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{user_id}-2"'
+
+
+def test_sparse_detail_has_its_own_etag(user_id):
+    full = client.get(f"/api/users/{user_id}").headers["ETag"]
+    sparse = client.get(f"/api/users/{user_id}?fields=username").headers["ETag"]
+    assert full != sparse
+
+
+def test_list_not_modified(user_id):
+    response = client.get("/api/users/?limit=2")
+    etag = response.headers["ETag"]
+
+    response = client.get("/api/users/?limit=2", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    response = client.get("/api/users/?limit=3", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+    client.put(
+        f"/api/users/{user_id}", json={"username": "renamed", "email": "r@e.com"}
+    )
+    response = client.get("/api/users/?limit=2", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["result"][0]["username"] == "renamed"
+
+
+def test_if_match(user_id):
+    etag = client.get(f"/api/users/{user_id}").headers["ETag"]
+
+    response = client.patch(
+        f"/api/users/{user_id}", json={"age": 20}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{user_id}-2"'
+
+    response = client.patch(
+        f"/api/users/{user_id}", json={"age": 21}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 412
+
+    response = client.patch(
+        f"/api/users/{user_id}", json={"age": 22}, headers={"If-Match": "*"}
+    )
+    assert response.status_code == 200
+
+
+def test_bulk_patch_bumps_versions(user_id):
+    etag = client.get(f"/api/users/{user_id}").headers["ETag"]
+    client.patch("/api/users/bulk", json={"ids": [user_id], "changes": {"age": 40}})
+    response = client.get(f"/api/users/{user_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_if_match_on_missing_user(user_id):
+    response = client.patch(
+        "/api/users/999", json={"age": 1}, headers={"If-Match": "*"}
+    )
+    assert response.status_code == 404
+
+
+def test_deleted_ids_are_not_reused(sqlite_db, user_id):
+    last_id = user_id + 2
+    etag = client.get(f"/api/users/{last_id}").headers["ETag"]
+    assert client.delete(f"/api/users/{last_id}").status_code == 200
+
+    with sqlite_db() as db:
+        user = User(username="b", hashed_password="hash", email="b@e.com")
+        db.add(user)
+        db.commit()
+        new_id = user.id
+    assert new_id > last_id
+
+    response = client.get(f"/api/users/{new_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    response = client.patch(
+        f"/api/users/{new_id}", json={"age": 1}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 412
+
+
+def test_sparse_list_etag_covers_its_rows(sqlite_db, make_users):
+    # Usernames sort in reverse id order, so the username index is not
+    # the order of the page.
+    ids = make_users(6, username=lambda index: f"user{9 - index}")
+    response = client.get("/api/users/?limit=2&fields=id,username")
+    assert response.json()["users_ids"] == ids[:2]
+    etag = response.headers["ETag"]
+
+    client.patch(f"/api/users/{ids[1]}", json={"username": "anne"})
+    response = client.get(
+        "/api/users/?limit=2&fields=id,username", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["result"][1]["username"] == "anne"
@@ -0,0 +1,44 @@
+import csv
+import io
+import json
+from fastapi.testclient import TestClient
+from main import app
+from api.tests.auth_override import authenticated_user
+from api.tests.sqlite_session import (
+    make_users,
+    sqlite_db,
+    sqlite_session_factory,
+)
+import pytest
+
+client = TestClient(app)
+pytestmark = pytest.mark.usefixtures("authenticated_user")
+
+
+@pytest.fixture
+def users(sqlite_db, make_users):
+    make_users(5, age=lambda index: 20 + index)
+
+
+def test_export_ndjson(users):
+    response = client.get("/api/users/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["username"] for row in rows] == [f"user{i}" for i in range(5)]
+    assert rows[0]["age"] == 20
+    assert "hashed_password" not in rows[0]
+
+
+def test_export_csv(users):
+    response = client.get("/api/users/export?format=csv")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 5
+    assert rows[4]["email"] == "user4@example.com"
+
+
+def test_export_invalid_format(users):
+    response = client.get("/api/users/export?format=xml")
+    assert response.status_code == 422
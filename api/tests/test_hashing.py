@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from api.db.models import User
+from api.security.authentication import authenticate_user
+from api.security.hashing import (
+    PasswordHashPool,
+    build_context,
+    get_pwd_context,
+    hash_pool,
+)
+from api.tests.sqlite_session import sqlite_session_factory
+
+
+@pytest.fixture
+def pool():
+    pool = PasswordHashPool(size=1, queue_limit=0)
+    yield pool
+    pool.shutdown()
+
+
+def test_hash_and_verify(pool):
+    async def main():
+        hashed = await pool.hash("secret")
+        return hashed, await pool.verify("secret", hashed)
+
+    hashed, valid = asyncio.run(main())
+    assert hashed != "secret"
+    assert valid
+    assert pool.stats()["completed"] == 2
+
+
+def test_rejects_when_queue_is_full(pool):
+    async def main():
+        return await asyncio.gather(
+            pool.hash("secret"), pool.hash("secret"), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    errors = [result for result in results if isinstance(result, HTTPException)]
+    assert len(errors) == 1
+    assert errors[0].status_code == 503
+    assert errors[0].headers["Retry-After"] == "1"
+    assert pool.stats()["rejected"] == 1
+
+
+def test_policy_flags_hashes_with_another_cost():
+    policy = build_context("bcrypt", 5)
+    cheaper = build_context("bcrypt", 4).hash("secret")
+    costlier = build_context("bcrypt", 6).hash("secret")
+
+    assert policy.needs_update(cheaper)
+    assert policy.needs_update(costlier)
+    assert not policy.needs_update(policy.hash("secret"))
+    valid, new_hash = policy.verify_and_update("secret", costlier)
+    assert valid
+    assert new_hash.startswith("$2b$05$")
+
+
+def test_policy_migrates_bcrypt_hashes_to_another_scheme():
+    policy = build_context("pbkdf2_sha256", 1000)
+    valid, new_hash = policy.verify_and_update(
+        "secret", build_context("bcrypt", 4).hash("secret")
+    )
+    assert valid
+    assert new_hash.startswith("$pbkdf2-sha256$1000$")
+
+
+def test_login_rehashes_to_the_current_policy(sqlite_session_factory):
+    with sqlite_session_factory() as db:
+        old_hash = build_context("bcrypt", 4).hash("secret")
+        db.add(User(username="ana", email="ana@example.com", hashed_password=old_hash))
+        db.commit()
+
+    async def login(password):
+        with sqlite_session_factory() as db:
+            return await authenticate_user(db, "ana", password)
+
+    with pytest.raises(HTTPException):
+        asyncio.run(login("wrong"))
+    asyncio.run(login("secret"))
+    try:
+        with sqlite_session_factory() as db:
+            new_hash = db.query(User.hashed_password).scalar()
+    finally:
+        hash_pool.shutdown()
+    assert new_hash != old_hash
+    assert not get_pwd_context().needs_update(new_hash)
+    assert get_pwd_context().verify("secret", new_hash)
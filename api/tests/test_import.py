@@ -0,0 +1,74 @@
+from fastapi.testclient import TestClient
+from main import app
+from api.db.models import User
+from api.tests.auth_override import authenticated_user
+from api.tests.sqlite_session import sqlite_db, sqlite_session_factory
+import pytest
+
+client = TestClient(app)
+pytestmark = pytest.mark.usefixtures("authenticated_user")
+
+
+def test_import_ndjson(sqlite_db):
+    body = "\n".join(
+        [
+            '{"username": "ana", "hashed_password": "secret", "email": "ana@example.com"}',
+            '{"username": "ana", "hashed_password": "secret", "email": "other@example.com"}',
+            "not json",
+            '{"username": "bob", "email": "bob@example.com"}',
+            "",
+            '{"username": "eva", "hashed_password": "secret", "email": "eva@example.com", "age": 31}',
+        ]
+    )
+    response = client.post(
+        "/api/users/import?batch_size=2",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert data["failed"] == 3
+    statuses = [(result["line"], result["status"]) for result in data["results"]]
+    assert statuses == [
+        (1, "created"),
+        (2, "error"),
+        (3, "error"),
+        (4, "error"),
+        (6, "created"),
+    ]
+    with sqlite_db() as db:
+        eva = db.query(User).filter(User.username == "eva").one()
+        assert eva.age == 31
+        assert eva.hashed_password.startswith("$2b$")
+
+
+def test_import_csv(sqlite_db):
+    body = (
+        "username,hashed_password,email,age,city\n"
+        "ana,secret,ana@example.com,30,Bogota\n"
+        "bob,secret,bob@example.com,,\n"
+        "ana,secret,ana2@example.com,40,Lima\n"
+    )
+    response = client.post(
+        "/api/users/import",
+        content=body,
+        headers={"Content-Type": "text/csv; charset=utf-8"},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert data["results"][2] == {
+        "line": 4,
+        "status": "error",
+        "detail": "Username or email already exists.",
+    }
+
+
+def test_import_unsupported_content_type(sqlite_db):
+    response = client.post(
+        "/api/users/import", content="{}", headers={"Content-Type": "text/plain"}
+    )
+    assert response.status_code == 415
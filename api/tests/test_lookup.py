@@ -0,0 +1,58 @@
+from fastapi.testclient import TestClient
+from main import app
+from api.tests.auth_override import authenticated_user
+from api.tests.sqlite_session import (
+    make_users,
+    sqlite_db,
+    sqlite_session_factory,
+)
+import pytest
+
+client = TestClient(app)
+pytestmark = pytest.mark.usefixtures("authenticated_user")
+
+
+@pytest.fixture
+def user_ids(sqlite_db, make_users):
+    return make_users(4)
+
+
+def test_lookup_users(user_ids):
+    ids = [user_ids[2], 999, user_ids[0], user_ids[2]]
+    response = client.post("/api/users/lookup", json={"ids": ids})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert list(data["result"]) == [str(user_ids[2]), "999", str(user_ids[0])]
+    assert data["result"][str(user_ids[0])]["username"] == "user0"
+    assert "hashed_password" not in data["result"][str(user_ids[0])]
+    assert data["result"]["999"] is None
+    assert data["not_found"] == [999]
+
+
+def test_lookup_users_fields(user_ids):
+    response = client.post(
+        "/api/users/lookup?fields=username", json={"ids": user_ids[:2]}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["result"] == {
+        str(user_ids[0]): {"id": user_ids[0], "username": "user0"},
+        str(user_ids[1]): {"id": user_ids[1], "username": "user1"},
+    }
+
+
+def test_lookup_users_in_chunks(user_ids, monkeypatch):
+    monkeypatch.setattr("api.routers.users_common.BULK_CHUNK_SIZE", 3)
+    response = client.post("/api/users/lookup", json={"ids": user_ids})
+
+    assert response.status_code == 200
+    assert len(response.json()["result"]) == 4
+    assert response.json()["not_found"] == []
+
+
+def test_lookup_users_limits(sqlite_db, monkeypatch):
+    monkeypatch.setattr("api.routers.users_common.LOOKUP_MAX_IDS", 2)
+
+    assert client.post("/api/users/lookup", json={"ids": []}).status_code == 422
+    assert client.post("/api/users/lookup", json={"ids": [1, 2, 3]}).status_code == 422
@@ -0,0 +1,112 @@
+import re
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from main import app
+from api.db.database import build_engine, untimed
+from api.db.schema import ensure_schema
+from api.db.models import User
+from api.tests.auth_override import authenticated_user
+from api.tests.sqlite_session import sqlite_db, sqlite_session_factory
+from api.utils.cache_sync import CacheSync
+from api.utils.metrics import MetricsMiddleware, metrics
+import pytest
+
+client = TestClient(app)
+
+
+def sample(body: str, name: str, **labels) -> float:
+    selector = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{name}{{{selector}}} (\S+)$", body, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+@pytest.mark.usefixtures("authenticated_user")
+def test_metrics_by_route_template(sqlite_db):
+    with sqlite_db() as db:
+        db.add(User(username="ana", email="ana@example.com"))
+        db.commit()
+
+    before = client.get("/metrics").text
+    client.get("/api/users/1")
+    client.get("/api/users/2")
+    client.get("/missing")
+    client.get("/openapi.json")
+    client.post("/metrics")
+    body = client.get("/metrics").text
+
+    route = {"method": "GET", "route": "/api/users/{user_id}"}
+    assert (
+        sample(body, "http_request_duration_seconds_count", **route, status=200)
+        - sample(before, "http_request_duration_seconds_count", **route, status=200)
+        == 1
+    )
+    assert sample(body, "http_request_duration_seconds_count", **route, status=404)
+    # Only requests no route matched are unmatched, not the docs or a 405.
+    unmatched = {"method": "GET", "route": "unmatched", "status": 404}
+    assert (
+        sample(body, "http_request_duration_seconds_count", **unmatched)
+        - sample(before, "http_request_duration_seconds_count", **unmatched)
+        == 1
+    )
+    assert sample(
+        body,
+        "http_request_duration_seconds_count",
+        method="GET",
+        route="/openapi.json",
+        status=200,
+    )
+    assert sample(
+        body,
+        "http_request_duration_seconds_count",
+        method="POST",
+        route="/metrics",
+        status=405,
+    )
+    assert sample(body, "operation_duration_seconds_count", operation="db") > sample(
+        before, "operation_duration_seconds_count", operation="db"
+    )
+    assert "hash_pool_size" in body
+    assert sample(body, "http_requests_in_flight", method="GET") == 1
+
+
+def test_server_timing_header(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'timing.sqlite3'}")
+    timed = FastAPI()
+    timed.add_middleware(MetricsMiddleware, server_timing=True)
+
+    @timed.get("/query")
+    def query():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        return {}
+
+    response = TestClient(timed).get("/query")
+    header = response.headers["server-timing"]
+    assert re.search(r'db;dur=[\d.]+;desc="2"', header)
+    assert re.search(r"app;dur=[\d.]+$", header)
+    engine.dispose()
+
+
+def test_schema_and_cache_sync_are_not_timed(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'untimed.sqlite3'}")
+    before = sample(
+        metrics.render(), "operation_duration_seconds_count", operation="db"
+    )
+
+    ensure_schema(untimed(engine))
+    sync = CacheSync(interval=1, retention=10)
+    sync.open(untimed(engine))
+    sync.poll()
+    sync.stop()
+    body = metrics.render()
+    assert sample(body, "operation_duration_seconds_count", operation="db") == before
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    body = metrics.render()
+    assert (
+        sample(body, "operation_duration_seconds_count", operation="db") == before + 1
+    )
+    engine.dispose()
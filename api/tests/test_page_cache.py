@@ -0,0 +1,127 @@
+from fastapi.testclient import TestClient
+from main import app
+from api.tests.auth_override import authenticated_user
+from api.tests.sqlite_session import (
+    make_users,
+    sqlite_db,
+    sqlite_session_factory,
+    statements,
+)
+from api.schemas.user import UserSearchSchema
+from api.utils.page_cache import ListPage, PageCache, page_cache
+import pytest
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def user_ids(sqlite_db, make_users):
+    return make_users(3)
+
+
+def test_evicts_least_recently_used_page():
+    cache = PageCache(2)
+    cache.put("a", cache.generation, b"a", '"a"')
+    cache.put("b", cache.generation, b"b", '"b"')
+    cache.get("a")
+    cache.put("c", cache.generation, b"c", '"c"')
+
+    assert cache.get("a") == (b"a", '"a"')
+    assert cache.get("b") is None
+    assert cache.get("c") == (b"c", '"c"')
+
+
+def test_ignores_page_computed_before_invalidation():
+    cache = PageCache(2)
+    generation = cache.generation
+    cache.invalidate()
+    cache.put("a", generation, b"stale", '"stale"')
+
+    assert cache.get("a") is None
+
+
+def test_bounded_by_bytes():
+    cache = PageCache(10, max_bytes=160)
+    cache.put("a", cache.generation, b"a" * 10, '"a"')
+    cache.put("b", cache.generation, b"b" * 10, '"b"')
+    # Over a sixteenth of the budget, never cached.
+    cache.put("huge", cache.generation, b"h" * 11, '"h"')
+    assert cache.get("huge") is None
+    assert cache.stats()["oversized"] == 1
+
+    small = PageCache(100, max_bytes=160)
+    for index in range(20):
+        small.put(index, small.generation, b"x" * 10, '"x"')
+    assert small.stats()["bytes"] == 160
+    assert small.stats()["size"] == 16
+    assert small.get(3) is None
+    assert small.get(4) is not None
+
+    small.put(19, small.generation, b"y" * 5, '"y"')
+    assert small.stats()["bytes"] == 155
+    small.invalidate()
+    assert small.stats()["bytes"] == 0
+
+
+def test_disabled_cache_keeps_nothing():
+    cache = PageCache(0)
+    cache.put("a", cache.generation, b"a", '"a"')
+
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_list_page_round_trip():
+    page_cache.invalidate()
+    filters = UserSearchSchema(city="Lima")
+    page = ListPage(0, None, 2, False, ["username"], filters, None)
+    assert page.cached() is None
+    response = {"message": "List of users", "users_ids": [], "result": []}
+    assert page.store(response, '"etag"').headers["ETag"] == '"etag"'
+
+    again = ListPage(0, None, 2, False, ["username"], filters, '"etag"')
+    assert again.cached().status_code == 304
+    other = ListPage(0, None, 2, False, ["username"], UserSearchSchema(), None)
+    assert other.cached() is None
+    page_cache.invalidate()
+
+
+def test_serves_repeated_page_without_queries(authenticated_user, user_ids, statements):
+    first = client.get("/api/users/?limit=2&fields=id,username")
+    statements.clear()
+    second = client.get("/api/users/?limit=2&fields=id,username")
+
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert statements == []
+
+
+def test_cached_page_answers_if_none_match(authenticated_user, user_ids, statements):
+    etag = client.get("/api/users/").headers["ETag"]
+    statements.clear()
+    response = client.get("/api/users/", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert statements == []
+
+
+def test_write_invalidates_cached_pages(authenticated_user, user_ids):
+    before = client.get("/api/users/")
+    generation = page_cache.generation
+
+    response = client.patch(f"/api/users/{user_ids[0]}", json={"full_name": "Ana"})
+    assert response.status_code == 200
+    assert page_cache.generation == generation + 1
+
+    after = client.get("/api/users/")
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert after.json()["result"][0]["full_name"] == "Ana"
+
+
+def test_filters_are_part_of_the_key(authenticated_user, user_ids):
+    everyone = client.get("/api/users/").json()["result"]
+    searched = client.get("/api/users/?q=user1").json()["result"]
+
+    assert len(everyone) == 3
+    assert [user["username"] for user in searched] == ["user1"]
@@ -0,0 +1,79 @@
+import time
+from unittest.mock import MagicMock
+from api.controllers.user import delete_user, patch_user
+from api.db.models import User
+from api.schemas.user import UserUpdateSchema
+from api.security.principal_cache import PrincipalCache, principal_cache
+
+
+def principal(user_id):
+    return User(id=user_id, username=f"user{user_id}")
+
+
+def test_hit_and_miss_counters():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    assert cache.get("token") is None
+    cache.put("token", principal(1), cache.generation)
+    assert cache.get("token").username == "user1"
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_lru_eviction():
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    cache.put("a", principal(1), cache.generation)
+    cache.put("b", principal(2), cache.generation)
+    cache.get("a")
+    cache.put("c", principal(3), cache.generation)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_do_not_outlive_the_token():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    cache.put("expired", principal(1), cache.generation, time.time() - 1)
+    assert cache.get("expired") is None
+
+    cache = PrincipalCache(maxsize=10, ttl=0.01)
+    cache.put("short", principal(1), cache.generation)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+
+
+def test_invalidate_user_drops_all_of_its_tokens():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    cache.put("a", principal(1), cache.generation)
+    cache.put("b", principal(1), cache.generation)
+    cache.put("c", principal(2), cache.generation)
+    cache.invalidate_user(1)
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_user_writes_invalidate_cached_principals():
+    db = MagicMock()
+    db.execute.return_value.first.return_value = principal(7)
+    principal_cache.put("patched", principal(7), principal_cache.generation)
+    patch_user(db, 7, UserUpdateSchema(is_active=False))
+    assert principal_cache.get("patched") is None
+
+    principal_cache.put("deleted", principal(7), principal_cache.generation)
+    delete_user(db, 7)
+    assert principal_cache.get("deleted") is None
+
+
+def test_principal_loaded_before_an_invalidation_is_not_cached():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    # The request takes the generation and loads the active user, then a
+    # deactivation commits before the principal is stored.
+    generation = cache.generation
+    cache.invalidate_user(1)
+    cache.put("token", principal(1), generation)
+    assert cache.get("token") is None
+    assert cache.stats()["stale_puts"] == 1
+
+    cache.put("token", principal(1), cache.generation)
+    assert cache.get("token") is not None
@@ -0,0 +1,114 @@
+import re
+from fastapi.testclient import TestClient
+from main import app
+from api.db.database import get_auth_db, get_db
+from api.security.hashing import hash_password
+from api.security.principal_cache import principal_cache
+from api.tests.query_plan import explain, full_scans
+from api.tests.sqlite_session import (
+    make_users,
+    sqlite_db,
+    sqlite_session_factory,
+    statements,
+)
+import pytest
+
+client = TestClient(app)
+
+PASSWORD = "secret"
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+# Every request the users API and authentication serve. Each one runs against a
+# temporary database and the plan of every statement it issued is checked.
+REQUESTS = {
+    "login": ("POST", "/token", {"data": {"username": "user0", "password": PASSWORD}}),
+    "me": ("GET", "/api/users/me", {}),
+    "list": ("GET", "/api/users/?skip=1&limit=2&include_total=true", {}),
+    "list_cursor": ("GET", "/api/users/?cursor=&limit=2", {}),
+    "list_filtered": (
+        "GET",
+        "/api/users/?country=USA&city=Miami&min_age=20&max_age=40&q=user"
+        "&include_total=true",
+        {},
+    ),
+    "list_fields": ("GET", "/api/users/?fields=id,email&min_age=20&max_age=40", {}),
+    "detail": ("GET", "/api/users/2", {}),
+    "detail_fields": ("GET", "/api/users/2?fields=id,email", {}),
+    "stats": ("GET", "/api/users/stats", {}),
+    "lookup": ("POST", "/api/users/lookup", {"json": {"ids": [2, 3, 99]}}),
+    "export": ("GET", "/api/users/export", {}),
+    "create": (
+        "POST",
+        "/api/users/",
+        {"json": {"username": "new", "hashed_password": "x", "email": "new@x.com"}},
+    ),
+    "import": (
+        "POST",
+        "/api/users/import",
+        {
+            "content": '{"username": "imp", "hashed_password": "x", "email": "imp@x.com"}',
+            "headers": NDJSON,
+        },
+    ),
+    "put": (
+        "PUT",
+        "/api/users/2",
+        {"json": {"username": "renamed", "email": "renamed@x.com", "city": "Lima"}},
+    ),
+    "patch": ("PATCH", "/api/users/2", {"json": {"age": 50}}),
+    "delete": ("DELETE", "/api/users/3", {}),
+    "bulk_patch": (
+        "PATCH",
+        "/api/users/bulk",
+        {"json": {"ids": [2, 3], "filter": {"country": "USA"}, "changes": {"age": 1}}},
+    ),
+    "bulk_delete": ("DELETE", "/api/users/bulk", {"json": {"ids": [2, 3]}}),
+}
+
+
+@pytest.fixture
+def logged_in(sqlite_db, make_users):
+    """Seeds the test database and logs in as one of its users."""
+    make_users(
+        5,
+        hashed_password=hash_password(PASSWORD),
+        country="USA",
+        city="Miami",
+        age=30,
+    )
+    # Authentication reads the same temporary database as the users API.
+    app.dependency_overrides[get_auth_db] = app.dependency_overrides[get_db]
+    token = client.post(
+        "/token", data={"username": "user0", "password": PASSWORD}
+    ).json()["access_token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+    principal_cache.clear()
+    yield
+    client.headers.pop("Authorization", None)
+    app.dependency_overrides.pop(get_auth_db, None)
+
+
+def planned(statement: str) -> bool:
+    return statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE"))
+
+
+@pytest.mark.parametrize("name", REQUESTS)
+def test_queries_use_indexes(sqlite_db, logged_in, statements, name):
+    method, url, options = REQUESTS[name]
+    statements.clear()
+    response = client.request(method, url, **options)
+    assert response.status_code < 400, response.text
+
+    engine = sqlite_db.kw["bind"]
+    checked = 0
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            if not planned(statement):
+                continue
+            checked += 1
+            plan = explain(conn, statement, parameters)
+            # Unfiltered pages and the export read the table in id order by
+            # design, any statement with a WHERE clause must use an index.
+            if re.search(r"\bWHERE\b", statement):
+                assert not full_scans(plan), f"{statement}\n{plan}"
+    assert checked, "no statement was recorded"
@@ -0,0 +1,109 @@
+from fastapi.testclient import TestClient
+from main import app
+from api.controllers.user import _user_query
+from api.db.models import User
+from api.schemas.user import UserSearchSchema
+from api.tests.auth_override import authenticated_user
+from api.tests.query_plan import explain, full_scans
+from api.tests.sqlite_session import sqlite_db, sqlite_session_factory
+import pytest
+
+client = TestClient(app)
+pytestmark = pytest.mark.usefixtures("authenticated_user")
+
+
+@pytest.fixture
+def users(sqlite_db):
+    with sqlite_db() as db:
+        db.add_all(
+            [
+                User(
+                    username="ana",
+                    email="ana@example.com",
+                    full_name="Ana Garcia",
+                    city="Bogota",
+                    country="Colombia",
+                    age=25,
+                ),
+                User(
+                    username="bob",
+                    email="bob@example.com",
+                    full_name="Bob Stone",
+                    city="Medellin",
+                    country="Colombia",
+                    age=40,
+                ),
+                User(
+                    username="carla",
+                    email="carla@mail.com",
+                    full_name="Carla Gomez",
+                    city="New York",
+                    country="USA",
+                    age=33,
+                ),
+            ]
+        )
+        db.commit()
+
+
+def usernames(response):
+    assert response.status_code == 200
+    return [user["username"] for user in response.json()["result"]]
+
+
+def test_filters(users):
+    assert usernames(client.get("/api/users/?country=Colombia")) == ["ana", "bob"]
+    assert usernames(client.get("/api/users/?country=Colombia&city=Bogota")) == ["ana"]
+    assert usernames(client.get("/api/users/?city=New York")) == ["carla"]
+    assert usernames(client.get("/api/users/?min_age=30&cursor=")) == ["bob", "carla"]
+    assert usernames(client.get("/api/users/?min_age=30&max_age=35")) == ["carla"]
+
+
+def test_search(users):
+    assert usernames(client.get("/api/users/?q=gar")) == ["ana"]
+    assert usernames(client.get("/api/users/?q=example")) == ["ana", "bob"]
+    assert usernames(client.get("/api/users/?q=go&country=USA")) == ["carla"]
+    assert usernames(client.get('/api/users/?q=bob"(*')) == ["bob"]
+    assert usernames(client.get("/api/users/?q=NOT")) == []
+
+    response = client.get("/api/users/?q=colombia&include_total=true")
+    assert response.json()["total"] == 0
+
+
+def test_search_follows_writes(users):
+    client.patch("/api/users/bulk", json={"ids": [1], "changes": {"full_name": "Zoe"}})
+    assert usernames(client.get("/api/users/?q=zoe")) == ["ana"]
+    assert usernames(client.get("/api/users/?q=garcia")) == []
+
+    client.delete("/api/users/2")
+    assert usernames(client.get("/api/users/?q=example")) == ["ana"]
+
+
+def query_plan(db, query) -> list:
+    sql = query.statement.compile(
+        dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}
+    )
+    return explain(db.connection(), str(sql))
+
+
+@pytest.mark.parametrize(
+    "filters, index",
+    [
+        ({"country": "Colombia"}, "ix_users_country_city"),
+        ({"country": "Colombia", "city": "Bogota"}, "ix_users_country_city"),
+        ({"city": "Bogota"}, "ix_users_city"),
+        ({"min_age": 20}, "ix_users_age"),
+        ({"min_age": 20, "max_age": 30}, "ix_users_age"),
+        ({"q": "ana"}, "users_fts"),
+    ],
+)
+def test_filters_use_indexes(sqlite_db, filters, index):
+    filters = UserSearchSchema(**filters)
+    with sqlite_db() as db:
+        for query in (
+            _user_query(db, None, filters).offset(0).limit(100),
+            _user_query(db, ["id", "username"], filters).offset(0).limit(100),
+        ):
+            plan = query_plan(db, query)
+            assert not full_scans(plan), plan
+            assert any(index in step for step in plan), plan
@@ -0,0 +1,124 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import httpx
+from api.db.database import build_engine
+from api.db.models import User
+from api.db.schema import ensure_schema
+from api.security.hashing import hash_password
+from sqlalchemy.orm import Session
+import pytest
+
+PASSWORD = "server-password"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get(url: str, token: str) -> httpx.Response:
+    # A new connection per request, so they are spread over the workers.
+    with httpx.Client() as client:
+        return client.get(url, headers={"Authorization": f"Bearer {token}"})
+
+
+def wait_for(condition, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            result = condition()
+            if result:
+                return result
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise AssertionError("timed out")
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = tmp_path / "server.sqlite3"
+    engine = build_engine(f"sqlite:///{path}")
+    ensure_schema(engine)
+    with Session(engine) as db:
+        db.add(
+            User(
+                username="admin",
+                hashed_password=hash_password(PASSWORD),
+                email="admin@example.com",
+            )
+        )
+        db.commit()
+    engine.dispose()
+
+    port = free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{path}",
+        "ASYNC_DATABASE_URL": f"sqlite+aiosqlite:///{path}",
+        "SECRET": "test-secret",
+        "CACHE_SYNC_INTERVAL": "0.2",
+        "WORKER_HEARTBEAT_INTERVAL": "0.2",
+        "HASH_POOL_SIZE": "1",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "api.server", "--workers", "2", "--port", str(port)],
+        env=env,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    token = wait_for(
+        lambda: httpx.post(
+            f"{base}/token", data={"username": "admin", "password": PASSWORD}
+        ).json()["access_token"]
+    )
+    yield process, base, token
+    if process.poll() is None:
+        process.kill()
+        process.wait()
+
+
+def worker_pids(base: str, token: str) -> set:
+    response = get(f"{base}/api/system/workers", token)
+    return {worker["pid"] for worker in response.json()["workers"]}
+
+
+def test_workers_share_writes_and_restart_gracefully(server):
+    process, base, token = server
+    pids = wait_for(
+        lambda: len(worker_pids(base, token)) == 2 and worker_pids(base, token)
+    )
+
+    # Fill the list page cache of every worker.
+    answered = set()
+    for _ in range(40):
+        response = get(f"{base}/api/users/", token)
+        assert response.json()["result"][0]["full_name"] is None
+        answered.add(get(f"{base}/api/system/workers", token).json()["pid"])
+    assert answered == pids
+
+    with httpx.Client() as client:
+        response = client.patch(
+            f"{base}/api/users/1",
+            json={"full_name": "Renamed"},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+    assert response.status_code == 200
+
+    time.sleep(1)
+    for _ in range(20):
+        response = get(f"{base}/api/users/", token)
+        assert response.json()["result"][0]["full_name"] == "Renamed"
+
+    process.send_signal(signal.SIGHUP)
+    wait_for(lambda: worker_pids(base, token).isdisjoint(pids), timeout=60)
+    assert len(worker_pids(base, token)) == 2
+    assert get(f"{base}/api/users/", token).status_code == 200
+
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(timeout=60) == 0
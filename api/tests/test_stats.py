@@ -0,0 +1,108 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from main import app
+from api.db.schema import ensure_schema
+from api.tests.auth_override import authenticated_user
+from api.tests.sqlite_session import (
+    make_users,
+    sqlite_db,
+    sqlite_session_factory,
+)
+import pytest
+
+client = TestClient(app)
+pytestmark = pytest.mark.usefixtures("authenticated_user")
+
+
+@pytest.fixture
+def user_ids(sqlite_db, make_users):
+    return make_users(
+        5,
+        country=lambda index: "USA" if index % 2 else "Colombia",
+        city=lambda index: None if index == 0 else "City",
+    )
+
+
+def groups(stats: dict, dimension: str) -> dict:
+    return {group["value"]: group["count"] for group in stats[dimension]}
+
+
+def recount(db) -> dict:
+    stats = {"total": db.execute(text("SELECT COUNT(*) FROM users")).scalar()}
+    for dimension in ("country", "city", "is_active"):
+        rows = db.execute(
+            text(f"SELECT {dimension}, COUNT(*) FROM users GROUP BY {dimension}")
+        )
+        stats[dimension] = {
+            (
+                bool(value) if dimension == "is_active" and value is not None else value
+            ): count
+            for value, count in rows
+        }
+    return stats
+
+
+def get_stats() -> dict:
+    response = client.get("/api/users/stats")
+    assert response.status_code == 200
+    stats = response.json()
+    return {
+        "total": stats["total"],
+        **{
+            dimension: groups(stats, dimension)
+            for dimension in ("country", "city", "is_active")
+        },
+    }
+
+
+def test_stats(user_ids):
+    stats = client.get("/api/users/stats").json()
+    assert stats["total"] == 5
+    assert stats["country"] == [
+        {"value": "Colombia", "count": 3},
+        {"value": "USA", "count": 2},
+    ]
+    assert groups(stats, "city") == {"City": 4, None: 1}
+    assert groups(stats, "is_active") == {True: 5}
+
+
+def test_stats_follow_writes(sqlite_db, user_ids):
+    client.patch(f"/api/users/{user_ids[0]}", json={"country": "Peru", "city": "Lima"})
+    client.patch(
+        "/api/users/bulk",
+        json={
+            "ids": user_ids,
+            "filter": {"country": "USA"},
+            "changes": {"is_active": False},
+        },
+    )
+    client.delete(f"/api/users/{user_ids[2]}")
+    client.request("DELETE", "/api/users/bulk", json={"ids": user_ids[3:4]})
+
+    stats = get_stats()
+    assert stats["total"] == 3
+    assert stats["country"] == {"Peru": 1, "Colombia": 1, "USA": 1}
+    assert stats["is_active"] == {True: 2, False: 1}
+    with sqlite_db() as db:
+        assert stats == recount(db)
+
+    response = client.get("/api/users/?include_total=true")
+    assert response.json()["total"] == 3
+
+
+def test_stats_rebuilt_for_existing_database(
+    sqlite_session_factory, sqlite_db, user_ids
+):
+    engine = sqlite_session_factory.kw["bind"]
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TRIGGER user_stats_insert")
+        conn.exec_driver_sql("DELETE FROM user_stats")
+        conn.exec_driver_sql(
+            "INSERT INTO users (username, email, country) VALUES ('late', 'late@x', 'USA')"
+        )
+
+    ensure_schema(engine)
+
+    stats = get_stats()
+    assert stats["total"] == 6
+    assert stats["country"] == {"Colombia": 3, "USA": 3}
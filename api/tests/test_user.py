@@ -1,4 +1,8 @@
+import asyncio
+import shutil
+from pathlib import Path
 from api.controllers.user import get_user_id
+from api.db.database import database
 from api.db.models import User, UserView
 from fastapi.testclient import TestClient
 from main import app
@@ -7,6 +11,25 @@ import pytest
 
 client = TestClient(app)
 
+BUNDLED_DATABASE = Path(__file__).resolve().parents[2] / "database.sqlite3"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def bundled_database(tmp_path_factory):
+    # A copy of the bundled database, so migrating it and logging in do not
+    # change the tracked file.
+    path = tmp_path_factory.mktemp("bundled") / "database.sqlite3"
+    shutil.copy(BUNDLED_DATABASE, path)
+    previous = database.url, database.async_url
+    asyncio.run(database.dispose())
+    database.url = f"sqlite:///{path}"
+    database.async_url = f"sqlite+aiosqlite:///{path}"
+    # The lifespan creates it when the app starts, a bare TestClient skips it.
+    database.create_schema()
+    yield
+    asyncio.run(database.dispose())
+    database.url, database.async_url = previous
+
 
 @pytest.fixture
 def token():
@@ -21,7 +44,6 @@ def test_get_user_me(token):
     response = client.get("/api/users/me", headers=headers)
     data = {
         "username": "test",
-        "hashed_password": "$2b$12$xXgZtEnOJxiEHxRAU2Vu0eDihgQ3sRv2JM5YLMKGf7FJgiFysRTkW",
         "full_name": "Testing App",
         "city": "New York",
         "phone_number": "123456789",
@@ -33,6 +55,7 @@ def test_get_user_me(token):
     }
     assert response.status_code == 200
     assert response.json() == data
+    assert "hashed_password" not in response.json()
 
 
 def test_get_user_me_without_token():
@@ -54,6 +77,9 @@ def test_create_user(token, mock_db_session):
         "phone_number": "123456789",
         "is_active": True,
     }
+    mock_db_session.execute.return_value.one.return_value = User(
+        id=1, **{k: v for k, v in new_user_data.items() if k != "id"}
+    )
     headers = {"Authorization": f"Bearer {str(token)}"}
     response = client.post("/api/users/", headers=headers, json=new_user_data)
     assert response.status_code == 200
@@ -66,12 +92,13 @@ def test_create_user(token, mock_db_session):
     assert data["country"] == "USA"
     assert data["phone_number"] == "123456789"
     assert data["is_active"] == True
-    mock_db_session.add.assert_called()
+    assert "hashed_password" not in data
+    mock_db_session.execute.assert_called()
     mock_db_session.commit.assert_called()
 
 
 def test_get_users(token, mock_db_session):
-    mock_db_session.query.return_value.offset.return_value.limit.return_value.all.return_value = [
+    mock_db_session.query.return_value.order_by.return_value.offset.return_value.limit.return_value.all.return_value = [
         User(id=2, username="user1", email="user1@example.com", full_name="User One"),
         User(id=3, username="user2", email="user2@example.com", full_name="User Two"),
     ]
@@ -126,12 +153,42 @@ def test_delete_user(token, mock_db_session):
         "email": "existing_user@example.com",
         "full_name": "Existing User",
     }
-    mock_db_session.query().filter_by().first.return_value = User(
+    mock_db_session.execute.return_value.first.return_value = User(
         id=existing_user_id, **existing_user_data
     )
+    mock_db_session.execute.reset_mock()
 
     headers = {"Authorization": f"Bearer {str(token)}"}
     response = client.delete(f"/api/users/{existing_user_id}", headers=headers)
     assert response.status_code == 200
     assert response.json()["message"] == "User deleted successfully"
-    mock_db_session.delete.assert_called_once()
+    # One DELETE ... RETURNING, no SELECT of the user first.
+    mock_db_session.execute.assert_called_once()
+
+
+def test_get_users_cursor(token, mock_db_session):
+    query = mock_db_session.query.return_value.filter.return_value
+    query.order_by.return_value.limit.return_value.all.return_value = [
+        UserView(id=2, username="user1", email="user1@example.com"),
+        UserView(id=3, username="user2", email="user2@example.com"),
+        UserView(id=4, username="user3", email="user3@example.com"),
+    ]
+    headers = {"Authorization": f"Bearer {str(token)}"}
+    response = client.get("/api/users/?cursor=&limit=2", headers=headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["users_ids"] == [2, 3]
+    assert data["next_cursor"] is not None
+
+    response = client.get(
+        f"/api/users/?cursor={data['next_cursor']}&limit=2", headers=headers
+    )
+    assert response.status_code == 200
+    query.order_by.return_value.limit.assert_called_with(3)
+
+
+def test_get_users_invalid_cursor(token):
+    headers = {"Authorization": f"Bearer {str(token)}"}
+    response = client.get("/api/users/?cursor=not-a-cursor", headers=headers)
+    assert response.status_code == 400
@@ -0,0 +1,233 @@
+import asyncio
+import os
+import subprocess
+import sys
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from api.controllers import user_async
+from api.db.database import get_async_db, get_db
+from api.db.models import User
+from api.routers import users_async, users_common
+from api.schemas.user import UserSchema, UserUpdateSchema
+from api.db.schema import ensure_schema
+from api.security.authentication import get_user_disabled_current
+from api.utils.page_cache import page_cache
+
+
+@pytest.fixture
+def sync_session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'async.sqlite3'}")
+    ensure_schema(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def async_session_factory(tmp_path, sync_session_factory):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.sqlite3'}")
+    yield async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def async_client(sync_session_factory, async_session_factory):
+    """The users API as main.py mounts it with DB_DRIVER=async."""
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.include_router(users_common.router, prefix="/api")
+    app.include_router(users_async.router, prefix="/api")
+
+    def override_get_db():
+        with sync_session_factory() as db:
+            yield db
+
+    async def override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_user_disabled_current] = lambda: User(id=1)
+    page_cache.invalidate()
+    with TestClient(app) as client:
+        yield client
+    page_cache.invalidate()
+
+
+def run(session_factory, action):
+    async def main():
+        async with session_factory() as db:
+            return await action(db)
+
+    return asyncio.run(main())
+
+
+def new_user(index):
+    return UserSchema(
+        username=f"user{index}",
+        hashed_password="secret",
+        email=f"user{index}@example.com",
+    )
+
+
+def test_async_crud(async_session_factory):
+    created = run(
+        async_session_factory,
+        lambda db: user_async.create_user(db, new_user(1), "hash"),
+    )
+    assert created.id is not None
+    assert created.hashed_password == "hash"
+
+    patched = run(
+        async_session_factory,
+        lambda db: user_async.patch_user(
+            db, created.id, UserUpdateSchema(city="Bogota")
+        ),
+    )
+    assert patched.city == "Bogota"
+    assert patched.username == "user1"
+
+    deleted = run(
+        async_session_factory, lambda db: user_async.delete_user(db, created.id)
+    )
+    assert deleted["message"] == "User deleted successfully"
+
+    with pytest.raises(HTTPException) as error:
+        run(async_session_factory, lambda db: user_async.get_user_id(db, created.id))
+    assert error.value.status_code == 404
+
+
+def test_async_duplicate_user(async_session_factory):
+    run(
+        async_session_factory,
+        lambda db: user_async.create_user(db, new_user(1), "hash"),
+    )
+    with pytest.raises(HTTPException) as error:
+        run(
+            async_session_factory,
+            lambda db: user_async.create_user(db, new_user(1), "hash"),
+        )
+    assert error.value.status_code == 400
+
+
+def test_async_cursor_pagination(async_session_factory):
+    for index in range(5):
+        run(
+            async_session_factory,
+            lambda db: user_async.create_user(db, new_user(index), "hash"),
+        )
+
+    first = run(
+        async_session_factory,
+        lambda db: user_async.get_users_page(db, "", 3, include_total=True),
+    )
+    assert len(first["users_ids"]) == 3
+    assert first["total"] == 5
+
+    second = run(
+        async_session_factory,
+        lambda db: user_async.get_users_page(db, first["next_cursor"], 3),
+    )
+    assert len(second["users_ids"]) == 2
+    assert second["next_cursor"] is None
+    assert set(first["users_ids"]).isdisjoint(second["users_ids"])
+
+
+def test_async_driver_serves_the_common_routes(tmp_path):
+    path = tmp_path / "driver.sqlite3"
+    script = """
+import main
+from fastapi.testclient import TestClient
+from api.db.models import User
+from api.security.authentication import get_user_disabled_current
+main.app.dependency_overrides[get_user_disabled_current] = lambda: User(id=1)
+with TestClient(main.app) as client:
+    response = client.get("/api/users/stats")
+    assert response.status_code == 200, response.text
+    assert response.json()["total"] == 0
+    response = client.get("/api/users/export")
+    assert response.status_code == 200, response.text
+    response = client.get("/api/users/?fields=username&country=USA")
+    assert response.status_code == 200, response.text
+    assert "ETag" in response.headers
+"""
+    env = {
+        **os.environ,
+        "DB_DRIVER": "async",
+        "DATABASE_URL": f"sqlite:///{path}",
+        "ASYNC_DATABASE_URL": f"sqlite+aiosqlite:///{path}",
+        "SECRET": "test-secret",
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", script], env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_async_routes_match_the_sync_ones(sync_session_factory, async_client):
+    with sync_session_factory() as db:
+        users = [
+            User(
+                username=f"user{index}",
+                hashed_password="hash",
+                email=f"user{index}@example.com",
+                full_name=f"Ana Garcia {index}" if index < 2 else f"Other {index}",
+                country="USA" if index % 2 else "Colombia",
+            )
+            for index in range(4)
+        ]
+        db.add_all(users)
+        db.commit()
+        ids = [user.id for user in users]
+
+    response = async_client.get("/api/users/?fields=username&country=USA")
+    assert response.json()["result"] == [
+        {"id": ids[1], "username": "user1"},
+        {"id": ids[3], "username": "user3"},
+    ]
+    etag = response.headers["ETag"]
+    response = async_client.get(
+        "/api/users/?fields=username&country=USA", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    response = async_client.get("/api/users/?q=ana gar&include_total=true")
+    assert response.json()["users_ids"] == ids[:2]
+    assert response.json()["total"] == 2
+
+    response = async_client.get(f"/api/users/{ids[0]}")
+    etag = response.headers["ETag"]
+    assert etag == f'"{ids[0]}-1"'
+    response = async_client.get(f"/api/users/{ids[0]}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    response = async_client.get(f"/api/users/{ids[0]}?fields=city")
+    assert response.json() == {"id": ids[0], "city": None}
+
+    response = async_client.patch(
+        f"/api/users/{ids[0]}", json={"city": "Lima"}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{ids[0]}-2"'
+    response = async_client.patch(
+        f"/api/users/{ids[0]}", json={"city": "Cusco"}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 412
+    response = async_client.patch("/api/users/999", json={"city": "Lima"})
+    assert response.status_code == 404
+
+    assert async_client.get("/api/users/stats").json()["total"] == 4
+    response = async_client.post("/api/users/lookup", json={"ids": ids[:2]})
+    assert response.json()["not_found"] == []
+    response = async_client.patch(
+        "/api/users/bulk", json={"ids": ids, "changes": {"is_active": False}}
+    )
+    assert response.json()["affected_ids"] == ids
+    response = async_client.get("/api/users/export")
+    assert len(response.text.splitlines()) == 4
+
+    assert async_client.delete(f"/api/users/{ids[3]}").status_code == 200
+    assert async_client.get("/api/users/").json()["users_ids"] == ids[:3]
@@ -0,0 +1,117 @@
+import threading
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from main import app
+from api.controllers import user as user_controller
+from api.db.database import build_engine, database, enable_savepoints
+from api.db.models import User
+from api.db.write_queue import WriteQueue
+from api.tests.auth_override import authenticated_user
+from api.tests.sqlite_session import sqlite_db, sqlite_session_factory
+import pytest
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def write_queue(sqlite_session_factory):
+    engine = enable_savepoints(build_engine(str(sqlite_session_factory.kw["bind"].url)))
+    write_queue = WriteQueue(
+        sessionmaker(bind=engine, autoflush=False, expire_on_commit=False),
+        max_batch=16,
+        max_wait=0.05,
+    )
+    yield write_queue
+    write_queue.shutdown()
+    engine.dispose()
+
+
+def add_user(db, username):
+    _user = User(username=username, email=f"{username}@example.com")
+    db.add(_user)
+    db.flush()
+    return _user.id
+
+
+def test_batches_concurrent_writes(sqlite_session_factory, write_queue):
+    results = []
+
+    def submit(username):
+        try:
+            results.append(write_queue.run(add_user, username))
+        except IntegrityError as e:
+            results.append(e)
+
+    names = [f"user{index}" for index in range(8)] + ["user0"]
+    threads = [threading.Thread(target=submit, args=(name,)) for name in names]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(isinstance(result, IntegrityError) for result in results) == 1
+    assert len({result for result in results if isinstance(result, int)}) == 8
+    with sqlite_session_factory() as db:
+        assert sorted(name for (name,) in db.query(User.username)) == names[:8]
+
+    stats = write_queue.stats()
+    assert stats["jobs"] == 9
+    assert stats["failed"] == 1
+    assert stats["batches"] < 9
+
+
+def test_failed_job_does_not_roll_back_the_batch(sqlite_session_factory, write_queue):
+    barrier = threading.Barrier(3)
+    outcomes = []
+
+    def submit(job, *args):
+        barrier.wait()
+        try:
+            outcomes.append(write_queue.run(job, *args))
+        except Exception as e:
+            outcomes.append(e)
+
+    def fail(db):
+        add_user(db, "broken")
+        raise ValueError("rejected")
+
+    threads = [
+        threading.Thread(target=submit, args=(add_user, "ana")),
+        threading.Thread(target=submit, args=(fail,)),
+        threading.Thread(target=submit, args=(add_user, "bob")),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(isinstance(outcome, ValueError) for outcome in outcomes) == 1
+    with sqlite_session_factory() as db:
+        assert sorted(name for (name,) in db.query(User.username)) == ["ana", "bob"]
+
+
+@pytest.mark.usefixtures("authenticated_user")
+def test_user_routes_through_the_write_queue(sqlite_db, write_queue, monkeypatch):
+    monkeypatch.setattr(user_controller, "WRITE_QUEUE_ENABLED", True)
+    monkeypatch.setattr(database, "_write_queue", write_queue)
+    body = {"username": "ana", "hashed_password": "secret", "email": "ana@x.com"}
+
+    created = client.post("/api/users/", json=body)
+    assert created.status_code == 200
+    user_id = created.json()["id"]
+    assert client.post("/api/users/", json=body).status_code == 400
+
+    patched = client.patch(f"/api/users/{user_id}", json={"city": "Lima"})
+    assert patched.json()["city"] == "Lima"
+    assert patched.headers["ETag"] == f'"{user_id}-2"'
+    taken = {"username": "bob", "email": "ana@x.com"}
+    client.post("/api/users/", json={**body, **taken, "email": "bob@x.com"})
+    assert (
+        client.patch(f"/api/users/{user_id}", json={"username": "bob"}).status_code
+        == 400
+    )
+
+    assert client.delete(f"/api/users/{user_id}").status_code == 200
+    assert client.delete(f"/api/users/{user_id}").status_code == 404
+    assert write_queue.stats()["jobs"] == 7
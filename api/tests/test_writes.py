@@ -0,0 +1,68 @@
+from fastapi.testclient import TestClient
+from main import app
+from api.tests.auth_override import authenticated_user
+from api.tests.sqlite_session import (
+    make_users,
+    sqlite_db,
+    sqlite_session_factory,
+    statements,
+)
+import pytest
+
+client = TestClient(app)
+pytestmark = pytest.mark.usefixtures("authenticated_user")
+
+
+@pytest.fixture
+def user_ids(sqlite_db, make_users):
+    return make_users(2)
+
+
+def test_writes_use_one_statement(user_ids, statements):
+    user_id = user_ids[0]
+    writes = [
+        (
+            "POST",
+            "/api/users/",
+            {"username": "new", "hashed_password": "x", "email": "new@e.com"},
+        ),
+        ("PUT", f"/api/users/{user_id}", {"username": "put", "email": "put@e.com"}),
+        ("PATCH", f"/api/users/{user_id}", {"city": "Lima"}),
+        ("DELETE", f"/api/users/{user_id}", None),
+    ]
+    for method, url, body in writes:
+        statements.clear()
+        response = client.request(method, url, json=body)
+        assert response.status_code == 200
+        assert len(statements) == 1
+        assert "RETURNING" in statements[0][0]
+
+
+def test_writes_return_the_changed_user(user_ids):
+    user_id = user_ids[0]
+
+    response = client.patch(f"/api/users/{user_id}", json={"city": "Lima"})
+    assert response.json()["city"] == "Lima"
+    assert response.json()["username"] == "user0"
+    assert response.headers["ETag"] == f'"{user_id}-2"'
+
+    response = client.delete(f"/api/users/{user_id}")
+    assert response.json()["user_deleted"]["city"] == "Lima"
+    assert "hashed_password" not in response.json()["user_deleted"]
+
+
+def test_write_errors(user_ids):
+    assert client.patch("/api/users/999", json={"age": 1}).status_code == 404
+    assert (
+        client.put("/api/users/999", json={"username": "x", "email": "x"}).status_code
+        == 404
+    )
+    assert client.delete("/api/users/999").status_code == 404
+
+    response = client.patch(f"/api/users/{user_ids[0]}", json={"username": "user1"})
+    assert response.status_code == 400
+    response = client.post(
+        "/api/users/",
+        json={"username": "user1", "hashed_password": "x", "email": "other@e.com"},
+    )
+    assert response.status_code == 400
@@ -0,0 +1,162 @@
+import threading
+from sqlalchemy import delete, func, select
+from api.db.models import UserChange
+from api.security.principal_cache import principal_cache
+from api.utils.page_cache import page_cache
+from core.config import CACHE_SYNC_INTERVAL, CACHE_SYNC_RETENTION
+
+
+class CacheSync:
+    """
+    Keeps the in-process caches in step with writes made by other processes.
+
+    Triggers append the id of every inserted, updated or deleted user to
+    user_changes. Every `interval` seconds a thread checks `PRAGMA data_version`
+    on a connection of its own, which only moves after another connection
+    committed, and then reads the new entries: the principals of those users
+    are dropped and the list pages invalidated. A write on one worker is so
+    seen by all the others within about `interval` seconds. About the last
+    `retention` entries are kept, a process that fell further behind clears
+    its caches completely. The log is trimmed in steps of a tenth of the
+    retention by whichever process gets there first, so trimming takes the
+    write lock once per step instead of once per poll of every process.
+    """
+
+    def __init__(self, interval: float, retention: int):
+        self.interval = interval
+        self.retention = retention
+        self.trim_step = max(1, retention // 10)
+        self._engine = None
+        self._connection = None
+        self._data_version = None
+        self._last_seq = 0
+        self._thread = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._polls = 0
+        self._changes = 0
+        self._resets = 0
+        self._errors = 0
+        self._trims = 0
+
+    def open(self, engine):
+        """Starts following the log from its current end."""
+        connection = engine.connect()
+        try:
+            self._last_seq = connection.scalar(
+                select(func.coalesce(func.max(UserChange.seq), 0))
+            )
+            connection.rollback()
+        except Exception:
+            connection.close()
+            raise
+        self._connection = connection
+
+    def _changed(self) -> bool:
+        if self._connection.dialect.name != "sqlite":
+            return True
+        data_version = self._connection.exec_driver_sql("PRAGMA data_version").scalar()
+        changed = data_version != self._data_version
+        self._data_version = data_version
+        return changed
+
+    def poll(self) -> int:
+        """Applies the changes logged since the last poll and returns how many."""
+        connection = self._connection
+        with self._lock:
+            self._polls += 1
+        if not self._changed():
+            return 0
+        rows = connection.execute(
+            select(UserChange.seq, UserChange.user_id)
+            .where(UserChange.seq > self._last_seq)
+            .order_by(UserChange.seq)
+        ).all()
+        connection.rollback()
+        if not rows:
+            return 0
+
+        # Entries are numbered without gaps, a gap means they were trimmed
+        # before this process read them.
+        if rows[0].seq != self._last_seq + 1 or any(
+            row.user_id is None for row in rows
+        ):
+            principal_cache.clear()
+            with self._lock:
+                self._resets += 1
+        else:
+            for user_id in {row.user_id for row in rows}:
+                principal_cache.invalidate_user(user_id)
+        page_cache.invalidate()
+        self._last_seq = rows[-1].seq
+        with self._lock:
+            self._changes += len(rows)
+
+        self._trim(connection)
+        return len(rows)
+
+    def _trim(self, connection):
+        cutoff = self._last_seq - self.retention
+        if cutoff < self.trim_step:
+            return
+        # A read, another process may have trimmed already.
+        oldest = connection.scalar(select(func.min(UserChange.seq)))
+        if oldest is None or cutoff - oldest + 1 < self.trim_step:
+            connection.rollback()
+            return
+        connection.execute(delete(UserChange).where(UserChange.seq <= cutoff))
+        connection.commit()
+        with self._lock:
+            self._trims += 1
+
+    def _loop(self):
+        while True:
+            try:
+                if self._connection is None:
+                    self.open(self._engine)
+                else:
+                    self.poll()
+            except Exception as e:
+                # A locked or not yet migrated database, try again next time.
+                with self._lock:
+                    self._errors += 1
+                if self._connection is not None:
+                    self._connection.rollback()
+            if self._stopped.wait(self.interval):
+                return
+
+    def start(self, engine):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._engine = engine
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="cache-sync", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopped.set()
+            thread.join()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+            self._data_version = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "interval": self.interval,
+                "running": self._thread is not None,
+                "last_seq": self._last_seq,
+                "polls": self._polls,
+                "changes": self._changes,
+                "resets": self._resets,
+                "trims": self._trims,
+                "errors": self._errors,
+            }
+
+
+cache_sync = CacheSync(CACHE_SYNC_INTERVAL, CACHE_SYNC_RETENTION)
@@ -0,0 +1,186 @@
+import zlib
+from typing import List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Media types worth compressing, images and archives are already compressed.
+COMPRESSIBLE_TYPES = (
+    b"application/json",
+    b"application/x-ndjson",
+    b"application/problem+json",
+    b"application/javascript",
+    b"text/",
+)
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        # wbits=31 writes the gzip header and trailer around the deflate stream.
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        # Ends the current block so the client can decode what it got so far.
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def available_encodings() -> List[str]:
+    """Encodings this process can produce, in order of preference."""
+    return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+def negotiate(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """
+    Picks the encoding for an Accept-Encoding header, or None for identity.
+
+    The highest q-value wins, ties go to the first of `encodings`, and `*`
+    stands for every encoding not listed explicitly.
+    """
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with gzip or zstd, as negotiated
+    with the Accept-Encoding request header.
+
+    Complete bodies smaller than `minimum_size` are sent as they are, since
+    the bytes saved do not pay for the CPU. Streamed responses are compressed
+    chunk by chunk and every chunk is flushed, so clients can decode the
+    stream as it arrives instead of waiting for the end.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 3,
+        zstd_level: int = 3,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"gzip": gzip_level, "zstd": zstd_level}
+        self.encodings = available_encodings()
+
+    def _encoder(self, encoding: str):
+        if encoding == "zstd":
+            return ZstdEncoder(self.levels["zstd"])
+        return GzipEncoder(self.levels["gzip"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+        encoding = negotiate(accept_encoding, self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        encoder = None
+
+        async def send_compressed(message):
+            nonlocal start, encoder
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk tells whether and how
+                # the response is compressed.
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                headers = start.get("headers", [])
+                content_type = b""
+                skip = False
+                for name, value in headers:
+                    if name == b"content-type":
+                        content_type = value
+                    elif name == b"content-encoding":
+                        skip = True
+                if (
+                    skip
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or (not more_body and len(body) < max(self.minimum_size, 1))
+                ):
+                    await send(start)
+                    await send(message)
+                    start = None
+                    return
+                encoder = self._encoder(encoding)
+                headers = [
+                    (name, value)
+                    for name, value in headers
+                    if name not in (b"content-length", b"vary")
+                ]
+                vary = [
+                    value for name, value in start.get("headers", []) if name == b"vary"
+                ]
+                vary.append(b"Accept-Encoding")
+                headers.append((b"content-encoding", encoding.encode()))
+                headers.append((b"vary", b", ".join(vary)))
+                if not more_body:
+                    compressed = encoder.compress(body) + encoder.finish()
+                    headers.append((b"content-length", str(len(compressed)).encode()))
+                    await send({**start, "headers": headers})
+                    await send({**message, "body": compressed})
+                    return
+                await send({**start, "headers": headers})
+
+            if more_body:
+                chunk = encoder.compress(body) + encoder.flush()
+            else:
+                chunk = encoder.compress(body) + encoder.finish()
+            await send({**message, "body": chunk})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,61 @@
+import hashlib
+from typing import Iterable, List, Optional, Set, Tuple
+from fastapi import Response
+from api.utils.exception_handler import exception_handler
+
+
+def _fields_digest(fields: Optional[List[str]]) -> str:
+    return hashlib.blake2b(",".join(fields).encode(), digest_size=4).hexdigest()
+
+
+def user_etag(user_id: int, version: int, fields: Optional[List[str]] = None) -> str:
+    if fields is None:
+        return f'"{user_id}-{version}"'
+    return f'"{user_id}-{version}-{_fields_digest(fields)}"'
+
+
+def page_etag(rows: Iterable[Tuple[int, int]], *params) -> str:
+    """Strong ETag of a list page from the (id, version) of its rows and its parameters."""
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(repr(params).encode())
+    for user_id, version in rows:
+        digest.update(f"{user_id}-{version};".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def _parse(header: str) -> List[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = _parse(if_none_match)
+    # If-None-Match uses the weak comparison, W/ prefixes are ignored.
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+
+def if_match_versions(if_match: Optional[str], user_id: int) -> Optional[Set[int]]:
+    """
+    Versions of `user_id` accepted by an If-Match header, None when any version is.
+
+    Only strong ETags of the full user representation can match, anything else
+    fails the precondition.
+    """
+    if not if_match:
+        return None
+    tags = _parse(if_match)
+    if "*" in tags:
+        return None
+    versions = set()
+    for tag in tags:
+        user_part, _, version = tag.strip('"').partition("-")
+        if user_part == str(user_id) and version.isdigit():
+            versions.add(int(version))
+    if not versions:
+        raise exception_handler("412_PRECONDITION_FAILED")
+    return versions
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -12,6 +12,10 @@ def exception_handler(exception):
             status_code=400,
             detail="Username or email already exists.",
         ),
+        "400_INVALID_CURSOR": HTTPException(
+            status_code=400,
+            detail="Invalid pagination cursor. Use the next_cursor value returned by the API.",
+        ),
         "401_INVALID_CREDENTIALS": HTTPException(
             status_code=401,
             detail="Invalid credentials. check the information.",
@@ -24,14 +28,35 @@ def exception_handler(exception):
         "404_NOT_FOUND": HTTPException(
             status_code=404, detail="No records found, check that they are correct."
         ),
+        "412_PRECONDITION_FAILED": HTTPException(
+            status_code=412,
+            detail="The record was modified by someone else. Get it again and retry.",
+        ),
+        "415_UNSUPPORTED_MEDIA_TYPE": HTTPException(
+            status_code=415,
+            detail="Unsupported content type. Send application/x-ndjson or text/csv.",
+        ),
         "422_UNPROCESSABLE_ENTITY": HTTPException(
             status_code=422,
             detail="No changes detected. Please provide updated values.",
         ),
+        "422_INVALID_FIELDS": HTTPException(
+            status_code=422,
+            detail="Invalid fields. Use a comma separated list of user attributes.",
+        ),
         "422_NO_ID": HTTPException(
             status_code=422,
             detail="An ID is required, but an empty array was provided.",
         ),
+        "422_TOO_MANY_IDS": HTTPException(
+            status_code=422,
+            detail="Too many IDs in one request. Split them into smaller batches.",
+        ),
+        "429_TOO_MANY_LOGIN_ATTEMPTS": HTTPException(
+            status_code=429,
+            detail="Too many login attempts, please wait before trying again.",
+            headers={"Retry-After": "1"},
+        ),
         # 500 Server errors
         "500_UPDATE": HTTPException(
             status_code=500,
@@ -41,6 +66,16 @@ def exception_handler(exception):
             status_code=500,
             detail="Error creating record, check the information or try again later.",
         ),
+        "503_HASH_POOL_BUSY": HTTPException(
+            status_code=503,
+            detail="The server is busy processing credentials, please try again shortly.",
+            headers={"Retry-After": "1"},
+        ),
+        "503_LOGIN_BUSY": HTTPException(
+            status_code=503,
+            detail="Too many logins in progress, please try again shortly.",
+            headers={"Retry-After": "1"},
+        ),
     }
 
     return exceptions[exception]
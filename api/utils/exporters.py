@@ -0,0 +1,32 @@
+import csv
+import io
+import json
+from typing import Iterable, Iterator, List, Sequence
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def ndjson_chunk(columns: Sequence[str], rows: Iterable[Sequence]) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(columns, row)), separators=(",", ":")) + "\n"
+        for row in rows
+    ).encode()
+
+
+def csv_chunk(rows: Iterable[Sequence]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def encode_rows(
+    format: str, columns: List[str], partitions: Iterable[Sequence[Sequence]]
+) -> Iterator[bytes]:
+    """Encodes each partition of rows as one chunk, starting with the CSV header."""
+    if format == "csv":
+        yield csv_chunk([columns])
+        for rows in partitions:
+            yield csv_chunk(rows)
+    else:
+        for rows in partitions:
+            yield ndjson_chunk(columns, rows)
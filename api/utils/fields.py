@@ -0,0 +1,20 @@
+from typing import List, Optional
+from api.db.models import UserView
+from api.utils.exception_handler import exception_handler
+
+USER_FIELDS = [column.name for column in UserView.__table__.columns]
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Validates a comma separated `fields` parameter against the `user_view` columns.
+
+    Returns None when every column was requested, otherwise the requested columns
+    with `id` always first, since pagination and `users_ids` rely on it.
+    """
+    if fields is None:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    if not names or any(name not in USER_FIELDS for name in names):
+        raise exception_handler("422_INVALID_FIELDS")
+    return ["id"] + [name for name in dict.fromkeys(names) if name != "id"]
@@ -0,0 +1,74 @@
+import csv
+import json
+from typing import AsyncIterator, Optional, Tuple
+from api.utils.exception_handler import exception_handler
+
+IMPORT_FORMATS = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json-lines": "ndjson",
+    "text/csv": "csv",
+}
+
+
+def import_format(content_type: str) -> str:
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type not in IMPORT_FORMATS:
+        raise exception_handler("415_UNSUPPORTED_MEDIA_TYPE")
+    return IMPORT_FORMATS[media_type]
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+async def iter_import_rows(
+    stream: AsyncIterator[bytes], format: str
+) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Parses an NDJSON or CSV body as it arrives, one line at a time.
+
+    Yields `(line, values, error)` tuples where exactly one of `values` and
+    `error` is set. CSV bodies need a header row and one record per line, empty
+    CSV cells are treated as missing values.
+    """
+    header = None
+    line_number = 0
+    async for raw_line in iter_lines(stream):
+        line_number += 1
+        try:
+            text = raw_line.decode("utf-8-sig" if line_number == 1 else "utf-8")
+        except UnicodeDecodeError:
+            yield line_number, None, "Line is not valid UTF-8."
+            continue
+        text = text.strip()
+        if not text:
+            continue
+
+        if format == "ndjson":
+            try:
+                values = json.loads(text)
+            except ValueError:
+                yield line_number, None, "Line is not valid JSON."
+                continue
+            if not isinstance(values, dict):
+                yield line_number, None, "Line must be a JSON object."
+                continue
+        else:
+            fields = next(csv.reader([text]))
+            if header is None:
+                header = [field.strip() for field in fields]
+                continue
+            if len(fields) != len(header):
+                yield line_number, None, "Number of columns does not match the header."
+                continue
+            values = {key: value for key, value in zip(header, fields) if value != ""}
+
+        yield line_number, values, None
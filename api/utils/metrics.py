@@ -0,0 +1,241 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from starlette.routing import Match
+
+# Upper bounds in seconds, from sub-millisecond SQLite reads to bcrypt calls.
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def lines(self, name: str, labels: str) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {self.count}')
+        labels = "{" + labels.rstrip(",") + "}" if labels else ""
+        lines.append(f"{name}_sum{labels} {self.sum}")
+        lines.append(f"{name}_count{labels} {self.count}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    # Rendered as `key="value",` so a histogram can append its `le` label.
+    return "".join(f'{key}="{_escape(value)}",' for key, value in labels.items())
+
+
+class RequestTimings:
+    """Time spent per component while serving one request, for Server-Timing."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.components = {}
+
+    def add(self, component: str, seconds: float):
+        count, total = self.components.get(component, (0, 0.0))
+        self.components[component] = (count + 1, total + seconds)
+
+    def header(self) -> str:
+        entries = [
+            f'{name};dur={total * 1000:.2f};desc="{count}"'
+            for name, (count, total) in self.components.items()
+        ]
+        entries.append(f"app;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(entries)
+
+
+# Set by the middleware for the duration of a request. Sync routes and
+# run_in_threadpool copy the context, so they share the same object.
+request_timings: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+class Metrics:
+    """
+    In-process registry of request, database and password hashing metrics,
+    rendered in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._in_flight = {}
+        self._operations = {}
+
+    def request_started(self, method: str):
+        with self._lock:
+            self._in_flight[method] = self._in_flight.get(method, 0) + 1
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route, status)
+        with self._lock:
+            self._in_flight[method] -= 1
+            if key not in self._requests:
+                self._requests[key] = Histogram()
+            self._requests[key].observe(seconds)
+
+    def request_totals(self) -> dict:
+        with self._lock:
+            return {
+                "requests_in_flight": sum(self._in_flight.values()),
+                "requests_served": sum(
+                    histogram.count for histogram in self._requests.values()
+                ),
+            }
+
+    def observe(self, operation: str, seconds: float):
+        """Records a timed operation, such as a query or a bcrypt call."""
+        with self._lock:
+            if operation not in self._operations:
+                self._operations[operation] = Histogram()
+            self._operations[operation].observe(seconds)
+        timings = request_timings.get()
+        if timings is not None:
+            timings.add(operation, seconds)
+
+    @contextmanager
+    def timer(self, operation: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(operation, time.perf_counter() - started)
+
+    def render(self, gauges: Optional[dict] = None) -> str:
+        lines = [
+            "# HELP http_request_duration_seconds Latency of HTTP requests by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (method, route, status), histogram in sorted(self._requests.items()):
+                labels = _labels(method=method, route=route, status=status)
+                lines += histogram.lines("http_request_duration_seconds", labels)
+
+            lines += [
+                "# HELP http_requests_in_flight Requests being served.",
+                "# TYPE http_requests_in_flight gauge",
+            ]
+            for method, count in sorted(self._in_flight.items()):
+                lines.append(f'http_requests_in_flight{{method="{method}"}} {count}')
+
+            lines += [
+                "# HELP operation_duration_seconds Time spent in database queries, "
+                "token decoding and password hashing.",
+                "# TYPE operation_duration_seconds histogram",
+            ]
+            for operation, histogram in sorted(self._operations.items()):
+                labels = _labels(operation=operation)
+                lines += histogram.lines("operation_duration_seconds", labels)
+
+        for name, value in (gauges or {}).items():
+            if isinstance(value, bool):
+                value = int(value)
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def route_template(scope, path: str, root_path: str) -> str:
+    """
+    Path template of the route that served the request, "unmatched" when no
+    route matched it.
+    """
+    # FastAPI stores the matched APIRoute in the scope while routing, other
+    # routes such as the docs and the OpenAPI schema are matched again here,
+    # on the path the request came in with.
+    route = scope.get("route")
+    if route is None:
+        router = getattr(scope.get("app"), "router", None)
+        request_scope = {**scope, "path": path, "root_path": root_path}
+        partial = None
+        for candidate in getattr(router, "routes", ()):
+            match, _ = candidate.matches(request_scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+            if match == Match.PARTIAL and partial is None:
+                partial = candidate
+        else:
+            route = partial
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency of every HTTP request by route
+    template, and optionally reporting a `Server-Timing` header with the time
+    spent in the database, token decoding and password hashing.
+    """
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        path, root_path = scope["path"], scope.get("root_path", "")
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timings.header().encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        metrics.request_started(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = route_template(scope, path, root_path)
+            seconds = time.perf_counter() - timings.started
+            metrics.request_finished(method, route, status, seconds)
+            request_timings.reset(token)
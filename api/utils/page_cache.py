@@ -0,0 +1,140 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+from fastapi import Response
+from api.schemas.user import UserSearchSchema
+from api.utils.etag import etag_matches, not_modified
+from api.utils.serialization import json_response, serialize_users
+from core.config import PAGE_CACHE_MAX_BYTES, PAGE_CACHE_SIZE
+
+
+class PageCache:
+    """
+    Bounded LRU cache of serialized list pages, key -> (body, etag).
+
+    Holds at most `maxsize` pages and `max_bytes` bytes of bodies. `limit` has
+    no upper bound, so a page larger than a sixteenth of `max_bytes` is not
+    cached at all, a few huge pages would otherwise evict every other one.
+
+    Every write to users bumps `generation` and drops the cached pages. Readers
+    take the generation before querying and `put` ignores pages computed under
+    an older one, so a page read while a write commits is never cached.
+    """
+
+    def __init__(self, maxsize: int, max_bytes: int = 32 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.oversized = 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, str]]:
+        if not self.maxsize:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, generation: int, body: bytes, etag: str):
+        if not self.maxsize:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            if len(body) > self.max_bytes // 16:
+                self.oversized += 1
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[0])
+            self._entries[key] = (body, etag)
+            self._bytes += len(body)
+            while len(self._entries) > self.maxsize or self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def invalidate(self):
+        """Called after a write to users is committed."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "oversized": self.oversized,
+                "generation": self.generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+page_cache = PageCache(PAGE_CACHE_SIZE, PAGE_CACHE_MAX_BYTES)
+
+
+class ListPage:
+    """
+    One request of the users list, served from `page_cache` when possible.
+
+    Holds the cache key of the page, shared by the sync and async routers so
+    both stacks cache and validate pages the same way. Callers try `cached()`
+    first, then query the page ETag and answer `not_modified()` when it
+    matches, and otherwise query the page and return `store()`.
+    """
+
+    def __init__(
+        self,
+        skip: int,
+        cursor: Optional[str],
+        limit: int,
+        include_total: bool,
+        fields: Optional[List[str]],
+        filters: UserSearchSchema,
+        if_none_match: Optional[str],
+    ):
+        self.fields = fields
+        self.if_none_match = if_none_match
+        self.key = (
+            skip if cursor is None else None,
+            cursor,
+            limit,
+            include_total,
+            tuple(fields) if fields is not None else None,
+            tuple(filters.dict().items()),
+        )
+        self.generation = None
+
+    def cached(self) -> Optional[Response]:
+        """The cached page or a 304 for it, None when the page is not cached."""
+        # Taken before the caller queries, see PageCache.
+        self.generation = page_cache.generation
+        entry = page_cache.get(self.key)
+        if entry is None:
+            return None
+        body, etag = entry
+        return self.not_modified(etag) or json_response(body, etag)
+
+    def not_modified(self, etag: str) -> Optional[Response]:
+        return not_modified(etag) if etag_matches(self.if_none_match, etag) else None
+
+    def store(self, response: dict, etag: str) -> Response:
+        """Serializes the queried page, caches it and returns it."""
+        body = serialize_users(response, self.fields)
+        page_cache.put(self.key, self.generation, body, etag)
+        return json_response(body, etag)
@@ -0,0 +1,22 @@
+import base64
+import binascii
+import json
+from api.utils.exception_handler import exception_handler
+
+
+def encode_cursor(last_id: int) -> str:
+    payload = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise exception_handler("400_INVALID_CURSOR")
+    if not isinstance(last_id, int) or last_id < 0:
+        raise exception_handler("400_INVALID_CURSOR")
+    return last_id
@@ -0,0 +1,44 @@
+import re
+from typing import Optional
+from sqlalchemy import select
+from api.db.models import UserView
+from api.db.schema import users_fts
+from api.schemas.user import UserSearchSchema
+
+_TOKEN = re.compile(r"\w+")
+
+
+def fts_match(q: Optional[str]) -> Optional[str]:
+    """
+    Turns free text into an FTS5 query matching rows that contain every word
+    as a prefix, e.g. `ana gar` matches "Ana Garcia". Returns None when `q`
+    has no words. Words are quoted so FTS5 operators in `q` are not interpreted.
+    """
+    if not q:
+        return None
+    tokens = _TOKEN.findall(q)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search_conditions(filters: Optional[UserSearchSchema]) -> list:
+    """Conditions on user_view for every filter given in `filters`."""
+    if filters is None:
+        return []
+    conditions = []
+    if filters.country is not None:
+        conditions.append(UserView.country == filters.country)
+    if filters.city is not None:
+        conditions.append(UserView.city == filters.city)
+    if filters.min_age is not None:
+        conditions.append(UserView.age >= filters.min_age)
+    if filters.max_age is not None:
+        conditions.append(UserView.age <= filters.max_age)
+    match = fts_match(filters.q)
+    if match is not None:
+        matches = select(users_fts.c.rowid).where(
+            users_fts.c.users_fts.op("MATCH")(match)
+        )
+        conditions.append(UserView.id.in_(matches))
+    return conditions
@@ -0,0 +1,41 @@
+from typing import List, Optional
+import orjson
+from fastapi import Response
+from api.schemas.user import UserLookupResponse, UserRead, UserResponse
+
+# Validators and serializers compiled by pydantic-core when the models are defined,
+# calling them directly skips FastAPI's generic response encoding.
+_user_list_validator = UserResponse.__pydantic_validator__
+_user_list_serializer = UserResponse.__pydantic_serializer__
+_user_validator = UserRead.__pydantic_validator__
+_user_serializer = UserRead.__pydantic_serializer__
+_user_lookup_validator = UserLookupResponse.__pydantic_validator__
+_user_lookup_serializer = UserLookupResponse.__pydantic_serializer__
+
+
+def serialize_users(payload: dict, fields: Optional[List[str]] = None) -> bytes:
+    if fields is not None:
+        # Sparse rows are already plain dictionaries of column values.
+        return orjson.dumps(payload)
+    return _user_list_serializer.to_json(
+        _user_list_validator.validate_python(payload), exclude_unset=True
+    )
+
+
+def serialize_user(user, fields: Optional[List[str]] = None) -> bytes:
+    if fields is not None:
+        return orjson.dumps(user)
+    return _user_serializer.to_json(_user_validator.validate_python(user))
+
+
+def serialize_user_lookup(payload: dict, fields: Optional[List[str]] = None) -> bytes:
+    if fields is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return _user_lookup_serializer.to_json(
+        _user_lookup_validator.validate_python(payload)
+    )
+
+
+def json_response(content: bytes, etag: Optional[str] = None) -> Response:
+    headers = {"ETag": etag} if etag is not None else None
+    return Response(content=content, media_type="application/json", headers=headers)
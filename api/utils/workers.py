@@ -0,0 +1,91 @@
+import asyncio
+import json
+import os
+import time
+from typing import Optional
+from api.utils.cache_sync import cache_sync
+from api.utils.metrics import metrics
+from api.utils.page_cache import page_cache
+from core.config import WORKER_HEARTBEAT_INTERVAL, WORKER_STATE_DIR
+
+
+class WorkerHeartbeat:
+    """
+    Reports the state of this worker to the supervisor of `python -m api.server`.
+
+    The state is written to `<pid>.json` in `directory` by a task of the event
+    loop, so a worker whose loop is stuck stops beating and is restarted. The
+    first write also tells the supervisor that the worker finished starting.
+    """
+
+    def __init__(self, directory: Optional[str], interval: float):
+        self.directory = directory
+        self.interval = interval
+        self.started_at = time.time()
+        self._task = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"{os.getpid()}.json")
+
+    def state(self) -> dict:
+        sync = cache_sync.stats()
+        return {
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "heartbeat_at": time.time(),
+            **metrics.request_totals(),
+            "page_cache_generation": page_cache.generation,
+            "cache_sync_last_seq": sync["last_seq"],
+            "cache_sync_errors": sync["errors"],
+        }
+
+    def write(self):
+        # Written aside and renamed so readers never see half a file.
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(self.state(), file)
+        os.replace(temporary, self.path)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.write()
+
+    def start(self):
+        if self.directory is None or self._task is not None:
+            return
+        self.started_at = time.time()
+        self.write()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def read_worker_states(directory: str) -> list:
+    states = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as file:
+                states.append(json.load(file))
+        except (OSError, ValueError):
+            # Removed by a worker that just stopped.
+            continue
+    return states
+
+
+worker_heartbeat = WorkerHeartbeat(WORKER_STATE_DIR, WORKER_HEARTBEAT_INTERVAL)
@@ -0,0 +1,22 @@
+"""
+Helpers shared by the in process benchmarks.
+"""
+
+import os
+from pathlib import Path
+
+
+def configure_environment(path: Path) -> dict:
+    # Must run before anything under api/ is imported: core.config reads the
+    # database URLs at import time and `database` keeps them, even though its
+    # engines are only built on first use.
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    os.environ.setdefault("SECRET", "benchmark-secret")
+    return dict(os.environ)
+
+
+def percentile(values: list, fraction: float) -> float:
+    # Nearest rank on sorted values.
+    index = max(0, min(len(values) - 1, round(fraction * len(values) + 0.5) - 1))
+    return values[index]
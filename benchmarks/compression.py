@@ -0,0 +1,107 @@
+"""
+CPU cost and bytes saved by the response compression at every level.
+
+Compresses a users list page as one body and an NDJSON export as a stream of
+flushed chunks, the way CompressionMiddleware sends them, with gzip and, when
+`zstandard` is installed, zstd.
+
+    python -m benchmarks.compression --page-size 1000 --export-rows 10000
+"""
+
+import argparse
+import json
+import zlib
+from pathlib import Path
+from benchmarks.serialization import build_page, measure
+from api.utils.compression import GzipEncoder, ZstdEncoder, zstandard
+from api.utils.exporters import ndjson_chunk
+from api.utils.serialization import serialize_users
+
+GZIP_LEVELS = [1, 3, 6, 9]
+ZSTD_LEVELS = [1, 3, 9, 19]
+
+
+def build_export(rows: int, chunk_size: int) -> list:
+    users = build_page(rows)["result"]
+    columns = list(users[0].__table__.columns.keys())
+    records = [[getattr(user, column) for column in columns] for user in users]
+    return [
+        ndjson_chunk(columns, records[start : start + chunk_size])
+        for start in range(0, rows, chunk_size)
+    ]
+
+
+def compress(encoder_class, level: int, chunks: list) -> bytes:
+    encoder = encoder_class(level)
+    if len(chunks) == 1:
+        return encoder.compress(chunks[0]) + encoder.finish()
+    parts = [encoder.compress(chunk) + encoder.flush() for chunk in chunks]
+    parts.append(encoder.finish())
+    return b"".join(parts)
+
+
+def decompress(encoding: str, data: bytes) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return zlib.decompress(data, 31)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--export-rows", type=int, default=10000)
+    parser.add_argument("--export-chunk-size", type=int, default=1000)
+    parser.add_argument("--number", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    payloads = {
+        "page": [serialize_users(build_page(args.page_size))],
+        "export": build_export(args.export_rows, args.export_chunk_size),
+    }
+    encoders = [("gzip", GzipEncoder, level) for level in GZIP_LEVELS]
+    if zstandard is not None:
+        encoders += [("zstd", ZstdEncoder, level) for level in ZSTD_LEVELS]
+
+    results = []
+    for payload, chunks in payloads.items():
+        size = sum(len(chunk) for chunk in chunks)
+        for encoding, encoder_class, level in encoders:
+            data = compress(encoder_class, level, chunks)
+            assert decompress(encoding, data) == b"".join(chunks)
+            compress_s = measure(
+                lambda: compress(encoder_class, level, chunks), args.number, args.repeat
+            )
+            decompress_s = measure(
+                lambda: decompress(encoding, data), args.number, args.repeat
+            )
+            results.append(
+                {
+                    "payload": payload,
+                    "encoding": encoding,
+                    "level": level,
+                    "bytes": size,
+                    "compressed_bytes": len(data),
+                    "ratio": round(size / len(data), 2),
+                    "compress_ms": round(compress_s * 1000, 3),
+                    "decompress_ms": round(decompress_s * 1000, 3),
+                    "compress_mb_s": round(size / compress_s / 1e6, 1),
+                }
+            )
+
+    report = {
+        "page_size": args.page_size,
+        "export_rows": args.export_rows,
+        "export_chunk_size": args.export_chunk_size,
+        "zstd": zstandard is not None,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Load test of the API with a mix of logins, reads and writes.
+
+Drives `main.app` in process through the httpx ASGI transport, a real uvicorn
+server, or both, against a temporary database seeded with `--users`
+rows. Concurrent clients pick a scenario by weight until `--duration` runs out
+and the throughput and p50/p95/p99 latency of every scenario are printed as JSON.
+
+    python -m benchmarks.load --target both --concurrency 16 --duration 10
+    python -m benchmarks.load --mix login=1 me=10 list=10 create=1 patch=2
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import configure_environment, percentile
+
+USERNAME = "benchmark"
+PASSWORD = "benchmark-password"
+SCENARIOS = ("login", "me", "list", "create", "patch")
+DEFAULT_MIX = {"login": 1, "me": 10, "list": 10, "create": 1, "patch": 2}
+
+
+def seed(users: int):
+    from api.db.database import database
+    from api.db.models import User
+    from api.security.hashing import hash_password
+    from sqlalchemy import insert
+
+    # One real hash for the login user, every other row shares it since their
+    # passwords are never checked.
+    hashed = hash_password(PASSWORD)
+    rows = [
+        {
+            "username": USERNAME if index == 0 else f"user{index}",
+            "hashed_password": hashed,
+            "email": f"user{index}@example.com",
+            "full_name": f"User Number {index}",
+            "age": 20 + index % 50,
+            "city": "New York",
+            "country": "USA",
+            "is_active": True,
+        }
+        for index in range(users)
+    ]
+    database.create_schema()
+    with database.engine.begin() as conn:
+        conn.execute(insert(User), rows)
+
+
+def summarize(samples: dict, elapsed: float) -> dict:
+    routes = {}
+    for name, entries in sorted(samples.items()):
+        latencies = sorted(latency for latency, _ in entries)
+        routes[name] = {
+            "requests": len(entries),
+            "errors": sum(1 for _, ok in entries if not ok),
+            "throughput_rps": round(len(entries) / elapsed, 2),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        }
+    total = sum(route["requests"] for route in routes.values())
+    return {
+        "requests": total,
+        "errors": sum(route["errors"] for route in routes.values()),
+        "throughput_rps": round(total / elapsed, 2),
+        "routes": routes,
+    }
+
+
+class Scenarios:
+    created = itertools.count()
+
+    def __init__(self, client: httpx.AsyncClient, token: str, args):
+        self.client = client
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.args = args
+
+    def login(self):
+        return self.client.post(
+            "/token", data={"username": USERNAME, "password": PASSWORD}
+        )
+
+    def me(self):
+        return self.client.get("/api/users/me", headers=self.headers)
+
+    def list(self):
+        params = {"skip": random.choice(self.args.skips), "limit": self.args.limit}
+        return self.client.get("/api/users/", params=params, headers=self.headers)
+
+    def create(self):
+        name = f"load{next(self.created)}"
+        body = {
+            "username": name,
+            "hashed_password": PASSWORD,
+            "email": f"{name}@example.com",
+            "city": "Bogota",
+            "country": "Colombia",
+        }
+        return self.client.post("/api/users/", json=body, headers=self.headers)
+
+    def patch(self):
+        user_id = random.randint(2, self.args.users)
+        body = {"age": random.randint(18, 90)}
+        return self.client.patch(
+            f"/api/users/{user_id}", json=body, headers=self.headers
+        )
+
+
+async def run_load(client: httpx.AsyncClient, args) -> dict:
+    response = await client.post(
+        "/token", data={"username": USERNAME, "password": PASSWORD}
+    )
+    response.raise_for_status()
+    token = response.json()["access_token"]
+
+    names = [name for name in SCENARIOS if args.mix.get(name)]
+    weights = [args.mix[name] for name in names]
+    samples = defaultdict(list)
+
+    async def worker(deadline: float):
+        scenarios = Scenarios(client, token, args)
+        while time.perf_counter() < deadline:
+            name = random.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await getattr(scenarios, name)()
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            samples[name].append((time.perf_counter() - started, ok))
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(worker(deadline) for _ in range(args.concurrency)))
+    return summarize(samples, time.perf_counter() - started)
+
+
+async def run_asgi(args) -> dict:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://benchmark", timeout=60
+    ) as client:
+        return await run_load(client, args)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_ready(client: httpx.AsyncClient, process, timeout: float = 30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited before accepting requests")
+        try:
+            await client.get("/openapi.json")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("uvicorn did not start in time")
+
+
+async def run_uvicorn(args, environment: dict) -> dict:
+    port = free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        env=environment,
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60
+        ) as client:
+            await wait_until_ready(client, process)
+            return await run_load(client, args)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def parse_mix(values: list) -> dict:
+    mix = dict(DEFAULT_MIX)
+    if values:
+        mix = dict.fromkeys(SCENARIOS, 0)
+        for value in values:
+            name, _, weight = value.partition("=")
+            if name not in SCENARIOS:
+                raise argparse.ArgumentTypeError(f"unknown scenario {name!r}")
+            mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", choices=["asgi", "uvicorn", "both"], default="asgi")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--users", type=int, default=1000, help="seeded users")
+    parser.add_argument("--limit", type=int, default=100, help="list page size")
+    parser.add_argument("--skips", type=int, nargs="+", default=[0, 100, 500, 900])
+    parser.add_argument("--mix", nargs="+", metavar="SCENARIO=WEIGHT")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+    args.mix = parse_mix(args.mix)
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        environment = configure_environment(Path(directory) / "benchmark.sqlite3")
+        seed(args.users)
+
+        targets = ["asgi", "uvicorn"] if args.target == "both" else [args.target]
+        report = {
+            "config": {
+                "concurrency": args.concurrency,
+                "duration_s": args.duration,
+                "users": args.users,
+                "limit": args.limit,
+                "skips": args.skips,
+                "mix": args.mix,
+            },
+            "results": {},
+        }
+        for target in targets:
+            if target == "asgi":
+                report["results"]["asgi"] = asyncio.run(run_asgi(args))
+            else:
+                report["results"]["uvicorn"] = asyncio.run(
+                    run_uvicorn(args, environment)
+                )
+
+        from api.security.hashing import hash_pool
+
+        hash_pool.shutdown()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
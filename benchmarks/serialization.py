@@ -0,0 +1,72 @@
+"""
+Per-request serialization cost of a users list page.
+
+Compares FastAPI's default path for routes without a response model
+(`jsonable_encoder` + `JSONResponse`) against the precompiled pydantic-core
+serializers used by the users routes.
+
+    python -m benchmarks.serialization --sizes 100 1000
+"""
+
+import argparse
+import json
+import timeit
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from api.db.models import UserView
+from api.utils.serialization import serialize_users
+
+
+def build_page(size: int) -> dict:
+    users = [
+        UserView(
+            id=index,
+            username=f"user{index}",
+            full_name=f"User Number {index}",
+            city="New York",
+            phone_number="123456789",
+            email=f"user{index}@example.com",
+            age=30,
+            country="USA",
+            is_active=True,
+        )
+        for index in range(1, size + 1)
+    ]
+    return {
+        "message": "List of users",
+        "users_ids": [u.id for u in users],
+        "result": users,
+    }
+
+
+def measure(function, number: int, repeat: int) -> float:
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--number", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        page = build_page(size)
+        before = measure(
+            lambda: JSONResponse(jsonable_encoder(page)).body, args.number, args.repeat
+        )
+        after = measure(lambda: serialize_users(page), args.number, args.repeat)
+        results.append(
+            {
+                "page_size": size,
+                "jsonable_encoder_ms": round(before * 1000, 3),
+                "pydantic_core_ms": round(after * 1000, 3),
+                "speedup": round(before / after, 2),
+            }
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
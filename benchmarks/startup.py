@@ -0,0 +1,98 @@
+"""
+Import time and cold start time of the application.
+
+Each sample runs in a fresh interpreter against a new temporary database:
+`import_ms` is the time to import `main`, `cold_start_ms` adds the lifespan
+startup (schema creation) and the first request served. The slowest modules
+reported by `python -X importtime` show what to look at when boot time grows.
+
+    python -m benchmarks.startup --samples 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BOOT = """
+import json
+import time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    client.get("/openapi.json").raise_for_status()
+    served = time.perf_counter()
+print(json.dumps({"import": imported - started, "cold_start": served - started}))
+"""
+
+
+def environment(directory: str, index: int) -> dict:
+    path = Path(directory) / f"startup{index}.sqlite3"
+    return {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{path}",
+        "ASYNC_DATABASE_URL": f"sqlite+aiosqlite:///{path}",
+        "SECRET": os.environ.get("SECRET", "benchmark-secret"),
+    }
+
+
+def boot(env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", BOOT], env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def slowest_imports(env: dict, top: int) -> list:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            modules.append((int(cumulative), name.strip()))
+    modules.sort(reverse=True)
+    return [
+        {"module": name, "cumulative_ms": round(microseconds / 1000, 1)}
+        for microseconds, name in modules[:top]
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports shown")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        samples = [boot(environment(directory, index)) for index in range(args.samples)]
+        imports = slowest_imports(environment(directory, args.samples), args.top)
+
+    report = {"samples": args.samples}
+    for name in ("import", "cold_start"):
+        values = [sample[name] * 1000 for sample in samples]
+        report[f"{name}_ms"] = {
+            "median": round(statistics.median(values), 1),
+            "min": round(min(values), 1),
+            "max": round(max(values), 1),
+        }
+    report["slowest_imports"] = imports
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Latency and statements per single user write.
+
+Calls the users controllers directly, one write at a time against a temporary
+database seeded with `--users` rows, so the numbers only contain the database
+round trips and the ORM work of each write: no HTTP, no password hashing. The
+p50/p95/p99 latency and the SQL statements issued per create, update, patch
+and delete are printed as JSON.
+
+    python -m benchmarks.writes --operations 2000
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import configure_environment, percentile
+
+OPERATIONS = ("create", "update", "patch", "delete")
+
+
+def seed(users: int) -> list:
+    from sqlalchemy import insert, select
+    from api.db.database import database
+    from api.db.models import User
+
+    database.create_schema()
+    with database.engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                {
+                    "username": f"user{index}",
+                    "hashed_password": "hash",
+                    "email": f"user{index}@example.com",
+                    "city": "New York",
+                    "country": "USA",
+                }
+                for index in range(users)
+            ],
+        )
+        return list(conn.scalars(select(User.id).order_by(User.id)))
+
+
+def measure(operations: int, ids: list) -> dict:
+    from sqlalchemy import event
+    from api.controllers.user import create_user, delete_user, patch_user, update_user
+    from api.db.database import database
+    from api.schemas.user import UserSchema, UserUpdateSchema
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", count)
+
+    def create(index: int):
+        user = UserSchema(
+            username=f"new{index}", hashed_password="x", email=f"new{index}@x.com"
+        )
+        create_user(db, user, "hash")
+
+    def update(index: int):
+        changes = UserUpdateSchema(
+            username=f"user{index}",
+            email=f"user{index}@example.com",
+            city=f"City {index}",
+            is_active=True,
+        )
+        update_user(db, ids[index], changes)
+
+    def patch(index: int):
+        patch_user(db, ids[index], UserUpdateSchema(age=index % 90))
+
+    def delete(index: int):
+        delete_user(db, ids[index])
+
+    report = {}
+    for name, operation in zip(OPERATIONS, (create, update, patch, delete)):
+        timings = []
+        statements.clear()
+        for index in range(operations):
+            with database.session_factory() as db:
+                started = time.perf_counter()
+                operation(index)
+                timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        report[name] = {
+            "operations": operations,
+            "statements_per_operation": round(len(statements) / operations, 2),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "p50_ms": round(percentile(timings, 0.50), 3),
+            "p95_ms": round(percentile(timings, 0.95), 3),
+            "p99_ms": round(percentile(timings, 0.99), 3),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--operations", type=int, default=2000, help="per write")
+    parser.add_argument("--users", type=int, default=10000, help="seeded users")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+    if args.users < args.operations:
+        parser.error("--users must be at least --operations")
+
+    with tempfile.TemporaryDirectory() as directory:
+        configure_environment(Path(directory) / "writes.sqlite3")
+        ids = seed(args.users)
+        report = {"users": args.users, **measure(args.operations, ids)}
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
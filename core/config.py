@@ -1,4 +1,110 @@
 import os
+from dotenv import load_dotenv
+
+load_dotenv()
 
 SECRET = os.getenv("SECRET")
 ALGORITHM = "HS256"
+
+# Database: DB_DRIVER selects the stack used by the users API, "sync" (default)
+# or "async" (AsyncSession over aiosqlite).
+DB_DRIVER = os.getenv("DB_DRIVER", "sync")
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./database.sqlite3")
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL", "sqlite+aiosqlite:///./database.sqlite3"
+)
+
+# Create or upgrade the schema when the app starts, disable it when the schema
+# is managed with `python -m api.db.migrate` before starting the workers.
+DB_CREATE_SCHEMA = os.getenv("DB_CREATE_SCHEMA", "true").lower() == "true"
+
+# Connection pool and SQLite connection settings, applied to every new connection.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 268435456))
+# Negative values are KiB, -65536 is a 64 MiB page cache per connection.
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -65536))
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000))
+
+# Password hashing policy: HASH_SCHEME is bcrypt (default), argon2 (needs
+# argon2-cffi) or pbkdf2_sha256, and HASH_ROUNDS its cost (log2 rounds for
+# bcrypt, time cost for argon2, iterations for pbkdf2), passlib's default for
+# the scheme when unset. Pick it with `python -m api.security.calibrate`,
+# stored hashes follow the policy the next time their user logs in.
+HASH_SCHEME = os.getenv("HASH_SCHEME", "bcrypt")
+HASH_ROUNDS = int(os.getenv("HASH_ROUNDS")) if os.getenv("HASH_ROUNDS") else None
+
+# Password hashing: number of worker processes running bcrypt and how many
+# requests may wait for a free worker before new ones are rejected with a 503.
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", os.cpu_count() or 1))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", 64))
+
+# Login admission control: logins verifying a password at once, how many may
+# wait for a slot and for how long (seconds) before a 503. Token buckets limit
+# failed attempts per username and per client address, BURST failures at once
+# then RATE per second, before a 429.
+LOGIN_MAX_CONCURRENCY = int(os.getenv("LOGIN_MAX_CONCURRENCY", HASH_POOL_SIZE))
+LOGIN_QUEUE_LIMIT = int(os.getenv("LOGIN_QUEUE_LIMIT", 16))
+LOGIN_QUEUE_TIMEOUT = float(os.getenv("LOGIN_QUEUE_TIMEOUT", 2))
+LOGIN_USER_BURST = float(os.getenv("LOGIN_USER_BURST", 5))
+LOGIN_USER_RATE = float(os.getenv("LOGIN_USER_RATE", 0.1))
+LOGIN_IP_BURST = float(os.getenv("LOGIN_IP_BURST", 20))
+LOGIN_IP_RATE = float(os.getenv("LOGIN_IP_RATE", 1))
+
+# Authenticated principal cache: maximum number of cached tokens and how many
+# seconds a verified token is trusted before the user is loaded again.
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+
+# User list page cache: serialized pages kept in memory, 0 disables it, and
+# the most bytes of pages kept.
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", 256))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
+# Cache coherence: every CACHE_SYNC_INTERVAL seconds each process reads the users
+# changed by other processes from user_changes and drops them from its caches,
+# 0 disables it. Only the last CACHE_SYNC_RETENTION changes are kept.
+CACHE_SYNC_INTERVAL = float(os.getenv("CACHE_SYNC_INTERVAL", 1))
+CACHE_SYNC_RETENTION = int(os.getenv("CACHE_SYNC_RETENTION", 10000))
+
+# Multi-worker server (`python -m api.server`): the supervisor sets
+# WORKER_STATE_DIR for its workers, which write their state there every
+# WORKER_HEARTBEAT_INTERVAL seconds. A worker silent for WORKER_TIMEOUT seconds
+# is restarted.
+WORKER_STATE_DIR = os.getenv("WORKER_STATE_DIR")
+WORKER_HEARTBEAT_INTERVAL = float(os.getenv("WORKER_HEARTBEAT_INTERVAL", 1))
+WORKER_TIMEOUT = float(os.getenv("WORKER_TIMEOUT", 30))
+
+# Metrics: add a Server-Timing header with the time spent in the database,
+# token decoding and password hashing to every response.
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "false").lower() == "true"
+
+# Response compression: gzip, or zstd when the zstandard package is installed,
+# as accepted by the client, for bodies of at least COMPRESSION_MINIMUM_SIZE
+# bytes. Streamed responses are always compressed.
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 3))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", 3))
+
+# Write queue: when enabled, single user creates, updates and deletes are
+# committed by one writer thread in batches of up to WRITE_QUEUE_MAX_BATCH,
+# waiting at most WRITE_QUEUE_MAX_WAIT_MS for more writes after the first.
+WRITE_QUEUE_ENABLED = os.getenv("WRITE_QUEUE_ENABLED", "false").lower() == "true"
+WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", 64))
+WRITE_QUEUE_MAX_WAIT_MS = float(os.getenv("WRITE_QUEUE_MAX_WAIT_MS", 2))
+
+# Bulk import: rows hashed and inserted per transaction.
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 500))
+
+# Export: rows fetched from the database cursor and written per chunk.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 1000))
+
+# Bulk patch/delete: ids updated or deleted per transaction.
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 500))
+
+# Batch lookup: most ids accepted by one request, read BULK_CHUNK_SIZE at a time.
+LOOKUP_MAX_IDS = int(os.getenv("LOOKUP_MAX_IDS", 1000))
@@ -1,12 +1,48 @@
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from api.routers import users, auth
+from fastapi.responses import JSONResponse, ORJSONResponse
+from starlette.concurrency import run_in_threadpool
+from api.db.database import database, untimed
+from api.routers import auth, system, users_common
+from api.security.hashing import hash_pool
+from api.utils.cache_sync import cache_sync
+from api.utils.compression import CompressionMiddleware
+from api.utils.metrics import MetricsMiddleware
+from api.utils.workers import worker_heartbeat
+from core.config import (
+    COMPRESSION_ENABLED,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MINIMUM_SIZE,
+    COMPRESSION_ZSTD_LEVEL,
+    DB_CREATE_SCHEMA,
+    DB_DRIVER,
+    METRICS_SERVER_TIMING,
+)
 import uvicorn
 
+# Only the selected users router is imported, the other one would just slow down boot.
+if DB_DRIVER == "async":
+    from api.routers.users_async import router as users_router
+else:
+    from api.routers.users import router as users_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DB_CREATE_SCHEMA:
+        await run_in_threadpool(database.create_schema)
+    cache_sync.start(untimed(database.engine))
+    worker_heartbeat.start()
+    yield
+    await worker_heartbeat.stop()
+    cache_sync.stop()
+    await database.dispose()
+    hash_pool.shutdown()
+
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 load_dotenv()
 
 app.add_middleware(
@@ -15,6 +51,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=COMPRESSION_MINIMUM_SIZE,
+        gzip_level=COMPRESSION_GZIP_LEVEL,
+        zstd_level=COMPRESSION_ZSTD_LEVEL,
+    )
+# Added last so it is the outermost middleware and also times compression.
+app.add_middleware(MetricsMiddleware, server_timing=METRICS_SERVER_TIMING)
 
 app.title = "Challenge Savant - Swagger UI"
 app.version = "0.1"
@@ -25,8 +70,11 @@ def not_found(request, exc):
     return JSONResponse(status_code=404, content={"message": "Not Found"})
 
 
-app.include_router(users.router, prefix="/api")
+app.include_router(users_common.router, prefix="/api")
+app.include_router(users_router, prefix="/api")
 app.include_router(auth.router)
+app.include_router(system.router, prefix="/api")
+app.include_router(system.metrics_router)
 
 
 if __name__ == "__main__":